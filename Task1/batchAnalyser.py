@@ -0,0 +1,116 @@
+import argparse
+import os
+import sys
+import time
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+from pcapAnalyser import process_capture, process_capture_streaming
+from plotRender import defer_rendering, render_tree
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import stageProfile
+from common.fastPcap import capture_files, capture_name
+
+def find_captures(root):
+    """Every capture below root, in a stable order. A rotated set (h7.pcap, h7.pcap1, ... or
+    h7.pcap0, h7.pcap1, ... from tcpdump -C/-W) is listed once, by its base name."""
+    captures = set()
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            base = capture_name(name)
+            if base:
+                captures.add(os.path.join(dirpath, base))
+    return sorted(captures)
+
+def analyse_one(cap_file, stream=False, bin_duration=0.2, use_cache=True, defer_plots=False, profile=False):
+    """Worker: analyse one capture, writing plots and metrics next to it.
+
+    Returns (cap_file, size_in_bytes, seconds, error, report) so one bad capture is reported
+    instead of taking the whole batch down. With profile, report is the capture's stage profile
+    (also written to <capture>.profile.json); otherwise it is None.
+    """
+    start = time.monotonic()
+    out_dir = os.path.dirname(cap_file)
+    defer_rendering(defer_plots)
+    with stageProfile.profiling(cap_file) if profile else nullcontext() as collected:
+        try:
+            if stream:
+                process_capture_streaming(cap_file, out_dir, out_dir, bin_duration=bin_duration, raise_errors=True)
+            else:
+                process_capture(cap_file, out_dir, out_dir, bin_duration=bin_duration, raise_errors=True, use_cache=use_cache)
+            error = None
+        except Exception as err:
+            error = f"{type(err).__name__}: {err}"
+    report = None
+    if collected is not None:
+        report = collected.report()
+        stageProfile.write_report(report, os.path.splitext(cap_file)[0] + ".profile.json")
+    size = sum(os.path.getsize(member) for member in capture_files(cap_file))
+    return cap_file, size, time.monotonic() - start, error, report
+
+def analyse_tree(root="results", workers=None, stream=False, bin_duration=0.2, use_cache=True, defer_plots=False,
+                 profile=False):
+    """Analyse every capture under root on a process pool.
+
+    With defer_plots the analyses only save their plot series and all figures are rendered
+    afterwards by plotRender.render_tree on a second pool. With profile every worker profiles
+    its capture and the reports are aggregated into <root>/profile_summary.json.
+
+    Returns a summary dict with the per-capture failures and the aggregate rates.
+    """
+    captures = find_captures(root)
+    if not captures:
+        print(f"No captures found under {root}")
+        return {"captures": 0, "failed": [], "seconds": 0.0, "captures_per_s": 0.0, "mb_per_s": 0.0}
+
+    workers = min(workers or os.cpu_count() or 1, len(captures))
+    failed = []
+    reports = []
+    total_bytes = 0
+    start = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(analyse_one, cap, stream, bin_duration, use_cache, defer_plots, profile) for cap in captures]
+        for future in tqdm(as_completed(futures), total=len(futures), desc=f"Analyzing captures ({workers} workers)"):
+            cap_file, size, _, error, report = future.result()
+            total_bytes += size
+            if error:
+                failed.append((cap_file, error))
+            if report:
+                reports.append(report)
+    if defer_plots:
+        render_tree(root, workers)
+    elapsed = time.monotonic() - start
+
+    summary = {
+        "captures": len(captures),
+        "failed": failed,
+        "seconds": elapsed,
+        "captures_per_s": len(captures) / elapsed if elapsed else 0.0,
+        "mb_per_s": total_bytes / 1e6 / elapsed if elapsed else 0.0,
+    }
+    print(f"Analysed {len(captures)} captures ({total_bytes / 1e6:.1f} MB) in {elapsed:.1f}s: "
+          f"{summary['captures_per_s']:.2f} captures/s, {summary['mb_per_s']:.1f} MB/s")
+    if reports:
+        # Stage times are summed over the workers, so they can add up to more than the elapsed time.
+        summary["profile"] = stageProfile.aggregate(sorted(reports, key=lambda r: r["name"]))
+        stageProfile.write_report(summary["profile"], os.path.join(root, "profile_summary.json"))
+        print(stageProfile.format_report(summary["profile"]))
+    for cap_file, error in failed:
+        print(f"FAILED {cap_file}: {error}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse every capture under a results tree in parallel")
+    parser.add_argument('--root', type=str, default="results", help="Results tree to search for .pcap files")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--bin', type=float, default=0.2, help="Bin width in seconds")
+    parser.add_argument('--stream', action='store_true', help="Use the constant-memory streaming analyzer")
+    parser.add_argument('--no-cache', action='store_true', help="Always reparse the pcaps instead of using the decoded-capture cache")
+    parser.add_argument('--defer-plots', action='store_true', help="Render all figures in a separate parallel pass after the analyses")
+    parser.add_argument('--profile', action='store_true', help="Write per-stage timings next to every capture and a summary to <root>/profile_summary.json")
+    args = parser.parse_args()
+
+    summary = analyse_tree(args.root, workers=args.workers, stream=args.stream, bin_duration=args.bin,
+                           use_cache=not args.no_cache, defer_plots=args.defer_plots, profile=args.profile)
+    sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1,115 @@
+import numpy as np
+
+def _bin_membership(times, bin_duration, bin_count):
+    """Return (packet_idx, bin_idx) pairs for every bin a packet falls into.
+
+    A packet at time t belongs to bin i when i*bin_duration <= t <= i*bin_duration + bin_duration,
+    so a packet sitting exactly on a boundary is counted in both neighbouring bins. Only the
+    bins around floor(t / bin_duration) can match, so three candidates per packet are enough.
+    """
+    base = np.floor(times / bin_duration).astype(np.int64)
+    packet_parts = []
+    bin_parts = []
+    for shift in (-1, 0, 1):
+        idx = base + shift
+        bin_start = idx * bin_duration
+        bin_end = bin_start + bin_duration
+        hit = (idx >= 0) & (idx < bin_count) & (bin_start <= times) & (times <= bin_end)
+        packet_parts.append(np.nonzero(hit)[0])
+        bin_parts.append(idx[hit])
+    return np.concatenate(packet_parts), np.concatenate(bin_parts)
+
+def bin_rate_series(times, values, duration, bin_duration=0.2):
+    """Bin per-packet byte counts into a rate series in bits/s.
+
+    Bins start at t=0 and there are int(duration / bin_duration) + 1 of them. Only bins that
+    received at least one packet are returned, each reported at its centre.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n = min(len(times), len(values))
+    times, values = times[:n], values[:n]
+
+    bin_count = int(duration / bin_duration) + 1
+    packet_idx, bin_idx = _bin_membership(times, bin_duration, bin_count)
+    bits = np.bincount(bin_idx, weights=values[packet_idx] * 8, minlength=bin_count)
+    hits = np.bincount(bin_idx, minlength=bin_count)
+
+    occupied = np.nonzero(hits)[0]
+    centres = occupied * bin_duration + bin_duration / 2
+    rates = bits[occupied] / bin_duration
+    return centres.tolist(), rates.tolist()
+
+def bin_rate_series_multi(times, values, duration, bin_durations):
+    """Run bin_rate_series for several bin widths over the same packets.
+
+    Returns a dict mapping each bin width to its (centres, rates) pair.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    return {bd: bin_rate_series(times, values, duration, bd) for bd in bin_durations}
+
+class RunningBins:
+    """Bin accumulator fed one batch of packets at a time.
+
+    Memory is one slot per bin no matter how many packets pass through, which is what the
+    streaming analyzer relies on. series() gives the same result as bin_rate_series over all
+    the packets that were added. With track_peak the largest value seen in each bin (by
+    floor(t / bin_duration)) is kept as well, for series such as the TCP window.
+    """
+
+    def __init__(self, bin_duration=0.2, track_peak=False):
+        self.bin_duration = bin_duration
+        self.bits = np.zeros(0, dtype=np.float64)
+        self.hits = np.zeros(0, dtype=np.int64)
+        # -1 marks a bin no packet has landed in yet; a zero window is a real value.
+        self.peak = np.full(0, -1.0) if track_peak else None
+
+    def _grow(self, size):
+        if size <= len(self.hits):
+            return
+        size = max(size, 2 * len(self.hits))
+        self.bits = np.concatenate([self.bits, np.zeros(size - len(self.bits))])
+        self.hits = np.concatenate([self.hits, np.zeros(size - len(self.hits), dtype=np.int64)])
+        if self.peak is not None:
+            self.peak = np.concatenate([self.peak, np.full(size - len(self.peak), -1.0)])
+
+    def add(self, times, values, count_hits=True):
+        """Fold a batch in. count_hits=False only adjusts the totals, e.g. to retract bytes."""
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if not len(times):
+            return
+        last_bin = max(int(times.max() / self.bin_duration) + 2, 0)
+        self._grow(last_bin)
+        packet_idx, bin_idx = _bin_membership(times, self.bin_duration, last_bin)
+        self.bits[:last_bin] += np.bincount(bin_idx, weights=values[packet_idx] * 8, minlength=last_bin)
+        if count_hits:
+            self.hits[:last_bin] += np.bincount(bin_idx, minlength=last_bin)
+        if self.peak is not None:
+            # Times before 0 belong to no bin (as in _bin_membership); a negative index would wrap to the end.
+            kept = times >= 0
+            base = np.floor(times[kept] / self.bin_duration).astype(np.int64)
+            np.maximum.at(self.peak, base, values[kept])
+
+    def merge(self, other):
+        """Fold another accumulator with the same bin width into this one."""
+        self._grow(len(other.hits))
+        n = len(other.hits)
+        self.bits[:n] += other.bits
+        self.hits[:n] += other.hits
+        if self.peak is not None and other.peak is not None:
+            np.maximum(self.peak[:n], other.peak, out=self.peak[:n])
+
+    def series(self, duration):
+        bin_count = int(duration / self.bin_duration) + 1
+        self._grow(bin_count)
+        occupied = np.nonzero(self.hits[:bin_count])[0]
+        centres = occupied * self.bin_duration + self.bin_duration / 2
+        rates = self.bits[occupied] / self.bin_duration
+        return centres.tolist(), rates.tolist()
+
+    def peak_series(self):
+        occupied = np.nonzero(self.peak >= 0)[0]
+        centres = occupied * self.bin_duration + self.bin_duration / 2
+        return centres.tolist(), self.peak[occupied].tolist()
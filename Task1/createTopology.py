@@ -2,164 +2,359 @@
 
 import argparse
 import os
+import signal
+import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from mininet.topo import Topo
 from mininet.net import Mininet
 from mininet.node import OVSSwitch, Controller
 from mininet.link import TCLink
-from mininet.log import setLogLevel, info
+from mininet.log import setLogLevel, info, warn
 from mininet.cli import CLI
 
+IPERF_PORT = 5201
+# Machine-readable client reports. iperf3 3.17+ also has --json-stream (one object per interval,
+# written as the run goes), which iperfJson.py reads as well.
+IPERF_JSON_FLAG = "--json"
+# How long a server/capture/route gets to come up, and how long past its -t a client may run.
+READY_TIMEOUT = 10
+CLIENT_GRACE = 30
+POLL_INTERVAL = 0.05
+# cwnd/ssthresh/RTT/rate samples per socket, taken over netlink inside each host's namespace.
+TCP_SAMPLER = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common", "tcpSampler.py")
+TCP_SAMPLE_INTERVAL = 0.1
+# The analyzers only read headers and the original frame length, so captures keep 128 bytes per
+# frame (Ethernet + IPv4 + TCP with options) and rotate into h7.pcap, h7.pcap1, ... every 100 MB.
+# Payload lengths come from the IP total length on both of common/fastPcap.py's decode paths, never
+# from the bytes kept; tests/test_fastPcap.py checks that for tagged and IP-options frames too.
+CAPTURE_SNAPLEN = 128
+CAPTURE_ROTATE_MB = 100
+
 def create_dir(path):
     """Create a directory if it does not exist."""
     if not os.path.exists(path):
         os.makedirs(path)
 
-def store_tcp_info(host, filename):
-    """Run 'ss -ti' on the host and store the output in the given file."""
-    output = host.cmd("ss -ti")
-    with open(filename, "w") as f:
-        f.write(output)
+def start_tcp_sampler(group, host, filename, interval=TCP_SAMPLE_INTERVAL):
+    """Sample tcp_info of every TCP socket on host into filename until the group is stopped.
+    Load the result with common.tcpSampler.load_samples / per_flow."""
+    return group.start(host, "%s %s --out %s --interval %g" % (sys.executable, TCP_SAMPLER, filename, interval))
 
-def run_iperf_server(host, port=5201, logfile=""):
-    info("Starting iperf3 server on %s\n" % host.name)
-    if logfile:
-        host.cmd("iperf3 -s -p %d --one-off > %s 2>&1 &" % (port, logfile))
-    else:
-        host.cmd("iperf3 -s -p %d --one-off &" % port)
+def set_tcp_cc(host, cc):
+    """Make cc the default congestion control for new sockets in host's network namespace.
+
+    net.ipv4.tcp_congestion_control is per namespace (Linux 4.15+), so every Mininet host can run
+    its own scheme without touching the root namespace. iperf3 -C additionally selects cc on each
+    socket it opens (TCP_CONGESTION), so the server's accepted sockets follow the client either way.
+    """
+    if cc != "reno":
+        host.cmd("modprobe tcp_%s" % cc)    # modules are global; loading twice is a no-op
+    host.cmd("sysctl -q -w net.ipv4.tcp_congestion_control=%s" % cc)
+    current = host.cmd("sysctl -n net.ipv4.tcp_congestion_control").strip()
+    if current != cc:
+        raise RuntimeError("could not switch %s to %s congestion control (still %s)" % (host.name, cc, current))
+
+def flush_tcp_metrics(host):
+    """Forget the per-destination ssthresh/RTT the kernel cached from earlier connections, so a
+    run does not start from what the previous scheme learned."""
+    host.cmd("ip tcp_metrics flush all")
+
+def wait_for(condition, timeout, what):
+    """Poll condition() until it is true or timeout seconds pass. Returns whether it came true."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            warn("Timed out after %ds waiting for %s\n" % (timeout, what))
+            return False
+        time.sleep(POLL_INTERVAL)
+    return True
+
+def wait_listening(host, port, timeout=READY_TIMEOUT):
+    """Wait until something on host is listening on TCP port."""
+    return wait_for(lambda: host.cmd("ss -Hltn 'sport = :%d'" % port).strip() != "", timeout,
+                    "%s to listen on port %d" % (host.name, port))
+
+def wait_reachable(src, dst, timeout=READY_TIMEOUT):
+    """Wait until src can ping dst, e.g. after links were taken down or brought back up."""
+    return wait_for(lambda: "ok" in src.cmd("ping -c1 -W1 %s >/dev/null 2>&1 && echo ok" % dst.IP()), timeout,
+                    "%s to reach %s" % (src.name, dst.name))
+
+class Timeline:
+    """Start times measured from one monotonic origin, so staggered starts do not drift."""
+
+    def __init__(self):
+        self.origin = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.origin
 
-def run_iperf_client(host, server_ip, port=5201, duration=150, cc="reno", parallel=10, logfile=""):
-    """Run an iperf3 client on host to connect to server_ip, storing output in logfile if provided."""
-    cmd = "iperf3 -c %s -p %d -b 15M -P 10 -t %d -C %s" % (server_ip, port, duration, cc)
+    def wait_until(self, offset):
+        """Block until `offset` seconds after the origin (returns at once if already past)."""
+        delay = self.origin + offset - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+class ProcessGroup:
+    """Processes started on Mininet hosts with host.popen, tracked so the experiment can wait on
+    their completion and clean up exactly what it started instead of pkill-ing by name."""
+
+    def __init__(self):
+        self.procs = []
+
+    def start(self, host, cmd, logfile=None):
+        out = open(logfile, "w") if logfile else subprocess.DEVNULL
+        try:
+            proc = host.popen(cmd.split(), stdout=out, stderr=subprocess.STDOUT)
+        finally:
+            if logfile:
+                out.close()     # the child keeps its own descriptor
+        proc.label = "%s: %s" % (host.name, cmd)
+        self.procs.append(proc)
+        return proc
+
+    def wait(self, procs, timeout):
+        """Wait for procs to exit, all within timeout seconds. Returns False if any did not."""
+        deadline = time.monotonic() + timeout
+        finished = True
+        for proc in procs:
+            try:
+                proc.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                warn("Timed out after %ds waiting for %s\n" % (timeout, proc.label))
+                finished = False
+        return finished
+
+    def stop(self, procs=None, sig=signal.SIGTERM, timeout=5):
+        """Signal the still-running procs (default: all of them) and reap them, killing stragglers."""
+        procs = self.procs if procs is None else procs
+        for proc in procs:
+            if proc.poll() is None:
+                proc.send_signal(sig)
+        for proc in procs:
+            try:
+                proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        self.procs = [proc for proc in self.procs if proc not in procs]
+
+def start_capture(group, host, intf, pcap_file):
+    """Header-only, rotated tcpdump on intf, returned once the pcap header has been written."""
+    # -U flushes every packet so Task1/liveAnalyser.py can follow the capture during the run;
+    # -Z root keeps the rights to open the rotated files in the results directory.
+    proc = group.start(host, "tcpdump -U -s %d -C %d -Z root -i %s -w %s"
+                       % (CAPTURE_SNAPLEN, CAPTURE_ROTATE_MB, intf, pcap_file))
+    wait_for(lambda: os.path.exists(pcap_file) and os.path.getsize(pcap_file) > 0, READY_TIMEOUT,
+             "tcpdump on %s" % intf)
+    return proc
+
+def run_iperf_server(group, host, port=IPERF_PORT, logfile=""):
+    """Start an iperf3 server on host and return it once it is listening."""
+    info("Starting iperf3 server on %s:%d\n" % (host.name, port))
+    proc = group.start(host, "iperf3 -s -p %d" % port, logfile or None)
+    wait_listening(host, port)
+    return proc
+
+def run_iperf_client(group, host, server_ip, port=IPERF_PORT, duration=150, cc="reno", rate="15M", parallel=10, logfile=""):
+    """Start an iperf3 client on host against server_ip.
+
+    With a logfile the client writes its JSON report there (IPERF_JSON_FLAG); Task1/iperfJson.py
+    loads it into per-interval arrays without going back to the pcap.
+    """
+    cmd = "iperf3 -c %s -p %d -b %s -P %d -t %d -C %s" % (server_ip, port, rate, parallel, duration, cc)
     if logfile:
-        cmd += " > %s 2>&1" % logfile
+        cmd += " %s --logfile %s" % (IPERF_JSON_FLAG, logfile)
     info("Starting iperf3 client on %s:\n  %s\n" % (host.name, cmd))
-    return host.cmd(cmd)
+    return group.start(host, cmd)
 
+def add_congestion_cell(topo, bw_config=False, loss_rate=0, prefix="", subnet=None):
+    """Add one copy of the experiment topology to topo.
+
+    Every node name gets `prefix`. With a `subnet` index the hosts are numbered 10.<subnet>.0.<n>/24
+    and the switches get DPIDs of their own, so several copies can live in one Mininet (the
+    default DPID comes from the first number in the switch name, which prefixed copies share).
+    """
+    def switch(n):
+        opts = {} if subnet is None else {'dpid': "%016x" % (subnet << 8 | n)}
+        return topo.addSwitch("%ss%d" % (prefix, n), **opts)
+
+    def host(n):
+        opts = {} if subnet is None else {'ip': "10.%d.0.%d/24" % (subnet, n)}
+        return topo.addHost("%sh%d" % (prefix, n), **opts)
+
+    s1 = switch(1)
+    s2 = switch(2)
+    s3 = switch(3)
+    s4 = switch(4)
+
+    h1 = host(1)
+    h2 = host(2)
+    h3 = host(3)
+    h4 = host(4)
+    h5 = host(5)
+    h6 = host(6)
+    h7 = host(7)
+
+    topo.addLink(h1, s1, cls=TCLink)
+    topo.addLink(h2, s1, cls=TCLink)
+    topo.addLink(h3, s2, cls=TCLink)
+    topo.addLink(h4, s3, cls=TCLink)
+    topo.addLink(h5, s3, cls=TCLink)
+    topo.addLink(h6, s4, cls=TCLink)
+    topo.addLink(h7, s4, cls=TCLink)
+
+    # Create switch-switch links.
+    if bw_config:
+        # For experiment (c), configure bandwidth and loss on the chain links.
+        topo.addLink(s1, s2, cls=TCLink, bw=100)       # 100Mbps
+        topo.addLink(s2, s3, cls=TCLink, bw=50, loss=loss_rate)  # 50Mbps with loss
+        topo.addLink(s3, s4, cls=TCLink, bw=100)       # 100Mbps
+        # Extra links used only in experiment (c)
+        topo.addLink(s2, s4, cls=TCLink)
+        topo.addLink(s1, s4, cls=TCLink)
+    else:
+        # For experiments (a) and (b): only the chain links.
+        topo.addLink(s1, s2, cls=TCLink)
+        topo.addLink(s2, s3, cls=TCLink)
+        topo.addLink(s3, s4, cls=TCLink)
 
 class CongestionTopo(Topo):
     def build(self, bw_config=False, loss_rate=0):
-        s1 = self.addSwitch('s1')
-        s2 = self.addSwitch('s2')
-        s3 = self.addSwitch('s3')
-        s4 = self.addSwitch('s4')
-
-        h1 = self.addHost('h1')
-        h2 = self.addHost('h2')
-        h3 = self.addHost('h3')
-        h4 = self.addHost('h4')
-        h5 = self.addHost('h5')
-        h6 = self.addHost('h6')
-        h7 = self.addHost('h7')
-
-        self.addLink(h1, s1, cls=TCLink)
-        self.addLink(h2, s1, cls=TCLink)
-        self.addLink(h3, s2, cls=TCLink)
-        self.addLink(h4, s3, cls=TCLink)
-        self.addLink(h5, s3, cls=TCLink)
-        self.addLink(h6, s4, cls=TCLink)
-        self.addLink(h7, s4, cls=TCLink)
-
-        # Create switch-switch links.
-        if bw_config:
-            # For experiment (c), configure bandwidth and loss on the chain links.
-            self.addLink(s1, s2, cls=TCLink, bw=100)       # 100Mbps
-            self.addLink(s2, s3, cls=TCLink, bw=50, loss=loss_rate)  # 50Mbps with loss
-            self.addLink(s3, s4, cls=TCLink, bw=100)       # 100Mbps
-            # Extra links used only in experiment (c)
-            self.addLink(s2, s4, cls=TCLink)
-            self.addLink(s1, s4, cls=TCLink)
-        else:
-            # For experiments (a) and (b): only the chain links.
-            self.addLink(s1, s2, cls=TCLink)
-            self.addLink(s2, s3, cls=TCLink)
-            self.addLink(s3, s4, cls=TCLink)
-
-
-
-def experiment_a(net, cc):
+        add_congestion_cell(self, bw_config, loss_rate)
+
+def cell_prefix(index):
+    return "m%d" % index
+
+class MatrixTopo(Topo):
+    """Isolated CongestionTopo copies side by side, one per (bw_config, loss_rate) in cells.
+
+    Copy i has node names prefixed with cell_prefix(i) and hosts in 10.<i+1>.0.0/24; no link joins
+    two copies.
+    """
+    def build(self, cells=()):
+        for index, (bw_config, loss_rate) in enumerate(cells):
+            add_congestion_cell(self, bw_config, loss_rate, prefix=cell_prefix(index), subnet=index + 1)
+
+class CellView:
+    """One copy inside a MatrixTopo network, addressed by the plain names the experiments use."""
+
+    def __init__(self, net, prefix):
+        self.net = net
+        self.prefix = prefix
+
+    def get(self, name):
+        return self.net.get(self.prefix + name)
+
+    def configLinkStatus(self, src, dst, status):
+        self.net.configLinkStatus(self.prefix + src, self.prefix + dst, status)
+
+
+
+def experiment_a(net, cc, result_dir=None):
 
     info("\n***** Running Experiment (a) *****\n")
-    result_dir = "results/experiment_a/cc_%s" % cc
+    result_dir = result_dir or "results/experiment_a/cc_%s" % cc
     create_dir(result_dir)
     
     h1 = net.get('h1')
     h7 = net.get('h7')
-    # set_tcp_cc(h1, cc)
-    # set_tcp_cc(h7, cc)
+    set_tcp_cc(h1, cc)
+    set_tcp_cc(h7, cc)
     
     server_log = os.path.join(result_dir, "h7_server.log")
-    client_log = os.path.join(result_dir, "h1_client.log")
-    pcap_h1_log = os.path.join(result_dir, "h1.pcap")
+    client_log = os.path.join(result_dir, "h1_client.json")
     pcap_h7_log = os.path.join(result_dir, "h7.pcap")
     
-    h7.cmd("tcpdump -i h7-eth0 -w %s &" % pcap_h7_log)
-    h7.cmd(f"iperf3 -s -p 5201 > {server_log} 2>&1 &")
-    # run_iperf_server(h7, logfile=server_log)
-    time.sleep(2)
-    
-    print("Here")
-    info("Starting iperf client on h1...\n")
-    run_iperf_client(h1, h7.IP(), duration=150, cc=cc, logfile=client_log)
-    print("Here1")
-    info("Client finished. Waiting 5 seconds...\n")
-    time.sleep(5)
-    # Terminate iperf server process
-    h7.cmd('pkill -f "tcpdump -i h7-eth0"')
-    h7.cmd("pkill -f iperf3")
+    group = ProcessGroup()
+    start_capture(group, h7, h7.defaultIntf().name, pcap_h7_log)
+    for host in [h1, h7]:
+        start_tcp_sampler(group, host, os.path.join(result_dir, f"{host.name}_tcp_info.bin"))
+    run_iperf_server(group, h7, logfile=server_log)
+
+    client = run_iperf_client(group, h1, h7.IP(), duration=150, cc=cc, logfile=client_log)
+    group.wait([client], 150 + CLIENT_GRACE)
+    info("Client finished.\n")
+    # Stops the iperf server and tcpdump (which flushes the pcap on SIGTERM).
+    group.stop()
 
     info("Experiment (a) completed. Results stored in %s\n" % result_dir)
 
-def experiment_b(net, cc):
+def experiment_b(net, cc, result_dir=None):
     """
     Experiment (b): Staggered flows.
       - h1 runs for 150s (starting at T=0), h3 for 120s (starting at T=15),
         and h4 for 90s (starting at T=30). Note: h4 is connected to s3.
       - Uses only chain links.
       - Stores iperf logs and TCP info for each host.
+      An iperf3 server runs one test at a time, so each client gets its own server port on h7.
     """
     info("\n***** Running Experiment (b) *****\n")
-    result_dir = f"results/experiment_b/{cc}/"
+    result_dir = result_dir or f"results/experiment_b/{cc}/"
     create_dir(result_dir)
     
-    h1 = net.get('h1')
-    h3 = net.get('h3')
-    h4 = net.get('h4')
     h7 = net.get('h7')
+    schedule = [  # (start offset, host, duration)
+        (0, net.get('h1'), 150),
+        (15, net.get('h3'), 120),
+        (30, net.get('h4'), 90),
+    ]
 
-    server_log = os.path.join(result_dir, "h7_server.log")
-    h1_client_log = os.path.join(result_dir, "h1_client.log")
-    h3_client_log = os.path.join(result_dir, "h3_client.log")
-    h4_client_log = os.path.join(result_dir, "h4_client.log")
-    
-    info("Starting iperf server on h7...\n")
-    # 'while true; do iperf3 -s -p 5201 --one-off; done'
-    h7.cmd(f"while true; do iperf3 -s -p 5201 --one-off; done > {server_log} 2>&1 &")
-    info("Server started... \n")
-    time.sleep(2)
-    
-    info("Starting iperf client on h1 (duration 150s)...\n")
-    h1.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 150 -C %s > %s 2>&1 &" % (h7.IP(), cc, h1_client_log))
+    for host in [h7] + [host for _, host, _ in schedule]:
+        set_tcp_cc(host, cc)
 
-    info("Waiting 15 seconds before starting h3...\n")
-    time.sleep(15)
+    group = ProcessGroup()
+    info("Starting iperf servers on h7...\n")
+    for i, (_, host, _) in enumerate(schedule):
+        run_iperf_server(group, h7, IPERF_PORT + i, os.path.join(result_dir, f"h7_server_{host.name}.log"))
+    info("Servers started... \n")
+    for host in [h7] + [host for _, host, _ in schedule]:
+        start_tcp_sampler(group, host, os.path.join(result_dir, f"{host.name}_tcp_info.bin"))
 
-    info("\nStarting iperf client on h3 (duration 120s)...\n")
-    h3.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 120 -C %s > %s 2>&1 &" % (h7.IP(), cc, h3_client_log))
+    timeline = Timeline()
+    clients = []
+    for i, (offset, host, duration) in enumerate(schedule):
+        timeline.wait_until(offset)
+        info("\nStarting iperf client on %s at T=%.2fs (duration %ds)...\n" % (host.name, timeline.elapsed(), duration))
+        clients.append(run_iperf_client(group, host, h7.IP(), IPERF_PORT + i, duration, cc, rate="10M",
+                                        logfile=os.path.join(result_dir, f"{host.name}_client.json")))
 
-    info("Waiting 15 seconds before starting h4...\n")
-    time.sleep(15)
-    
-    info("\nStarting iperf client on h4 (duration 90s)...\n")
-    h4.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 90 -C %s > %s 2>&1 &" % (h7.IP(), cc, h4_client_log))
-    time.sleep(120+5)
-    
-    # Terminate iperf server and remaining processes
-    h7.cmd("pkill -f iperf3")
-    info("Experiment (b) completed. Results stored in %s\n" % result_dir)
+    # Every client is due to finish at T=150; give them the same grace as in (a).
+    group.wait(clients, max(offset + duration for offset, _, duration in schedule) - timeline.elapsed() + CLIENT_GRACE)
+    group.stop()
+    info("Experiment (b) completed in %.1fs. Results stored in %s\n" % (timeline.elapsed(), result_dir))
+
+CHAIN_AND_EXTRA_LINKS = [('s1', 's2'), ('s2', 's3'), ('s3', 's4'), ('s2', 's4'), ('s1', 's4')]
 
-def experiment_c(net, cc, loss_rate):
+def run_sub_experiment(net, result_dir, active_link, client_names, cc, rate, duration=150):
+    """One part of experiment (c): only `active_link` of the inter-switch links is up while the
+    listed clients send to h7 at the same time. Links are restored afterwards."""
+    create_dir(result_dir)
+    h7 = net.get('h7')
+    clients = [net.get(name) for name in client_names]
+    down = [link for link in CHAIN_AND_EXTRA_LINKS if link != active_link]
+    for a, b in down:
+        net.configLinkStatus(a, b, 'down')
+    for host in clients:
+        wait_reachable(host, h7)
+
+    group = ProcessGroup()
+    procs = []
+    for host in clients + [h7]:
+        start_tcp_sampler(group, host, os.path.join(result_dir, f"{host.name}_tcp_info.bin"))
+    for i, host in enumerate(clients):
+        run_iperf_server(group, h7, IPERF_PORT + i, os.path.join(result_dir, f"h7_server_{host.name}.log"))
+    for i, host in enumerate(clients):
+        procs.append(run_iperf_client(group, host, h7.IP(), IPERF_PORT + i, duration, cc, rate=rate,
+                                      logfile=os.path.join(result_dir, f"{host.name}_client.json")))
+    group.wait(procs, duration + CLIENT_GRACE)
+    group.stop()
+
+    for a, b in down:
+        net.configLinkStatus(a, b, 'up')
+
+def experiment_c(net, cc, loss_rate, result_dir=None):
     """
     Experiment (c): Bandwidth-limited and lossy links with extra links.
       The experiment is divided into four sub-experiments:
@@ -170,146 +365,110 @@ def experiment_c(net, cc, loss_rate):
       For each sub-experiment, logs and TCP info are stored in dedicated subdirectories.
     """
     info("\n***** Running Experiment (c) *****\n")
-    base_dir = "results/experiment_c"
+    base_dir = result_dir or "results/experiment_c"
     create_dir(base_dir)
     
-    h1 = net.get('h1')
-    h2 = net.get('h2')
-    h3 = net.get('h3')
-    h4 = net.get('h4')
-    h7 = net.get('h7')
-    for host in [h1, h2, h3, h4, h7]:
-        set_tcp_cc(host, cc)
+    for name in ['h1', 'h2', 'h3', 'h4', 'h7']:
+        set_tcp_cc(net.get(name), cc)
     
-    # Sub-experiment c1: Only link s2-s4 active (client: h3)
-    c1_dir = os.path.join(base_dir, "c1")
-    create_dir(c1_dir)
-    server_log = os.path.join(c1_dir, "h7_server.log")
-    client_log = os.path.join(c1_dir, "h3_client.log")
-    tcpinfo_h3_log = os.path.join(c1_dir, "h3_tcp_info.log")
-    tcpinfo_h7_log = os.path.join(c1_dir, "h7_tcp_info.log")
     info("\n--- Experiment (c1): Only link s2-s4 active (h3 -> h7) ---\n")
-    net.configLinkStatus('s1', 's2', 'down')
-    net.configLinkStatus('s2', 's3', 'down')
-    net.configLinkStatus('s3', 's4', 'down')
-    net.configLinkStatus('s1', 's4', 'down')
-    time.sleep(2)
-    run_iperf_server(h7, logfile=server_log)
-    time.sleep(2)
-    run_iperf_client(h3, h7.IP(), duration=150, cc=cc, logfile=client_log)
-    time.sleep(5)
-    h7.cmd("pkill -f iperf3")
-    store_tcp_info(h3, tcpinfo_h3_log)
-    store_tcp_info(h7, tcpinfo_h7_log)
-    # Restore links
-    net.configLinkStatus('s1', 's2', 'up')
-    net.configLinkStatus('s2', 's3', 'up')
-    net.configLinkStatus('s3', 's4', 'up')
-    net.configLinkStatus('s1', 's4', 'up')
-    time.sleep(5)
-    
-    # Sub-experiment c2a: Only link s1-s4 active with clients h1 and h2
-    c2a_dir = os.path.join(base_dir, "c2a")
-    create_dir(c2a_dir)
-    server_log = os.path.join(c2a_dir, "h7_server.log")
-    h1_client_log = os.path.join(c2a_dir, "h1_client.log")
-    h2_client_log = os.path.join(c2a_dir, "h2_client.log")
-    tcpinfo_h1_log = os.path.join(c2a_dir, "h1_tcp_info.log")
-    tcpinfo_h2_log = os.path.join(c2a_dir, "h2_tcp_info.log")
-    tcpinfo_h7_log = os.path.join(c2a_dir, "h7_tcp_info.log")
+    run_sub_experiment(net, os.path.join(base_dir, "c1"), ('s2', 's4'), ['h3'], cc, rate="15M")
+
     info("\n--- Experiment (c2a): Only link s1-s4 active (h1, h2 -> h7) ---\n")
-    net.configLinkStatus('s1', 's2', 'down')
-    net.configLinkStatus('s2', 's3', 'down')
-    net.configLinkStatus('s3', 's4', 'down')
-    net.configLinkStatus('s2', 's4', 'down')
-    time.sleep(2)
-    run_iperf_server(h7, logfile=server_log)
-    time.sleep(2)
-    h1.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 150 -C %s > %s 2>&1 &" % (h7.IP(), cc, h1_client_log))
-    h2.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 150 -C %s > %s 2>&1 &" % (h7.IP(), cc, h2_client_log))
-    time.sleep(150)
-    h7.cmd("pkill -f iperf3")
-    store_tcp_info(h1, tcpinfo_h1_log)
-    store_tcp_info(h2, tcpinfo_h2_log)
-    store_tcp_info(h7, tcpinfo_h7_log)
-    # Restore links
-    net.configLinkStatus('s1', 's2', 'up')
-    net.configLinkStatus('s2', 's3', 'up')
-    net.configLinkStatus('s3', 's4', 'up')
-    net.configLinkStatus('s2', 's4', 'up')
-    time.sleep(5)
-    
-    # Sub-experiment c2b: Only link s1-s4 active with clients h1 and h3
-    c2b_dir = os.path.join(base_dir, "c2b")
-    create_dir(c2b_dir)
-    server_log = os.path.join(c2b_dir, "h7_server.log")
-    h1_client_log = os.path.join(c2b_dir, "h1_client.log")
-    h3_client_log = os.path.join(c2b_dir, "h3_client.log")
-    tcpinfo_h1_log = os.path.join(c2b_dir, "h1_tcp_info.log")
-    tcpinfo_h3_log = os.path.join(c2b_dir, "h3_tcp_info.log")
-    tcpinfo_h7_log = os.path.join(c2b_dir, "h7_tcp_info.log")
+    run_sub_experiment(net, os.path.join(base_dir, "c2a"), ('s1', 's4'), ['h1', 'h2'], cc, rate="10M")
+
     info("\n--- Experiment (c2b): Only link s1-s4 active (h1, h3 -> h7) ---\n")
-    net.configLinkStatus('s1', 's2', 'down')
-    net.configLinkStatus('s2', 's3', 'down')
-    net.configLinkStatus('s3', 's4', 'down')
-    net.configLinkStatus('s2', 's4', 'down')
-    time.sleep(2)
-    run_iperf_server(h7, logfile=server_log)
-    time.sleep(2)
-    h1.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 150 -C %s > %s 2>&1 &" % (h7.IP(), cc, h1_client_log))
-    h3.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 150 -C %s > %s 2>&1 &" % (h7.IP(), cc, h3_client_log))
-    time.sleep(150)
-    h7.cmd("pkill -f iperf3")
-    store_tcp_info(h1, tcpinfo_h1_log)
-    store_tcp_info(h3, tcpinfo_h3_log)
-    store_tcp_info(h7, tcpinfo_h7_log)
-    # Restore links
-    net.configLinkStatus('s1', 's2', 'up')
-    net.configLinkStatus('s2', 's3', 'up')
-    net.configLinkStatus('s3', 's4', 'up')
-    net.configLinkStatus('s2', 's4', 'up')
-    time.sleep(5)
-    
-    # Sub-experiment c2c: Only link s1-s4 active with clients h1, h3, and h4
-    c2c_dir = os.path.join(base_dir, "c2c")
-    create_dir(c2c_dir)
-    server_log = os.path.join(c2c_dir, "h7_server.log")
-    h1_client_log = os.path.join(c2c_dir, "h1_client.log")
-    h3_client_log = os.path.join(c2c_dir, "h3_client.log")
-    h4_client_log = os.path.join(c2c_dir, "h4_client.log")
-    tcpinfo_h1_log = os.path.join(c2c_dir, "h1_tcp_info.log")
-    tcpinfo_h3_log = os.path.join(c2c_dir, "h3_tcp_info.log")
-    tcpinfo_h4_log = os.path.join(c2c_dir, "h4_tcp_info.log")
-    tcpinfo_h7_log = os.path.join(c2c_dir, "h7_tcp_info.log")
+    run_sub_experiment(net, os.path.join(base_dir, "c2b"), ('s1', 's4'), ['h1', 'h3'], cc, rate="10M")
+
     info("\n--- Experiment (c2c): Only link s1-s4 active (h1, h3, h4 -> h7) ---\n")
-    net.configLinkStatus('s1', 's2', 'down')
-    net.configLinkStatus('s2', 's3', 'down')
-    net.configLinkStatus('s3', 's4', 'down')
-    net.configLinkStatus('s2', 's4', 'down')
-    time.sleep(2)
-    run_iperf_server(h7, logfile=server_log)
-    time.sleep(2)
-    h1.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 150 -C %s > %s 2>&1 &" % (h7.IP(), cc, h1_client_log))
-    h3.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 150 -C %s > %s 2>&1 &" % (h7.IP(), cc, h3_client_log))
-    h4.cmd("iperf3 -c %s -p 5201 -b 10M -P 10 -t 150 -C %s > %s 2>&1 &" % (h7.IP(), cc, h4_client_log))
-    time.sleep(150)
-    h7.cmd("pkill -f iperf3")
-    store_tcp_info(h1, tcpinfo_h1_log)
-    store_tcp_info(h3, tcpinfo_h3_log)
-    store_tcp_info(h4, tcpinfo_h4_log)
-    store_tcp_info(h7, tcpinfo_h7_log)
-    # Restore all links (ensure extra links are up)
-    net.configLinkStatus('s1', 's2', 'up')
-    net.configLinkStatus('s2', 's3', 'up')
-    net.configLinkStatus('s3', 's4', 'up')
-    net.configLinkStatus('s2', 's4', 'up')
-    net.configLinkStatus('s1', 's4', 'up')
-    time.sleep(5)
+    run_sub_experiment(net, os.path.join(base_dir, "c2c"), ('s1', 's4'), ['h1', 'h3', 'h4'], cc, rate="10M")
     
     info("\nExperiment (c) completed. Results stored in %s\n" % base_dir)
 
 
 
+###########################
+# Matrix Runner
+###########################
+
+EXPERIMENTS = {
+    'a': lambda net, cc, loss, result_dir: experiment_a(net, cc, result_dir),
+    'b': lambda net, cc, loss, result_dir: experiment_b(net, cc, result_dir),
+    'c': lambda net, cc, loss, result_dir: experiment_c(net, cc, loss, result_dir),
+}
+
+def cell_result_dir(option, cc, loss):
+    """Where a matrix cell stores its results.
+
+    Loss-free (a) and (b) cells use the single-run locations and lossy (a) cells the
+    experiment_d_loss<N> layout. (c) cells add cc_<cc> below results/experiment_c[_loss<N>]:
+    the single run writes every scheme straight into results/experiment_c, one after the other,
+    but matrix cells of different schemes run at the same time and would overwrite each other's
+    c1/c2* directories.
+
+    Lossy (a) and (b) cells run on the (c) wiring (bandwidth-limited links, extra links held
+    down), since only that wiring has the lossy link; their numbers are therefore not comparable
+    with the loss-free single runs on the unlimited chain.
+    """
+    loss_tag = "%g" % loss
+    if option == 'a':
+        return "results/experiment_a/cc_%s" % cc if not loss else "results/experiment_d_loss%s/cc_%s" % (loss_tag, cc)
+    if option == 'b':
+        return "results/experiment_b/%s/" % cc if not loss else "results/experiment_b_loss%s/%s/" % (loss_tag, cc)
+    return "results/experiment_c/cc_%s" % cc if not loss else "results/experiment_c_loss%s/cc_%s" % (loss_tag, cc)
+
+def run_cell(net, index, option, cc, loss):
+    view = CellView(net, cell_prefix(index))
+    if option != 'c' and loss:
+        # The lossy link only exists in the (c) wiring; keep its extra links down for a loop-free chain.
+        view.configLinkStatus('s2', 's4', 'down')
+        view.configLinkStatus('s1', 's4', 'down')
+        wait_reachable(view.get('h1'), view.get('h7'))
+    start = time.monotonic()
+    EXPERIMENTS[option](view, cc, loss, cell_result_dir(option, cc, loss))
+    return time.monotonic() - start
+
+def run_cells(cells, max_parallel=3, on_result=None):
+    """Run (experiment, cc, loss) cells as isolated topology copies in one Mininet, at most
+    max_parallel at a time so CPU contention does not distort the results.
+
+    on_result(cell, seconds, error) is called as each cell ends (error is None on success).
+    Returns the cells that failed.
+    """
+    topo = MatrixTopo(cells=[(option == 'c' or loss > 0, loss) for option, _, loss in cells])
+    net = Mininet(topo=topo, link=TCLink, switch=OVSSwitch, controller=Controller('c0'), autoStaticArp=True)
+    net.start()
+    info("Mininet is up with %d cells.\n" % len(cells))
+
+    failed = []
+    start = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+            futures = {pool.submit(run_cell, net, index, *cell): (cell, time.monotonic()) for index, cell in enumerate(cells)}
+            for future in as_completed(futures):
+                cell, submitted = futures[future]
+                option, cc, loss = cell
+                try:
+                    seconds, error = future.result(), None
+                    info("*** Cell (%s, %s, loss %g%%) finished in %.1fs\n" % (option, cc, loss, seconds))
+                except Exception as err:
+                    seconds, error = time.monotonic() - submitted, "%s: %s" % (type(err).__name__, err)
+                    warn("*** Cell (%s, %s, loss %g%%) failed: %s\n" % (option, cc, loss, err))
+                    failed.append(cell)
+                if on_result is not None:
+                    on_result(cell, seconds, error)
+    finally:
+        net.stop()
+    info("%d cells completed in %.1fs, %d failed\n" % (len(cells), time.monotonic() - start, len(failed)))
+    return failed
+
+def run_matrix(options, ccs, losses, max_parallel=3):
+    """Run every (experiment, cc, loss) combination with run_cells."""
+    cells = [(option, cc, loss) for option in options for cc in ccs for loss in losses]
+    return run_cells(cells, max_parallel)
+
+
+
 ###########################
 # Main Function
 ###########################
@@ -318,15 +477,34 @@ def main():
     setLogLevel('info')
     parser = argparse.ArgumentParser(description="Mininet Topology for TCP Congestion Control Experiments")
     parser.add_argument('--option', type=str, default='a', help="Experiment option: a, b, or c")
-    parser.add_argument('--cc', type=str, default='reno', help="TCP congestion control scheme: reno, vegas, or htcp")
+    parser.add_argument('--cc', type=str, default='reno', help="TCP congestion control scheme: reno, vegas, or htcp; "
+                        "a comma-separated list runs them back to back on the same network")
     parser.add_argument('--loss', type=float, default=0, help="Link loss rate (in percent) for s2-s3 link (only for experiment c)")
+    parser.add_argument('--matrix', action='store_true', help="Run every combination of --options, --ccs and --losses in one network")
+    parser.add_argument('--options', type=str, default='a,b,c', help="Matrix mode: comma-separated experiments")
+    parser.add_argument('--ccs', type=str, default='reno,vegas,htcp', help="Matrix mode: comma-separated congestion control schemes")
+    parser.add_argument('--losses', type=str, default='0,1,5', help="Matrix mode: comma-separated loss rates (percent)")
+    parser.add_argument('--max-parallel', type=int, default=3, help="Matrix mode: cells running at the same time")
     args = parser.parse_args()
 
     allowed_cc = ['reno', 'vegas', 'htcp']
-    if args.cc.lower() not in allowed_cc:
+    if args.matrix:
+        options = [o.strip() for o in args.options.split(',') if o.strip()]
+        ccs = [c.strip().lower() for c in args.ccs.split(',') if c.strip()]
+        losses = [float(l) for l in args.losses.split(',') if l.strip()]
+        if any(o not in EXPERIMENTS for o in options) or any(c not in allowed_cc for c in ccs):
+            info("Invalid matrix. Experiments: a, b, c; schemes: reno, vegas, htcp\n")
+            sys.exit(1)
+        failed = run_matrix(options, ccs, losses, args.max_parallel)
+        sys.exit(1 if failed else 0)
+
+    cc_schemes = [cc.strip().lower() for cc in args.cc.split(',') if cc.strip()]
+    if not cc_schemes or any(cc not in allowed_cc for cc in cc_schemes):
         info("Invalid TCP congestion control scheme. Allowed: reno, vegas, htcp\n")
         sys.exit(1)
-    cc_scheme = args.cc.lower()
+    if args.option not in EXPERIMENTS:
+        info("Invalid option. Use --option=a, b, or c.\n")
+        sys.exit(1)
 
     # For experiment (c) enable bandwidth configuration and extra links.
     bw_config = True if args.option == 'c' else False
@@ -337,16 +515,12 @@ def main():
     
     info("Mininet is up.\n")
 
-    if args.option == 'a':
-        experiment_a(net, cc_scheme)
-    elif args.option == 'b':
-        experiment_b(net, cc_scheme)
-    elif args.option == 'c':
-        experiment_c(net, cc_scheme, args.loss)
-    else:
-        info("Invalid option. Use --option=a, b, or c.\n")
-        net.stop()
-        sys.exit(1)
+    # One started network serves every scheme: only the hosts' congestion control and cached
+    # TCP metrics change between runs.
+    for cc_scheme in cc_schemes:
+        for host in net.hosts:
+            flush_tcp_metrics(host)
+        EXPERIMENTS[args.option](net, cc_scheme, args.loss, None)
 
     info("\n*** You now have a Mininet CLI for further debugging or capturing. ***\n")
     CLI(net)
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import numpy as np
+
+# Per-stream interval fields loaded into arrays; snd_cwnd/rtt are only reported by the sender.
+INTERVAL_FIELDS = ('bytes', 'bits_per_second', 'retransmits', 'snd_cwnd', 'rtt')
+
+def _skip(text, pos, chars=' \t\r\n'):
+    while pos < len(text) and text[pos] in chars:
+        pos += 1
+    return pos
+
+def read_partial_document(text):
+    """The start section and every complete interval of an iperf3 -J document that was cut off,
+    e.g. because the client was killed before it wrote its end section."""
+    decoder = json.JSONDecoder()
+    doc = {"intervals": []}
+    # "start" is the document's first key, so its first occurrence is the top-level section.
+    found = text.find('"start"')
+    if found >= 0:
+        try:
+            doc["start"] = decoder.raw_decode(text, _skip(text, text.find(':', found) + 1))[0]
+        except ValueError:
+            pass
+    found = text.find('"intervals"')
+    if found < 0:
+        return doc
+    pos = _skip(text, text.find('[', found) + 1)
+    while pos < len(text) and text[pos] == '{':
+        try:
+            interval, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            break  # the interval being written when the file was cut
+        doc["intervals"].append(interval)
+        pos = _skip(text, pos, ' \t\r\n,')
+    return doc
+
+def read_iperf_json(path):
+    """The start/intervals/end/error sections of an iperf3 -J file or a --json-stream file.
+
+    --json-stream (iperf3 3.17+) writes one {"event": ..., "data": ...} object per line instead
+    of a single document; both are turned into the -J layout. Runs that were cut short are still
+    read: a --json-stream file up to its last complete line, a -J document up to its last
+    complete interval (without an end section).
+    """
+    with open(path) as f:
+        text = f.read()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    try:
+        first = json.loads(lines[0]) if lines else None
+    except json.JSONDecodeError:
+        first = None
+    if not isinstance(first, dict) or "event" not in first:
+        return read_partial_document(text)
+    doc = {"intervals": []}
+    for number, line in enumerate(lines):
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            if number == len(lines) - 1:
+                break  # the line being written when the run was cut
+            raise
+        kind, data = event.get("event"), event.get("data")
+        if kind == "interval":
+            doc["intervals"].append(data)
+        elif kind in ("start", "end", "error"):
+            doc[kind] = data
+    return doc
+
+def load_iperf(path):
+    """Per-interval, per-stream arrays from one iperf3 client's JSON output.
+
+    Returns a dict with 'sockets' (one id per stream), 'start'/'end' (seconds, one per interval)
+    and, for every name in INTERVAL_FIELDS, an (intervals, streams) array; 0 where a stream did
+    not report the field. 'error' carries iperf3's error message, if any.
+    """
+    doc = read_iperf_json(path)
+    intervals = doc.get("intervals", [])
+    sockets = sorted({s["socket"] for interval in intervals for s in interval.get("streams", [])})
+    column = {sock: i for i, sock in enumerate(sockets)}
+    run = {
+        "sockets": np.array(sockets, dtype=np.int64),
+        "start": np.array([i["sum"]["start"] if "sum" in i else i["streams"][0]["start"] for i in intervals], dtype=np.float64),
+        "end": np.array([i["sum"]["end"] if "sum" in i else i["streams"][0]["end"] for i in intervals], dtype=np.float64),
+        "error": doc.get("error"),
+        "end_summary": doc.get("end", {}),
+    }
+    for name in INTERVAL_FIELDS:
+        run[name] = np.zeros((len(intervals), len(sockets)), dtype=np.float64 if name == 'bits_per_second' else np.int64)
+    for row, interval in enumerate(intervals):
+        for stream in interval.get("streams", []):
+            col = column[stream["socket"]]
+            for name in INTERVAL_FIELDS:
+                if name in stream:
+                    run[name][row, col] = stream[name]
+    return run
+
+def summarize(run):
+    """Throughput and retransmit summary of a load_iperf() result.
+
+    Totals come from iperf3's end section when present (it also covers the partial last
+    interval); the interval arrays are the fallback for runs that were cut short.
+    """
+    end = run["end_summary"]
+    sent = end.get("sum_sent", {})
+    received = end.get("sum_received", {})
+    duration = float(run["end"][-1] - run["start"][0]) if len(run["end"]) else 0.0
+    interval_bytes = int(run["bytes"].sum())
+    total_bps = run["bits_per_second"].sum(axis=1) if len(run["sockets"]) else np.zeros(0)
+    cwnd = run["snd_cwnd"]
+    return {
+        "streams": len(run["sockets"]),
+        "intervals": len(run["start"]),
+        "duration": sent.get("seconds", duration),
+        "sent_bytes": sent.get("bytes", interval_bytes),
+        "sent_bps": sent.get("bits_per_second", interval_bytes * 8 / duration if duration else 0.0),
+        "received_bps": received.get("bits_per_second", 0.0),
+        "retransmits": sent.get("retransmits", int(run["retransmits"].sum())),
+        "peak_interval_bps": float(total_bps.max()) if len(total_bps) else 0.0,
+        "mean_cwnd": float(cwnd[cwnd > 0].mean()) if (cwnd > 0).any() else 0.0,
+        "max_cwnd": int(cwnd.max()) if cwnd.size else 0,
+        "error": run["error"],
+    }
+
+def find_iperf_logs(root):
+    """Every iperf3 client JSON file below root, in a stable order."""
+    logs = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith("_client.json"):
+                logs.append(os.path.join(dirpath, name))
+    return sorted(logs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the iperf3 JSON client logs under a results tree")
+    parser.add_argument('--root', type=str, default="results", help="Results tree to search for *_client.json files")
+    args = parser.parse_args()
+
+    for log in find_iperf_logs(args.root):
+        try:
+            s = summarize(load_iperf(log))
+        except (OSError, ValueError, KeyError) as err:
+            print(f"{log}: unreadable ({err})")
+            continue
+        status = f"  ERROR: {s['error']}" if s['error'] else ""
+        print(f"{log}: {s['sent_bps'] / 1e6:.2f} Mbit/s sent, {s['received_bps'] / 1e6:.2f} Mbit/s received, "
+              f"{s['retransmits']} retransmits, {s['streams']} streams, max cwnd {s['max_cwnd']}{status}")
@@ -0,0 +1,212 @@
+import argparse
+import mmap
+import os
+import pickle
+import signal
+import sys
+import tempfile
+import time
+from pcapAnalyser import StreamingMetrics, peak_rss_mb
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.fastPcap import read_file_header, walk_records, decode_records, capture_files, FILE_HEADER_LEN, DLT_EN10MB
+
+# Bump whenever StreamingMetrics or the checkpoint layout changes so old checkpoints are ignored.
+CHECKPOINT_VERSION = 2
+CHECKPOINT_SUFFIX = ".live.ckpt"
+
+class LiveCapture:
+    """A pcap that is still being written, read incrementally from a saved byte offset.
+
+    Each poll() decodes the complete records that appeared since the last one and feeds them to
+    a StreamingMetrics; a record tcpdump has only half written is left for the next poll. When
+    tcpdump rotates (-C), the next numbered file of the set appears once the current one is
+    closed, and the follower moves on to it after reading what is left. The member index, offset,
+    file identity and metrics together form the checkpoint.
+    """
+
+    def __init__(self, file_path, bin_duration=0.2):
+        self.file_path = file_path
+        self.bin_duration = bin_duration
+        self.reset()
+
+    def reset(self):
+        self.member = 0
+        self.open_member(0)
+        self.metrics = StreamingMetrics(self.bin_duration)
+
+    def open_member(self, member):
+        self.member = member
+        self.offset = FILE_HEADER_LEN
+        self.header = None      # first FILE_HEADER_LEN bytes, to notice the file being replaced
+        self.inode = None
+        self.endian = None
+        self.divisor = None
+
+    def poll(self, max_records=1 << 18):
+        """Consume up to max_records new complete records. Returns how many were read."""
+        members = capture_files(self.file_path)
+        if self.member >= len(members):
+            if self.inode is not None:
+                print(f"{self.file_path} lost files of its capture set, starting over")
+                self.reset()
+            return 0
+        path = members[self.member]
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return 0
+        if self.inode is not None and (st.st_ino != self.inode or st.st_size < self.offset):
+            print(f"{path} was truncated or replaced, starting over")
+            self.reset()
+            return 0
+        if st.st_size < FILE_HEADER_LEN or st.st_size == self.offset:
+            return self.next_member(members, max_records)
+
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if self.header is None:
+                    self.endian, self.divisor, linktype = read_file_header(buf)
+                    if linktype != DLT_EN10MB:
+                        raise ValueError(f"unsupported link type {linktype}, expected Ethernet")
+                    self.header = bytes(buf[:FILE_HEADER_LEN])
+                    self.inode = st.st_ino
+                elif buf[:FILE_HEADER_LEN] != self.header:
+                    print(f"{path} has a different pcap header, starting over")
+                    self.reset()
+                    return 0
+                offsets, end = walk_records(buf, self.offset, self.endian, limit=max_records)
+                if not len(offsets):
+                    return self.next_member(members, max_records)
+                packets = decode_records(buf, offsets, self.endian, self.divisor)
+        self.metrics.feed(packets)
+        self.offset = end
+        return len(offsets)
+
+    def next_member(self, members, max_records):
+        """Move to the next file of a rotated set once it exists: tcpdump has closed this one."""
+        if self.header is None or self.member + 1 >= len(members):
+            return 0
+        self.open_member(self.member + 1)
+        return self.poll(max_records)
+
+    def catch_up(self, max_records=1 << 18):
+        """poll() until no complete record is left. Returns the total read."""
+        total = 0
+        while True:
+            count = self.poll(max_records)
+            if not count:
+                return total
+            total += count
+
+    def save(self, checkpoint):
+        """Atomically write the state to `checkpoint`."""
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "file_path": os.path.abspath(self.file_path),
+            "bin_duration": self.bin_duration,
+            "member": self.member,
+            "offset": self.offset,
+            "header": self.header,
+            "inode": self.inode,
+            "endian": self.endian,
+            "divisor": self.divisor,
+            "metrics": self.metrics,
+        }
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(checkpoint)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, checkpoint)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def restore(self, checkpoint):
+        """Resume from `checkpoint` if it belongs to this capture. Returns True when it was used."""
+        try:
+            with open(checkpoint, 'rb') as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as err:
+            print(f"WARNING: ignoring unreadable checkpoint {checkpoint}: {err}")
+            return False
+        if (state.get("version") != CHECKPOINT_VERSION
+                or state["file_path"] != os.path.abspath(self.file_path)
+                or state["bin_duration"] != self.bin_duration):
+            return False
+        members = capture_files(self.file_path)
+        if state["member"] >= len(members):
+            return False
+        try:
+            st = os.stat(members[state["member"]])
+            with open(members[state["member"]], 'rb') as f:
+                header = f.read(FILE_HEADER_LEN)
+        except FileNotFoundError:
+            return False
+        if st.st_ino != state["inode"] or st.st_size < state["offset"] or header != state["header"]:
+            return False
+        for name in ("member", "offset", "header", "inode", "endian", "divisor", "metrics"):
+            setattr(self, name, state[name])
+        return True
+
+def follow_capture(file_path, plot_dir, result_dir, bin_duration=0.2, interval=1.0, plot_every=10.0,
+                   idle_timeout=None, checkpoint=None):
+    """Tail file_path while it grows, keeping the metrics file (and, every plot_every seconds,
+    the plots) up to date.
+
+    Stops once the file has not grown for idle_timeout seconds (never if None; idle_timeout=0
+    catches up once and exits) or on Ctrl-C / SIGTERM, then writes the final plots and metrics.
+    State is checkpointed to `checkpoint` (default <pcap>.live.ckpt) so a restarted follower, or
+    the post-run analysis, only reads what was appended since.
+    """
+    checkpoint = checkpoint or file_path + CHECKPOINT_SUFFIX
+    live = LiveCapture(file_path, bin_duration)
+    if live.restore(checkpoint):
+        print(f"Resuming {file_path} at byte {live.offset}")
+
+    stopping = []
+    previous = signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    last_growth = time.monotonic()
+    last_plot = float('-inf')
+    try:
+        while not stopping:
+            if live.catch_up():
+                last_growth = time.monotonic()
+                live.save(checkpoint)
+                now = time.monotonic()
+                plots = now - last_plot >= plot_every
+                if live.metrics.write(file_path, plot_dir, result_dir, plots=plots) and plots:
+                    last_plot = now
+            if idle_timeout is not None and time.monotonic() - last_growth >= idle_timeout:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+    live.catch_up()
+    live.save(checkpoint)
+    rss = peak_rss_mb()
+    if live.metrics.write(file_path, plot_dir, result_dir, peak_rss=rss):
+        print(f"{os.path.basename(file_path)}: {live.metrics.total_packets} TCP packets, peak RSS {rss:.1f} MB")
+    return live.metrics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow a pcap tcpdump is still writing and keep Task1 metrics up to date")
+    parser.add_argument('--input', type=str, required=True, help="Capture file to follow")
+    parser.add_argument('--output', type=str, default="plots", help="Folder for plots and metrics")
+    parser.add_argument('--bin', type=float, default=0.2, help="Bin width in seconds")
+    parser.add_argument('--interval', type=float, default=1.0, help="Seconds between polls")
+    parser.add_argument('--plot-every', type=float, default=10.0, help="Seconds between plot refreshes")
+    parser.add_argument('--idle', type=float, default=None, help="Stop after the file has not grown for this many seconds")
+    parser.add_argument('--once', action='store_true', help="Catch up to the end of the file and exit (same as --idle 0)")
+    parser.add_argument('--checkpoint', type=str, default=None, help="Checkpoint file (default: <input>.live.ckpt)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    follow_capture(args.input, args.output, args.output, bin_duration=args.bin, interval=args.interval,
+                   plot_every=args.plot_every, idle_timeout=0 if args.once else args.idle, checkpoint=args.checkpoint)
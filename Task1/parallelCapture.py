@@ -0,0 +1,187 @@
+import mmap
+import os
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from binning import RunningBins
+from pcapAnalyser import create_visualization, store_metrics
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.fastPcap import (read_file_header, walk_records, decode_records, relative_times, timestamps_us,
+                             capture_files, FILE_HEADER_LEN, KIND_TCP)
+from common.seqTracker import FlowTracker, carry_state
+
+def build_index(file_path):
+    """Pre-pass over a capture (one pcap or a rotated set): byte offset of every record.
+
+    Returns (index, origin_us) where index lists (member_file, offsets) in capture order and
+    origin_us is the first record's timestamp in microseconds, which every chunk needs to compute
+    the same relative times as the serial analyzer.
+    """
+    index = []
+    origin_us = None
+    for member in capture_files(file_path):
+        with open(member, 'rb') as f:
+            if f.seek(0, 2) == 0:
+                continue
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                endian, divisor, _ = read_file_header(buf)
+                offsets, _ = walk_records(buf, FILE_HEADER_LEN, endian)
+                if origin_us is None and len(offsets):
+                    origin_us = timestamps_us(decode_records(buf, offsets[:1], endian, divisor)['ts'])[0]
+        index.append((member, offsets))
+    return index, origin_us or 0
+
+def split_index(index, chunks):
+    """(member_file, first_offset, record_count) for about `chunks` roughly equal runs of records.
+
+    Runs never cross a file boundary; each file gets a share of the chunks matching its share
+    of the records.
+    """
+    total = sum(len(offsets) for _, offsets in index)
+    ranges = []
+    for member, offsets in index:
+        if not len(offsets):
+            continue
+        parts = max(1, round(chunks * len(offsets) / total))
+        bounds = np.linspace(0, len(offsets), parts + 1).astype(np.int64)
+        ranges.extend((member, int(offsets[a]), int(b - a)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a)
+    return ranges
+
+def read_chunk(file_path, start, count, origin_us):
+    """Decode one run of records of one capture file; returns (relative frame times, packets)."""
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            endian, divisor, _ = read_file_header(buf)
+            offsets, _ = walk_records(buf, start, endian, limit=count)
+            packets = decode_records(buf, offsets, endian, divisor)
+    return relative_times(packets['ts'], origin_us), packets
+
+def goodput_bins(frame_times, tcp_times, new_bytes, bin_duration):
+    # Every frame marks its goodput bin as occupied, as in process_capture; only new bytes count.
+    good_bins = RunningBins(bin_duration)
+    good_bins.add(frame_times, np.zeros(len(frame_times)))
+    good_bins.add(tcp_times, new_bytes, count_hits=False)
+    return good_bins
+
+def analyse_chunk(file_path, start, count, origin_us, bin_duration):
+    """Worker, first pass: fold one chunk into mergeable partial results.
+
+    The chunk's segments go through a FlowTracker started from empty state. Its counts are exact
+    for the first chunk only; for the others its final state is what carry_state needs to work
+    out the state the next chunk starts from.
+    """
+    frame_times, packets = read_chunk(file_path, start, count, origin_us)
+    is_tcp = packets['kind'] == KIND_TCP
+    tcp_times = frame_times[is_tcp]
+    tcp_windows = packets['win'][is_tcp]
+
+    tracker = FlowTracker(record_boundary=True)
+    new_bytes = tracker.feed(packets[is_tcp])
+    thru_bins = RunningBins(bin_duration)
+    thru_bins.add(frame_times, packets['wirelen'])
+    window_bins = RunningBins(bin_duration, track_peak=True)
+    window_bins.add(tcp_times, tcp_windows)
+
+    return {
+        "thru_bins": thru_bins,
+        "good_bins": goodput_bins(frame_times, tcp_times, new_bytes, bin_duration),
+        "window_bins": window_bins,
+        "tracker": tracker,
+        "first_tcp": tcp_times[0] if len(tcp_times) else None,
+        "last_tcp": tcp_times[-1] if len(tcp_times) else None,
+        "peak_window": int(tcp_windows.max()) if len(tcp_windows) else 0,
+        "total_size": int(packets['wirelen'].astype(np.int64).sum()),
+        "last_frame": frame_times[-1] if len(frame_times) else 0.0,
+    }
+
+def account_chunk(file_path, start, count, origin_us, bin_duration, flows):
+    """Worker, second pass: goodput and retransmissions of one chunk, with the FlowTracker
+    starting from `flows`, the state every earlier chunk left behind."""
+    frame_times, packets = read_chunk(file_path, start, count, origin_us)
+    is_tcp = packets['kind'] == KIND_TCP
+    tracker = FlowTracker()
+    tracker.flows = flows
+    new_bytes = tracker.feed(packets[is_tcp])
+    tracker.flows = {}  # only the counts go back
+    return {"good_bins": goodput_bins(frame_times, frame_times[is_tcp], new_bytes, bin_duration), "tracker": tracker}
+
+def merge_chunks(parts, accounted, bin_duration):
+    """Combine the analyse_chunk results and the goodput of every chunk (account_chunk's, or
+    analyse_chunk's for the first), in file order, into the quantities process_capture reports."""
+    thru_bins = RunningBins(bin_duration)
+    good_bins = RunningBins(bin_duration)
+    window_bins = RunningBins(bin_duration, track_peak=True)
+    tracker = FlowTracker()
+    for part, goodput in zip(parts, accounted):
+        thru_bins.merge(part["thru_bins"])
+        window_bins.merge(part["window_bins"])
+        good_bins.merge(goodput["good_bins"])
+        for counter in ("new_bytes", "retransmitted_bytes", "retransmitted_segments", "data_segments"):
+            setattr(tracker, counter, getattr(tracker, counter) + getattr(goodput["tracker"], counter))
+
+    tcp_parts = [p for p in parts if p["first_tcp"] is not None]
+    return {
+        "thru_bins": thru_bins,
+        "good_bins": good_bins,
+        "window_bins": window_bins,
+        "first_tcp": tcp_parts[0]["first_tcp"] if tcp_parts else None,
+        "last_tcp": tcp_parts[-1]["last_tcp"] if tcp_parts else None,
+        "peak_window": max((p["peak_window"] for p in parts), default=0),
+        "total_size": sum(p["total_size"] for p in parts),
+        "tracker": tracker,
+        "last_frame": parts[-1]["last_frame"],
+    }
+
+def process_capture_parallel(file_path, plot_dir, result_dir, bin_duration=0.2, workers=None, chunks_per_worker=4, raise_errors=False):
+    """process_capture for one large capture, spread over a process pool.
+
+    Produces the same metrics and throughput/goodput plots as the serial process_capture; the
+    window plot shows each bin's peak, as process_capture_streaming's does. Retransmission
+    accounting runs in the workers too, in two passes: the first tracks every chunk from empty
+    state, carry_state chains those states into the state at the start of each chunk (cheap:
+    it touches only the data in flight), and the second accounts each chunk from its start state.
+    """
+    try:
+        index, origin_us = build_index(file_path)
+        workers = workers or os.cpu_count() or 1
+        ranges = split_index(index, workers * chunks_per_worker)
+        del index
+        if not ranges:
+            return [], []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(analyse_chunk, member, start, count, origin_us, bin_duration) for member, start, count in ranges]
+            parts = [future.result() for future in futures]
+            start_states = [{}]
+            for part in parts[:-1]:
+                start_states.append(carry_state(start_states[-1], part["tracker"]))
+            futures = [pool.submit(account_chunk, member, start, count, origin_us, bin_duration, flows)
+                       for (member, start, count), flows in zip(ranges[1:], start_states[1:])]
+            accounted = [parts[0]] + [future.result() for future in futures]
+        merged = merge_chunks(parts, accounted, bin_duration)
+
+        if merged["first_tcp"] is None:
+            return [], []
+        duration = merged["last_tcp"] - merged["first_tcp"]
+        if duration == 0 or merged["last_frame"] == 0:
+            return [], []
+
+        thru_times, thru_values = merged["thru_bins"].series(duration)
+        good_times, good_values = merged["good_bins"].series(merged["last_frame"])
+        window_times, window_values = merged["window_bins"].peak_series()
+
+        total_thru = merged["total_size"]*8/duration
+        tracker = merged["tracker"]
+        total_good = tracker.new_bytes*8/duration
+        loss_ratio = tracker.retransmitted_segments/tracker.data_segments if tracker.data_segments else 0
+
+        create_visualization(thru_times, thru_values, "Throughput (bits/s)", os.path.basename(file_path), plot_dir)
+        create_visualization(good_times, good_values, "Goodput (bits/s)", os.path.basename(file_path), plot_dir)
+        store_metrics(total_thru, total_good, loss_ratio, merged["peak_window"], os.path.basename(file_path), result_dir,
+                      retransmitted_bytes=tracker.retransmitted_bytes)
+        create_visualization(window_times, window_values, "TCP Window Size", os.path.basename(file_path), plot_dir)
+
+    except Exception as err:
+        if raise_errors:
+            raise
+        print(f"Processing error: {err}")
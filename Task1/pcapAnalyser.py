@@ -1,157 +1,264 @@
-import dpkt
-import datetime
-import matplotlib.pyplot as plt
 import numpy as np
 import os
+import sys
+import resource
+import argparse
+from contextlib import nullcontext
 from tqdm import tqdm
+from binning import bin_rate_series, RunningBins
+from plotRender import render_plot
 
-def process_capture(file_path, plot_dir, result_dir):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import stageProfile
+from common.captureCache import load_capture
+from common.seqTracker import FlowTracker
+from common.fastPcap import iter_batches, relative_times, timestamps_us, record_skips, capture_name, KIND_TCP
+
+def load_columns(file_path, use_cache=True):
+    """Per-packet columns for process_capture, read with the fast pcap reader (through the capture cache).
+
+    Returns (time_data, window_data, size_data, payload_data, payload_times, tracker):
+    time_data/window_data have one entry per TCP segment, the rest one entry per frame.
+    payload_data holds the bytes each frame added to its connection and tracker the FlowTracker
+    that counted them, so goodput and loss match the streaming analysis.
+    """
+    packets = load_capture(file_path, use_cache=use_cache)
+    with stageProfile.stage('classify', len(packets)):
+        is_tcp = packets['kind'] == KIND_TCP
+        payload_times = relative_times(packets['ts'])
+        # Original frame length, so captures taken with a header-only snaplen give the same throughput.
+        size_data = packets['wirelen'].astype(np.int64)
+        time_data = payload_times[is_tcp]
+        window_data = packets['win'][is_tcp].astype(np.int64)
+
+        # Only payload bytes a connection has not carried before count towards goodput.
+        tcp_rows = np.nonzero(is_tcp)[0]
+        tracker = FlowTracker()
+        payload_data = np.zeros(len(packets), dtype=np.int64)
+        payload_data[tcp_rows] = tracker.feed(packets[tcp_rows])
+    record_skips(packets)
+    stageProfile.skip('repeated_segment', tracker.retransmitted_segments)
+    return time_data, window_data, size_data, payload_data, payload_times, tracker
+
+def process_capture(file_path, plot_dir, result_dir, bin_duration=0.2, raise_errors=False, use_cache=True):
     try:
-        with open(file_path, 'rb') as f:
-            capture = dpkt.pcap.Reader(f)
-            time_data = []
-            size_data = []
-            payload_data = []
-            payload_times = []
-            connection_map = {}
-            window_data = []
-            sequence_map = {}
-            peak_window = 0
-            bin_duration = 0.2
-            initial_time = None
-
-            for timestamp, buffer in capture:
-                if initial_time is None:
-                    initial_time = datetime.datetime.utcfromtimestamp(timestamp)
-                delta = datetime.datetime.utcfromtimestamp(timestamp) - initial_time
-                seconds_offset = delta.total_seconds()
-                
-                frame = dpkt.ethernet.Ethernet(buffer)
-                if isinstance(frame.data, dpkt.ip.IP):
-                    ip_packet = frame.data
-                    flow_key = (ip_packet.src, ip_packet.dst)
-                    if flow_key not in sequence_map:
-                        sequence_map[flow_key] = set()
-                    
-                    if isinstance(ip_packet.data, dpkt.tcp.TCP):
-                        tcp_segment = ip_packet.data
-                        time_data.append(seconds_offset)
-                        size_data.append(len(buffer))
-                        window_data.append(tcp_segment.win)
-                        peak_window = max(peak_window, tcp_segment.win)
-                        
-                        if tcp_segment.seq not in sequence_map[flow_key]:
-                            payload_data.append(len(tcp_segment.data))
-                            payload_times.append(seconds_offset)
-                            sequence_map[flow_key].add(tcp_segment.seq)
-                        else:
-                            payload_data.append(0)
-                            payload_times.append(seconds_offset)
-                    else:
-                        size_data.append(len(buffer))
-                        payload_data.append(0)
-                        payload_times.append(seconds_offset)
-                else:
-                    size_data.append(len(buffer))
-                    payload_data.append(0)
-                    payload_times.append(seconds_offset)
-
-            if not time_data:
-                return [], []
-
-            start = time_data[0]
-            end = time_data[-1]
-            duration = end - start
-
-            if duration == 0:
-                return [], []
-
-            bin_count = int(duration / bin_duration) + 1
-            thru_times = []
-            thru_values = []
-
-            for idx in range(bin_count):
-                bin_start = idx * bin_duration
-                bin_end = bin_start + bin_duration
-                window_bits = [s*8 for t, s in zip(time_data, size_data) if bin_start <= t <= bin_end]
-                
-                if window_bits:
-                    rate = sum(window_bits) / bin_duration
-                    thru_times.append(bin_start + bin_duration/2)
-                    thru_values.append(rate)
-
-            if not payload_times:
-                return [], []
-
-            start_p = payload_times[0]
-            end_p = payload_times[-1]
-            duration_p = end_p - start_p
-
-            if duration_p == 0:
-                return [], []
-
-            bin_count_p = int(duration_p / bin_duration) + 1
-            good_times = []
-            good_values = []
-
-            for idx in range(bin_count_p):
-                bin_start = idx * bin_duration
-                bin_end = bin_start + bin_duration
-                valid_bits = [s*8 for t, s in zip(payload_times, payload_data) if bin_start <= t <= bin_end]
-                
-                if valid_bits:
-                    rate = sum(valid_bits) / bin_duration
-                    good_times.append(bin_start + bin_duration/2)
-                    good_values.append(rate)
-
-            total_thru = sum(size_data)*8/(time_data[-1]-time_data[0]) if time_data else 0
-            total_good = sum(payload_data)*8/(time_data[-1]-time_data[0]) if time_data else 0
-
-            unique_packets = sum(len(v) for v in sequence_map.values())
-            total_packets = len(time_data)
-            loss_ratio = (total_packets - unique_packets)/total_packets if total_packets else 0
-
-            create_visualization(thru_times, thru_values, "Throughput (bits/s)", os.path.basename(file_path), plot_dir)
-            create_visualization(good_times, good_values, "Goodput (bits/s)", os.path.basename(file_path), plot_dir)
-            store_metrics(total_thru, total_good, loss_ratio, peak_window, os.path.basename(file_path), result_dir)
-            create_visualization(time_data, window_data, "TCP Window Size", os.path.basename(file_path), plot_dir)
+        time_data, window_data, size_data, payload_data, payload_times, tracker = load_columns(file_path, use_cache)
+
+        if not len(time_data):
+            return [], []
+
+        start = time_data[0]
+        end = time_data[-1]
+        duration = end - start
+
+        if duration == 0:
+            return [], []
+
+        # Every frame has an entry in payload_times, so it is the timestamp column that lines up with size_data.
+        with stageProfile.stage('bin', len(payload_times)):
+            thru_times, thru_values = bin_rate_series(payload_times, size_data, duration, bin_duration)
+
+        start_p = payload_times[0]
+        end_p = payload_times[-1]
+        duration_p = end_p - start_p
+
+        if duration_p == 0:
+            return [], []
+
+        with stageProfile.stage('bin', len(payload_times)):
+            good_times, good_values = bin_rate_series(payload_times, payload_data, duration_p, bin_duration)
+
+        total_thru = int(size_data.sum())*8/duration
+        total_good = int(payload_data.sum())*8/duration
+
+        peak_window = int(window_data.max())
+        loss_ratio = tracker.retransmitted_segments/tracker.data_segments if tracker.data_segments else 0
+
+        create_visualization(thru_times, thru_values, "Throughput (bits/s)", os.path.basename(file_path), plot_dir)
+        create_visualization(good_times, good_values, "Goodput (bits/s)", os.path.basename(file_path), plot_dir)
+        store_metrics(total_thru, total_good, loss_ratio, peak_window, os.path.basename(file_path), result_dir,
+                      retransmitted_bytes=tracker.retransmitted_bytes)
+        create_visualization(time_data, window_data, "TCP Window Size", os.path.basename(file_path), plot_dir)
 
     except Exception as err:
+        if raise_errors:
+            raise
         print(f"Processing error: {err}")
 
-def create_visualization(x_vals, y_vals, graph_title, filename, output_path):
-    if not x_vals:
-        return
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class StreamingMetrics:
+    """Running state of the streaming analysis, fed one decoded batch at a time.
+
+    Memory depends on the number of bins and flows rather than the capture size, and the whole
+    object pickles, so a follower can checkpoint it between polls. It is also the throughput
+    consumer of common.packetPipeline.
+    """
+
+    name = "throughput"
 
-    plt.figure(figsize=(10,6))
-    plt.plot(x_vals, y_vals)
-    plt.xlabel("Time (seconds)")
-    plt.ylabel(graph_title)
-    plt.title(graph_title)
-    plt.grid(True)
-    plt.tight_layout()
+    def __init__(self, bin_duration=0.2):
+        self.bin_duration = bin_duration
+        self.thru_bins = RunningBins(bin_duration)
+        self.good_bins = RunningBins(bin_duration)
+        self.window_bins = RunningBins(bin_duration, track_peak=True)
+        self.tracker = FlowTracker()
+        self.total_size = 0
+        self.total_payload = 0
+        self.total_packets = 0
+        self.peak_window = 0
+        self.first_tcp = None
+        self.last_tcp = None
+        self.last_frame = None
+        self.origin_us = None
 
-    graph_name = os.path.splitext(filename)[0] + f"_{graph_title.replace(' ','_')}.png"
-    plt.savefig(os.path.join(output_path, graph_name), dpi=300)
-    plt.close()
+    def feed(self, packets):
+        if not len(packets):
+            return
+        with stageProfile.stage('classify', len(packets)):
+            if self.origin_us is None:
+                self.origin_us = timestamps_us(packets['ts'][:1])[0]
+            frame_times = relative_times(packets['ts'], self.origin_us)
+            is_tcp = packets['kind'] == KIND_TCP
+            tcp_rows = np.nonzero(is_tcp)[0]
 
-def store_metrics(thru, good, loss, max_win, filename, output_path):
+            payloads = np.zeros(len(packets), dtype=np.int64)
+            payloads[tcp_rows] = self.tracker.feed(packets[tcp_rows])
+        record_skips(packets)
+        if stageProfile.active() is not None:
+            stageProfile.skip('repeated_segment', ((payloads[tcp_rows] == 0) & (packets['payload'][tcp_rows] > 0)).sum())
+
+        tcp_times = frame_times[is_tcp]
+        tcp_windows = packets['win'][is_tcp]
+        with stageProfile.stage('bin', len(packets)):
+            self.thru_bins.add(frame_times, packets['wirelen'])
+            self.good_bins.add(frame_times, payloads)
+            self.window_bins.add(tcp_times, tcp_windows)
+
+        self.total_size += int(packets['wirelen'].sum())
+        self.total_payload += int(payloads.sum())
+        self.total_packets += len(tcp_rows)
+        self.last_frame = frame_times[-1]
+        if len(tcp_rows):
+            self.peak_window = max(self.peak_window, int(tcp_windows.max()))
+            if self.first_tcp is None:
+                self.first_tcp = tcp_times[0]
+            self.last_tcp = tcp_times[-1]
+
+    def ready(self):
+        """True once there is a non-zero TCP time span to compute rates over."""
+        return self.first_tcp is not None and self.last_tcp != self.first_tcp and bool(self.last_frame)
+
+    def write(self, file_path, plot_dir, result_dir, plots=True, peak_rss=None):
+        """Write the metrics file and (optionally) the three plots for what has been fed so far."""
+        if not self.ready():
+            return False
+        duration = self.last_tcp - self.first_tcp
+        tracker = self.tracker
+        total_thru = self.total_size*8/duration
+        total_good = self.total_payload*8/duration
+        loss_ratio = tracker.retransmitted_segments/tracker.data_segments if tracker.data_segments else 0
+        name = os.path.basename(file_path)
+
+        store_metrics(total_thru, total_good, loss_ratio, self.peak_window, name, result_dir,
+                      peak_rss=peak_rss, retransmitted_bytes=tracker.retransmitted_bytes)
+        if plots:
+            with stageProfile.stage('bin'):
+                thru_times, thru_values = self.thru_bins.series(duration)
+                good_times, good_values = self.good_bins.series(self.last_frame)
+                window_times, window_values = self.window_bins.peak_series()
+            create_visualization(thru_times, thru_values, "Throughput (bits/s)", name, plot_dir)
+            create_visualization(good_times, good_values, "Goodput (bits/s)", name, plot_dir)
+            create_visualization(window_times, window_values, "TCP Window Size", name, plot_dir)
+        return True
+
+    def finish(self, file_path, output_dir):
+        """packetPipeline entry point: write plots and metrics to output_dir."""
+        return self.write(file_path, output_dir, output_dir, peak_rss=peak_rss_mb())
+
+def process_capture_streaming(file_path, plot_dir, result_dir, bin_duration=0.2, chunk_size=65536, raise_errors=False):
+    """Analyse a capture without holding per-packet lists.
+
+    Packets are read in batches of at most chunk_size and folded into a StreamingMetrics. Goodput
+    and loss come from a FlowTracker: only payload bytes a connection has not carried before count
+    as goodput, and the loss rate is the share of data segments that carried nothing new. The
+    window plot shows the peak window per bin.
+    """
+    try:
+        metrics = StreamingMetrics(bin_duration)
+        for packets in iter_batches(file_path, batch_size=chunk_size):
+            metrics.feed(packets)
+
+        if not metrics.ready():
+            return [], []
+        rss = peak_rss_mb()
+        print(f"{os.path.basename(file_path)}: peak RSS {rss:.1f} MB")
+        metrics.write(file_path, plot_dir, result_dir, peak_rss=rss)
+
+    except Exception as err:
+        if raise_errors:
+            raise
+        print(f"Processing error: {err}")
+
+def create_visualization(x_vals, y_vals, graph_title, filename, output_path):
+    if not len(x_vals):
+        return
+    with stageProfile.stage('plot', len(x_vals)):
+        render_plot(x_vals, y_vals, graph_title, filename, output_path)
+
+def store_metrics(thru, good, loss, max_win, filename, output_path, peak_rss=None, retransmitted_bytes=None):
     metrics_file = os.path.splitext(filename)[0] + ".txt"
     full_path = os.path.join(output_path, metrics_file)
-    with open(full_path, 'w') as f:
+    with stageProfile.stage('write', 1), open(full_path, 'w') as f:
         f.write(f"Total Throughput: {thru:.2f} bits/s\n")
         f.write(f"Total Goodput: {good:.2f} bits/s\n")
         f.write(f"Packet Loss Rate: {loss:.2%}\n")
         f.write(f"Maximum Window Size: {max_win}\n")
+        if retransmitted_bytes is not None:
+            f.write(f"Retransmitted Bytes: {retransmitted_bytes}\n")
+        if peak_rss is not None:
+            f.write(f"Peak RSS: {peak_rss:.1f} MB\n")
 
 if __name__ == "__main__":
-    input_folder = "results/experiment_a/cc_vegas"
-    graph_folder = "plots"
-    metrics_folder = "plots"
+    parser = argparse.ArgumentParser(description="Throughput/goodput/window analysis of Task1 captures")
+    parser.add_argument('--input', type=str, default="results/experiment_a/cc_vegas", help="Folder containing .pcap files")
+    parser.add_argument('--output', type=str, default="plots", help="Folder for plots and metrics")
+    parser.add_argument('--bin', type=float, default=0.2, help="Bin width in seconds")
+    parser.add_argument('--stream', action='store_true', help="Constant-memory streaming mode for very large captures")
+    parser.add_argument('--no-cache', action='store_true', help="Always reparse the pcap instead of using the decoded-capture cache")
+    parser.add_argument('--jobs', type=int, default=0, help="Parse each capture in chunks on this many worker processes")
+    parser.add_argument('--profile', action='store_true', help="Write per-stage timings (<capture>.profile.json) and a batch summary to the output folder")
+    args = parser.parse_args()
+
+    input_folder = args.input
+    graph_folder = args.output
+    metrics_folder = args.output
 
     os.makedirs(graph_folder, exist_ok=True)
     os.makedirs(metrics_folder, exist_ok=True)
 
-    capture_files = [os.path.join(input_folder, f) for f in os.listdir(input_folder) if f.endswith(".pcap")]
-    for cap_file in tqdm(capture_files, desc="Analyzing captures"):
-        process_capture(cap_file, graph_folder, metrics_folder)
\ No newline at end of file
+    # A rotated set (h1.pcap, h1.pcap1, ...) is analysed once, as one capture.
+    captures = sorted({os.path.join(input_folder, capture_name(f)) for f in os.listdir(input_folder) if capture_name(f)})
+    reports = []
+    for cap_file in tqdm(captures, desc="Analyzing captures"):
+        with stageProfile.profiling(cap_file) if args.profile else nullcontext() as profile:
+            if args.stream:
+                process_capture_streaming(cap_file, graph_folder, metrics_folder, bin_duration=args.bin)
+            elif args.jobs:
+                # Only the parent's stages are profiled; the chunk workers are separate processes.
+                from parallelCapture import process_capture_parallel
+                process_capture_parallel(cap_file, graph_folder, metrics_folder, bin_duration=args.bin, workers=args.jobs)
+            else:
+                process_capture(cap_file, graph_folder, metrics_folder, bin_duration=args.bin, use_cache=not args.no_cache)
+        if profile is not None:
+            report = profile.report()
+            reports.append(report)
+            name = os.path.splitext(os.path.basename(cap_file))[0] + ".profile.json"
+            stageProfile.write_report(report, os.path.join(metrics_folder, name))
+
+    if reports:
+        summary = stageProfile.aggregate(reports)
+        stageProfile.write_report(summary, os.path.join(metrics_folder, "profile_summary.json"))
+        print(stageProfile.format_report(summary))
@@ -0,0 +1,123 @@
+import argparse
+import os
+import time
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+
+FIGSIZE = (10, 6)
+DPI = 300
+# Horizontal resolution of the saved PNG; more points than this cannot show up as separate pixels.
+PIXEL_WIDTH = FIGSIZE[0] * DPI
+SERIES_SUFFIX = ".series.npz"
+
+_renderer = None
+_defer = False
+
+def minmax_decimate(x_vals, y_vals, buckets=PIXEL_WIDTH):
+    """Reduce a time series to the first, last, min and max point of each pixel column.
+
+    A line drawn through those points covers exactly the same pixels as the full series at this
+    width, so the PNG looks the same while matplotlib draws a few thousand points instead of
+    millions. x must be non-decreasing; anything else is returned untouched.
+    """
+    x = np.asarray(x_vals, dtype=np.float64)
+    y = np.asarray(y_vals, dtype=np.float64)
+    if len(x) <= 4 * buckets or x[-1] <= x[0] or np.any(np.diff(x) < 0):
+        return x, y
+    bucket = np.minimum(((x - x[0]) / (x[-1] - x[0]) * buckets).astype(np.int64), buckets - 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(x)] - 1
+    keep = [starts, ends]
+    for extreme in (np.minimum, np.maximum):
+        # First index in each bucket where y equals that bucket's extreme.
+        hits = np.flatnonzero(y == np.repeat(extreme.reduceat(y, starts), np.diff(np.r_[starts, len(x)])))
+        hit_bucket = bucket[hits]
+        keep.append(hits[np.r_[True, hit_bucket[1:] != hit_bucket[:-1]]])
+    keep = np.unique(np.concatenate(keep))
+    return x[keep], y[keep]
+
+class FigureRenderer:
+    """A single figure reused for every plot: the axes are cleared between renders instead of
+    building and tearing down a new figure each time."""
+
+    def __init__(self, figsize=FIGSIZE, dpi=DPI):
+        self.dpi = dpi
+        self.fig, self.ax = plt.subplots(figsize=figsize)
+
+    def render(self, x_vals, y_vals, graph_title, out_file):
+        x, y = minmax_decimate(x_vals, y_vals)
+        ax = self.ax
+        ax.clear()
+        ax.plot(x, y)
+        ax.set_xlabel("Time (seconds)")
+        ax.set_ylabel(graph_title)
+        ax.set_title(graph_title)
+        ax.grid(True)
+        self.fig.tight_layout()
+        self.fig.savefig(out_file, dpi=self.dpi)
+
+    def close(self):
+        plt.close(self.fig)
+
+def graph_path(filename, graph_title, output_path):
+    graph_name = os.path.splitext(filename)[0] + f"_{graph_title.replace(' ','_').replace('/','_')}.png"
+    return os.path.join(output_path, graph_name)
+
+def defer_rendering(enabled=True):
+    """When enabled, plots are saved as <png name>.series.npz for render_tree() instead of drawn."""
+    global _defer
+    _defer = enabled
+
+def render_plot(x_vals, y_vals, graph_title, filename, output_path):
+    """Draw (or, when deferred, save the data for) one plot with the shared renderer."""
+    global _renderer
+    out_file = graph_path(filename, graph_title, output_path)
+    if _defer:
+        np.savez(out_file + SERIES_SUFFIX, x=np.asarray(x_vals), y=np.asarray(y_vals), title=graph_title)
+        return
+    if _renderer is None:
+        _renderer = FigureRenderer()
+    _renderer.render(x_vals, y_vals, graph_title, out_file)
+
+def render_series_files(series_files):
+    """Worker: render a group of saved series with one figure, deleting each series file once
+    its PNG is written so a later render_tree does not draw it again. Returns the number rendered."""
+    renderer = FigureRenderer()
+    try:
+        for series_file in series_files:
+            with np.load(series_file) as data:
+                renderer.render(data['x'], data['y'], str(data['title']), series_file[:-len(SERIES_SUFFIX)])
+            os.remove(series_file)
+    finally:
+        renderer.close()
+    return len(series_files)
+
+def render_tree(root="results", workers=None):
+    """Render every deferred series file under root on a process pool."""
+    series_files = sorted(os.path.join(dirpath, name) for dirpath, _, names in os.walk(root)
+                          for name in names if name.endswith(SERIES_SUFFIX))
+    if not series_files:
+        print(f"No plot series found under {root}")
+        return 0
+    workers = min(workers or os.cpu_count() or 1, len(series_files))
+    # A few files per task keeps each worker's figure busy without starving the others.
+    groups = [series_files[i::workers * 4] for i in range(workers * 4) if series_files[i::workers * 4]]
+    start = time.monotonic()
+    rendered = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_series_files, group) for group in groups]
+        for future in tqdm(as_completed(futures), total=len(futures), desc=f"Rendering plots ({workers} workers)"):
+            rendered += future.result()
+    print(f"Rendered {rendered} plots in {time.monotonic() - start:.1f}s")
+    return rendered
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render deferred plot series under a results tree in parallel")
+    parser.add_argument('--root', type=str, default="results", help="Results tree to search for .series.npz files")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    render_tree(args.root, args.workers)
@@ -0,0 +1,221 @@
+#!/usr/bin/python
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from mininet.log import setLogLevel, info, warn
+import createTopology as topology
+from iperfJson import load_iperf
+
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST = "results/sweep_manifest.json"
+ALLOWED_CC = ['reno', 'vegas', 'htcp']
+
+def sweep_cells(options, ccs, losses):
+    """Every (experiment, cc, loss) cell in a fixed order; a cell's index is its position here,
+    so every machine of a sharded sweep agrees on it."""
+    return [(option, cc, loss) for option in options for cc in ccs for loss in losses]
+
+def cell_id(cell):
+    option, cc, loss = cell
+    return "%s/%s/loss%g" % (option, cc, loss)
+
+def cell_config(cell, tag=""):
+    """Everything that determines a cell's results. Completed cells whose config no longer
+    matches (e.g. after --tag or one of the capture settings changed) are run again."""
+    option, cc, loss = cell
+    return {
+        "option": option,
+        "cc": cc,
+        "loss": loss,
+        "result_dir": topology.cell_result_dir(option, cc, loss),
+        "capture_snaplen": topology.CAPTURE_SNAPLEN,
+        "capture_rotate_mb": topology.CAPTURE_ROTATE_MB,
+        "tcp_sample_interval": topology.TCP_SAMPLE_INTERVAL,
+        "iperf_json": topology.IPERF_JSON_FLAG,
+        "tag": tag,
+    }
+
+def config_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+def file_sha1(path, block=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(block), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_artifacts(result_dir):
+    """{relative path: {size, sha1}} for every file a cell left in its result directory."""
+    artifacts = {}
+    for dirpath, _, filenames in os.walk(result_dir):
+        for name in sorted(filenames):
+            full = os.path.join(dirpath, name)
+            artifacts[os.path.relpath(full, result_dir)] = {"size": os.path.getsize(full), "sha1": file_sha1(full)}
+    return artifacts
+
+def check_artifacts(result_dir):
+    """Why a finished cell's output is unusable, or None if it looks complete: every iperf3
+    client report must load without an error and every capture must hold packets."""
+    reports = glob.glob(os.path.join(result_dir, "**", "*_client.json"), recursive=True)
+    if not reports:
+        return "no iperf3 client report"
+    for report in reports:
+        try:
+            error = load_iperf(report)["error"]
+        except (OSError, ValueError, KeyError) as err:
+            return "unreadable %s: %s" % (report, err)
+        if error:
+            return "%s: %s" % (report, error)
+    for capture in glob.glob(os.path.join(result_dir, "**", "*.pcap"), recursive=True):
+        if os.path.getsize(capture) <= 24:
+            return "empty capture %s" % capture
+    return None
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"version": MANIFEST_VERSION, "cells": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError("%s has manifest version %s, expected %d" % (path, manifest.get("version"), MANIFEST_VERSION))
+    return manifest
+
+def save_manifest(path, manifest):
+    """Write the manifest atomically so a crash never leaves it half written."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def is_complete(entry, config, verify=False):
+    """A cell is done when it succeeded with the same config and its artifacts are still there
+    (same size; same hash too with verify)."""
+    if not entry or entry.get("status") != "done" or entry.get("config_hash") != config_hash(config):
+        return False
+    for rel, meta in entry.get("artifacts", {}).items():
+        full = os.path.join(config["result_dir"], rel)
+        if not os.path.isfile(full) or os.path.getsize(full) != meta["size"]:
+            return False
+        if verify and file_sha1(full) != meta["sha1"]:
+            return False
+    return True
+
+def run_sweep(cells, manifest_path, shard=0, shards=1, retries=1, max_parallel=3, tag="", verify=False):
+    """Run the cells of this shard that are not complete yet, retrying failures up to `retries`
+    more times, recording every outcome in the manifest as it happens. Returns the cells that
+    still failed."""
+    manifest = load_manifest(manifest_path)
+    entries = manifest["cells"]
+    mine = [(index, cell) for index, cell in enumerate(cells) if index % shards == shard]
+    configs = {cell: cell_config(cell, tag) for _, cell in mine}
+    index_of = {cell: index for index, cell in mine}
+    pending = [(index, cell) for index, cell in mine if not is_complete(entries.get(cell_id(cell)), configs[cell], verify)]
+    info("Shard %d/%d: %d cells, %d already complete\n" % (shard, shards, len(mine), len(mine) - len(pending)))
+
+    def record(cell, seconds, error):
+        config = configs[cell]
+        entry = entries.setdefault(cell_id(cell), {"attempts": 0})
+        if error is None:
+            error = check_artifacts(config["result_dir"])
+        entry.update({
+            "index": index_of[cell],
+            "config": config,
+            "config_hash": config_hash(config),
+            "status": "failed" if error else "done",
+            "error": error,
+            "attempts": entry["attempts"] + 1,
+            "seconds": round(seconds, 1),
+            "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "artifacts": {} if error else hash_artifacts(config["result_dir"]),
+        })
+        save_manifest(manifest_path, manifest)
+        if error:
+            warn("*** %s failed: %s\n" % (cell_id(cell), error))
+
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        for _, cell in pending:
+            # Leftovers of an earlier attempt of this sweep must not mix with the new run.
+            result_dir = configs[cell]["result_dir"]
+            if cell_id(cell) in entries and os.path.isdir(result_dir):
+                shutil.rmtree(result_dir)
+        info("Attempt %d: running %d cells\n" % (attempt + 1, len(pending)))
+        topology.run_cells([cell for _, cell in pending], max_parallel, on_result=record)
+        pending = [(index, cell) for index, cell in pending if entries.get(cell_id(cell), {}).get("status") != "done"]
+    return [cell for _, cell in pending]
+
+def print_status(cells, manifest_paths, tag=""):
+    """One line per cell with its state, merged over every shard's manifest."""
+    entries = {}
+    for path in manifest_paths:
+        entries.update(load_manifest(path)["cells"])
+    for index, cell in enumerate(cells):
+        entry = entries.get(cell_id(cell))
+        if is_complete(entry, cell_config(cell, tag)):
+            state = "done"
+        elif entry and entry.get("status") == "failed":
+            state = "failed (%d attempts): %s" % (entry["attempts"], entry.get("error"))
+        elif entry:
+            state = "stale"
+        else:
+            state = "pending"
+        print("%3d %-20s %s" % (index, cell_id(cell), state))
+
+def parse_shard(text):
+    shard, shards = (int(x) for x in text.split('/'))
+    if not 0 <= shard < shards:
+        raise argparse.ArgumentTypeError("shard must be K/N with 0 <= K < N")
+    return shard, shards
+
+if __name__ == '__main__':
+    setLogLevel('info')
+    parser = argparse.ArgumentParser(description="Resumable sweep over the Task1 experiment matrix")
+    parser.add_argument('--options', type=str, default='a,b,c', help="Comma-separated experiments")
+    parser.add_argument('--ccs', type=str, default='reno,vegas,htcp', help="Comma-separated congestion control schemes")
+    parser.add_argument('--losses', type=str, default='0,1,5', help="Comma-separated loss rates (percent)")
+    parser.add_argument('--shard', type=parse_shard, default=(0, 1), help="K/N: run only cells whose index is K mod N")
+    parser.add_argument('--manifest', type=str, default=None, help="Manifest file (default: results/sweep_manifest[.shardKofN].json)")
+    parser.add_argument('--retries', type=int, default=1, help="Extra attempts for cells that fail")
+    parser.add_argument('--max-parallel', type=int, default=3, help="Cells running at the same time")
+    parser.add_argument('--tag', type=str, default="", help="Part of every cell's config; change it to force a rerun")
+    parser.add_argument('--verify', action='store_true', help="Re-hash artifacts of completed cells instead of only checking sizes")
+    parser.add_argument('--status', action='store_true', help="Print the state of every cell from all manifests and exit")
+    args = parser.parse_args()
+
+    options = [o.strip() for o in args.options.split(',') if o.strip()]
+    ccs = [c.strip().lower() for c in args.ccs.split(',') if c.strip()]
+    losses = [float(l) for l in args.losses.split(',') if l.strip()]
+    if any(o not in topology.EXPERIMENTS for o in options) or any(c not in ALLOWED_CC for c in ccs):
+        info("Invalid sweep. Experiments: a, b, c; schemes: reno, vegas, htcp\n")
+        sys.exit(1)
+    cells = sweep_cells(options, ccs, losses)
+    shard, shards = args.shard
+
+    if args.status:
+        paths = [args.manifest] if args.manifest else sorted(glob.glob(os.path.splitext(DEFAULT_MANIFEST)[0] + "*.json"))
+        print_status(cells, paths, args.tag)
+        sys.exit(0)
+
+    manifest_path = args.manifest or (DEFAULT_MANIFEST if shards == 1 else
+                                      os.path.splitext(DEFAULT_MANIFEST)[0] + ".shard%dof%d.json" % (shard, shards))
+    failed = run_sweep(cells, manifest_path, shard, shards, args.retries, args.max_parallel, args.tag, args.verify)
+    for cell in failed:
+        print("FAILED %s" % cell_id(cell))
+    sys.exit(1 if failed else 0)
@@ -1,43 +1,284 @@
-import dpkt
+import argparse
 import matplotlib.pyplot as plt
+import numpy as np
 import os
+import sys
 from collections import defaultdict
-from tqdm import tqdm
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.captureCache import load_capture
+from common.fastPcap import timestamps_us, KIND_TCP
+from common.sketches import hash64
 
 capture_file = "syn_mitigation.pcap"
 # capture_file = "syn_mitigation.pcap"
 graph_directory = "traffic_analysis"
-os.makedirs(graph_directory, exist_ok=True)
 time_resolution = 0.1
+pyramid_levels = (0.001, 0.01, 0.1, 1.0, 10.0)  # Resolutions kept by IOPyramid, all multiples of the first
+pyramid_ports = (8080,)  # Ports that get their own IOPyramid category
+TH_FIN, TH_SYN, TH_RST, TH_ACK = 0x01, 0x02, 0x04, 0x10
+
+class IOGraph:
+    """Bytes per time slot since the first packet, fed one batch of decoded packets at a time.
+
+    A packet consumer for common.packetPipeline; the script below feeds it the whole capture at once.
+    """
+
+    name = "iograph"
+
+    def __init__(self, resolution=time_resolution):
+        self.resolution = resolution
+        self.first_ts = None
+        self.time_slots = defaultdict(int)
+
+    def feed(self, packets):
+        if not len(packets):
+            return
+        if self.first_ts is None:
+            self.first_ts = packets['ts'][0]
+        relative_times = packets['ts'] - self.first_ts
+        # astype truncates towards zero like int() did; a batch only touches a few slots, so
+        # they are summed with bincount and folded into the dict one slot at a time.
+        time_index = (relative_times / self.resolution).astype(np.int64)
+        slots, inverse = np.unique(time_index, return_inverse=True)
+        volume = np.bincount(inverse.ravel(), weights=packets['wirelen'], minlength=len(slots))
+        for slot, data_size in zip(slots.tolist(), volume.tolist()):
+            self.time_slots[slot] += int(data_size)
+
+    def series(self):
+        """(slot start times, bytes) for every slot that saw a packet."""
+        sorted_intervals = sorted(self.time_slots.keys())
+        traffic_data = [self.time_slots[interval] for interval in sorted_intervals]
+        graph_timepoints = [idx * self.resolution for idx in sorted_intervals]
+        return graph_timepoints, traffic_data
+
+    def finish(self, file_path, output_dir):
+        """Plot the IO graph; returns the number of slots plotted."""
+        graph_timepoints, traffic_data = self.series()
+
+        plt.figure(figsize=(12, 6))
+        plt.plot(graph_timepoints, traffic_data)
+        plt.xlabel("Elapsed Time (seconds)")
+        plt.ylabel("Data Volume per Interval (bytes)")
+        plt.title("Network Traffic Analysis")
+        plt.grid(True)
+
+        output_name = os.path.splitext(os.path.basename(file_path))[0] + "_traffic_analysis.png"
+        plt.savefig(os.path.join(output_dir, output_name), dpi=300)
+        plt.close()
+        return len(traffic_data)
+
+class IOPyramid:
+    """Bytes and packets per interval at several resolutions and per traffic category.
+
+    Packets are counted once, at the finest resolution, into one row per category:
+
+        all         every frame
+        syn         SYN without ACK (connection attempts, the flood itself)
+        synack      SYN-ACK
+        handshake   the client's ACK that completes a handshake
+        data        TCP segments carrying payload
+        rst         RST
+        port:<n>    TCP to or from port n, for every n in ports
+
+    and every coarser level is summed from the finest one, so zooming into the attack onset
+    at 1 ms or looking at the whole run at 10 s needs no second pass over the capture. The
+    handshake-completing ACK is the client's first ACK whose sequence number follows the
+    SYN's; pending SYNs sit in a fixed table of 2**table_bits slots indexed by a hash of the
+    4-tuple, so collisions can miss a few, but memory does not grow with the flood.
+
+    A packet consumer for common.packetPipeline; save() and load() keep the finest level on
+    disk for later zooming.
+    """
+
+    name = "iopyramid"
+
+    def __init__(self, levels=pyramid_levels, ports=pyramid_ports, table_bits=20):
+        self.levels = tuple(sorted(levels))
+        self.base_us = int(round(self.levels[0] * 1e6))
+        self.factors = [int(round(level * 1e6 / self.base_us)) for level in self.levels]
+        if any(abs(f * self.base_us - level * 1e6) > 1e-6 for f, level in zip(self.factors, self.levels)):
+            raise ValueError("every resolution must be a multiple of the finest one")
+        self.ports = tuple(ports)
+        self.categories = ("all", "syn", "synack", "handshake", "data", "rst") + tuple(f"port:{p}" for p in self.ports)
+        self.origin_us = None
+        self.bytes = np.zeros((len(self.categories), 0), dtype=np.int64)
+        self.packets = np.zeros((len(self.categories), 0), dtype=np.int64)
+        self.used = 0  # finest slots that hold data
+        self.mask = np.uint64((1 << table_bits) - 1)
+        self.expected = np.full(1 << table_bits, -1, dtype=np.int64)  # SYN seq + 1 per slot, -1 when empty
+
+    def _handshake_acks(self, tcp, flags):
+        """Mask of the TCP packets that complete a handshake."""
+        is_syn = ((flags & TH_SYN) != 0) & ((flags & TH_ACK) == 0)
+        is_pure_ack = (flags == TH_ACK) & (tcp['payload'] == 0)
+        rows = np.nonzero(is_syn | is_pure_ack)[0]
+        completing = np.zeros(len(tcp), dtype=bool)
+        if not len(rows):
+            return completing
+        events = tcp[rows]
+        hosts = (events['src'].astype(np.uint64) << np.uint64(32)) | events['dst'].astype(np.uint64)
+        ports = (events['sport'].astype(np.uint64) << np.uint64(16)) | events['dport'].astype(np.uint64)
+        slots = ((hash64(hosts) ^ hash64(ports, seed=7)) & self.mask).astype(np.int64)
+        syn = is_syn[rows]
+        values = np.where(syn, (events['seq'].astype(np.int64) + 1) & 0xffffffff, events['seq'].astype(np.int64))
+
+        # Events in capture order within each slot. Each SYN starts a generation holding its expected
+        # value; the events before a slot's first SYN of the batch continue the value the slot held.
+        order = np.lexsort((np.arange(len(rows)), slots))
+        slots, syn, values, rows = slots[order], syn[order], values[order], rows[order]
+        first = np.ones(len(slots), dtype=bool)
+        first[1:] = slots[1:] != slots[:-1]
+        starts = first | syn
+        generation = np.cumsum(starts) - 1
+        expected = np.where(syn[starts], values[starts], self.expected[slots[starts]])
+        held = expected[generation]
+
+        # Only the first matching ACK of a generation completes the handshake; an ACK that does not
+        # match (another connection hashed to the slot) leaves the pending SYN alone.
+        candidates = np.nonzero(~syn & (held >= 0) & (values == held))[0]
+        keep = np.ones(len(candidates), dtype=bool)
+        keep[1:] = generation[candidates[1:]] != generation[candidates[:-1]]
+        hit = candidates[keep]
+        completing[rows[hit]] = True
+
+        answered = np.zeros(len(expected), dtype=bool)
+        answered[generation[hit]] = True
+        last = np.ones(len(slots), dtype=bool)
+        last[:-1] = first[1:]
+        self.expected[slots[last]] = np.where(answered[generation[last]], -1, expected[generation[last]])
+        return completing
+
+    def feed(self, packets):
+        if not len(packets):
+            return
+        micros = timestamps_us(packets['ts'])
+        if self.origin_us is None:
+            self.origin_us = int(micros[0])
+        slot = np.maximum((micros - self.origin_us) // self.base_us, 0)
+
+        is_tcp = packets['kind'] == KIND_TCP
+        flags = packets['flags']
+        masks = [np.ones(len(packets), dtype=bool),
+                 is_tcp & ((flags & TH_SYN) != 0) & ((flags & TH_ACK) == 0),
+                 is_tcp & ((flags & TH_SYN) != 0) & ((flags & TH_ACK) != 0),
+                 np.zeros(len(packets), dtype=bool),
+                 is_tcp & (packets['payload'] > 0),
+                 is_tcp & ((flags & TH_RST) != 0)]
+        tcp_rows = np.nonzero(is_tcp)[0]
+        masks[3][tcp_rows] = self._handshake_acks(packets[tcp_rows], flags[tcp_rows])
+        for port in self.ports:
+            masks.append(is_tcp & ((packets['sport'] == port) | (packets['dport'] == port)))
+
+        # One bincount over (category, slot) pairs fills every category at once.
+        category, row = np.nonzero(np.vstack(masks))
+        low = int(slot.min())
+        width = int(slot.max()) - low + 1
+        cells = category * width + (slot[row] - low)
+        size = len(self.categories) * width
+        add_bytes = np.bincount(cells, weights=packets['wirelen'][row], minlength=size).astype(np.int64).reshape(-1, width)
+        add_packets = np.bincount(cells, minlength=size).reshape(-1, width)
+        self._grow(low + width)
+        self.bytes[:, low:low + width] += add_bytes
+        self.packets[:, low:low + width] += add_packets
+        self.used = max(self.used, low + width)
+
+    def _grow(self, slots):
+        if slots <= self.bytes.shape[1]:
+            return
+        slots = max(slots, 2 * self.bytes.shape[1])
+        extra = slots - self.bytes.shape[1]
+        self.bytes = np.hstack([self.bytes, np.zeros((len(self.categories), extra), dtype=np.int64)])
+        self.packets = np.hstack([self.packets, np.zeros((len(self.categories), extra), dtype=np.int64)])
+
+    def level(self, resolution):
+        """(interval start times, bytes, packets) at one of the pyramid's resolutions; bytes and
+        packets have one row per category."""
+        factor = self.factors[self.levels.index(resolution)]
+        count = -(-self.used // factor)
+        padded = count * factor
+        fine_bytes = np.pad(self.bytes[:, :self.used], ((0, 0), (0, padded - self.used)))
+        fine_packets = np.pad(self.packets[:, :self.used], ((0, 0), (0, padded - self.used)))
+        times = np.arange(count) * factor * self.base_us / 1e6
+        return (times, fine_bytes.reshape(len(self.categories), count, factor).sum(axis=2),
+                fine_packets.reshape(len(self.categories), count, factor).sum(axis=2))
+
+    def pick_resolution(self, start, end, max_points=4000):
+        """The finest resolution that shows [start, end) in at most max_points intervals."""
+        for resolution in self.levels:
+            if (end - start) / resolution <= max_points:
+                return resolution
+        return self.levels[-1]
+
+    def window(self, start=0.0, end=None, resolution=None, max_points=4000):
+        """level() cut to [start, end) seconds, at `resolution` or the finest that fits max_points."""
+        end = self.used * self.base_us / 1e6 if end is None else end
+        resolution = resolution or self.pick_resolution(start, end, max_points)
+        times, volume, count = self.level(resolution)
+        keep = (times >= start - resolution) & (times < end)
+        return resolution, times[keep], volume[:, keep], count[:, keep]
+
+    def save(self, path):
+        np.savez(path, levels=np.array(self.levels), ports=np.array(self.ports, dtype=np.int64),
+                 origin_us=np.int64(self.origin_us or 0), bytes=self.bytes[:, :self.used], packets=self.packets[:, :self.used])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            pyramid = cls(levels=tuple(data['levels'].tolist()), ports=tuple(data['ports'].tolist()), table_bits=1)
+            pyramid.origin_us = int(data['origin_us'])
+            pyramid.bytes = data['bytes']
+            pyramid.packets = data['packets']
+        pyramid.used = pyramid.bytes.shape[1]
+        return pyramid
+
+    def plot(self, output_path, start=0.0, end=None, categories=None, max_points=4000):
+        """Bytes per interval of each category in [start, end), one panel per category."""
+        resolution, times, volume, _ = self.window(start, end, max_points=max_points)
+        categories = categories or self.categories
+        fig, axes = plt.subplots(len(categories), 1, figsize=(12, 2.2 * len(categories)), sharex=True, squeeze=False)
+        for axis, category in zip(axes[:, 0], categories):
+            axis.step(times, volume[self.categories.index(category)], where='post')
+            axis.set_ylabel(category)
+            axis.grid(True)
+        axes[0, 0].set_title(f"Data Volume per {resolution * 1000:g} ms Interval (bytes)")
+        axes[-1, 0].set_xlabel("Elapsed Time (seconds)")
+        fig.savefig(output_path, dpi=300)
+        plt.close(fig)
+
+    def finish(self, file_path, output_dir):
+        """Save the pyramid as <name>_io_pyramid.npz and plot the whole capture per category."""
+        base = os.path.splitext(os.path.basename(file_path))[0]
+        self.save(os.path.join(output_dir, base + "_io_pyramid.npz"))
+        if self.used:
+            self.plot(os.path.join(output_dir, base + "_io_categories.png"))
+        return {category: int(total) for category, total in zip(self.categories, self.bytes.sum(axis=1))}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IO graph of a Task2 capture")
+    parser.add_argument('--input', type=str, default=capture_file, help="Capture file")
+    parser.add_argument('--output', type=str, default=graph_directory, help="Folder for the graphs")
+    parser.add_argument('--resolution', type=float, default=time_resolution, help="Interval of the classic IO graph in seconds")
+    parser.add_argument('--pyramid', action='store_true', help="Also build the multi-resolution per-category pyramid (<name>_io_pyramid.npz)")
+    parser.add_argument('--zoom', type=float, nargs=2, metavar=('START', 'END'), default=None,
+                        help="Plot [START, END) seconds per category from the saved pyramid, without reading the capture")
+    parser.add_argument('--ports', type=str, default=",".join(str(p) for p in pyramid_ports), help="Comma-separated ports with their own category")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    base = os.path.splitext(os.path.basename(args.input))[0]
+    pyramid_file = os.path.join(args.output, base + "_io_pyramid.npz")
+    if args.zoom:
+        start, end = args.zoom
+        pyramid = IOPyramid.load(pyramid_file)
+        pyramid.plot(os.path.join(args.output, f"{base}_io_zoom_{start:g}-{end:g}.png"), start, end)
+        sys.exit(0)
 
-with open(capture_file, 'rb') as data_stream:
-    packet_reader = dpkt.pcap.Reader(data_stream)
-    relative_times = []
-    packet_lengths = []
-    base_time = None
-    
-    for timestamp, packet_data in tqdm(packet_reader, desc="Analyzing network data"):
-        if base_time is None:
-            base_time = timestamp
-        relative_times.append(timestamp - base_time)
-        packet_lengths.append(len(packet_data))
-
-    time_slots = defaultdict(int)
-    for event_time, data_size in zip(relative_times, packet_lengths):
-        time_index = int(event_time / time_resolution)
-        time_slots[time_index] += data_size
-
-    sorted_intervals = sorted(time_slots.keys())
-    traffic_data = [time_slots[interval] for interval in sorted_intervals]
-    graph_timepoints = [idx * time_resolution for idx in sorted_intervals]
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(graph_timepoints, traffic_data)
-    plt.xlabel("Elapsed Time (seconds)")
-    plt.ylabel("Data Volume per Interval (bytes)")
-    plt.title("Network Traffic Analysis")
-    plt.grid(True)
-
-    output_name = os.path.splitext(os.path.basename(capture_file))[0] + "_traffic_analysis.png"
-    plt.savefig(os.path.join(graph_directory, output_name), dpi=300)
-    plt.close()
\ No newline at end of file
+    packets = load_capture(args.input)
+    io_graph = IOGraph(args.resolution)
+    io_graph.feed(packets)
+    io_graph.finish(args.input, args.output)
+    if args.pyramid:
+        pyramid = IOPyramid(ports=[int(p) for p in args.ports.split(',') if p.strip()])
+        pyramid.feed(packets)
+        pyramid.finish(args.input, args.output)
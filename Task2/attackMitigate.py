@@ -1,9 +1,13 @@
+import argparse
+import os
 import subprocess
+import sys
 import time
 import threading
 from mininet.topo import Topo
 from mininet.net import Mininet
 from mininet.log import setLogLevel, info
+from synGuard import read_events
 
 class CustomNetwork(Topo):
     def build(self):
@@ -16,17 +20,25 @@ class CustomNetwork(Topo):
 
 
 def initiate_legit_traffic(source, destination_ip, port):
-    source.cmd(f'''
-                while true; 
-                do nc {destination_ip} {port} <<< "Hello, Server";
-                sleep 2;
-                done &
-            ''')
+    # Open-loop asyncio clients; per-second connect outcomes and latencies go to legit_traffic_mitigation.npz
+    source.cmd(f'{sys.executable} {client_script} --host {destination_ip} --port {port} --rate {legit_rate} '
+               f'--message "Hello, Server" --output legit_traffic_mitigation.npz &')
 
 
 def trigger_syn_flood(source, destination_ip, port):
     source.cmd(f'hping3 -S -p {port} --flood --rand-source {destination_ip} &')
 
+guard_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "synGuard.py")
+client_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "legitTraffic.py")
+server_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "targetServer.py")
+legit_rate = 20  # Legitimate connection attempts per second
+
+parser = argparse.ArgumentParser(description="SYN flood against hostB with a mitigation in place")
+parser.add_argument('--mode', choices=("static", "dynamic"), default="static",
+                    help="static: sysctls set before the flood; dynamic: synGuard.py detects the flood and mitigates it while it runs")
+args = parser.parse_args()
+mitigation_mode = args.mode
+
 setLogLevel('info')
 topology = CustomNetwork()
 network = Mininet(topology)
@@ -39,12 +51,18 @@ client, server = network.get('hostA', 'hostB')
 destination_ip = server.IP()
 destination_port = 9090
 
-# Updating network settings to mitigate SYN flood attack
-server.cmd('sysctl -w net.ipv4.tcp_max_syn_backlog=150')
-server.cmd('sysctl -w net.ipv4.tcp_syncookies=1')
-server.cmd('sysctl -w net.ipv4.tcp_synack_retries=4')
-
-client.cmd(f'tcpdump -w syn_mitigation.pcap -i {client.defaultIntf()} tcp &')
+if mitigation_mode == "static":
+    # Updating network settings to mitigate SYN flood attack
+    server.cmd('sysctl -w net.ipv4.tcp_max_syn_backlog=150')
+    server.cmd('sysctl -w net.ipv4.tcp_syncookies=1')
+    server.cmd('sysctl -w net.ipv4.tcp_synack_retries=4')
+else:
+    # The guard watches the server's interface and installs SYNPROXY once it sees the flood
+    server.cmd(f'{sys.executable} {guard_script} --interface {server.defaultIntf()} --port {destination_port} --output syn_guard &')
+
+# The target server's accepts, accept queue and established connections go to target_server_mitigation.csv, on the capture's clock
+server.cmd(f'{sys.executable} {server_script} --ports {destination_port} --output target_server_mitigation.csv &')
+client.cmd(f'tcpdump -s 128 -w syn_mitigation.pcap -i {client.defaultIntf()} tcp &')
 time.sleep(1)
 
 legit_traffic_thread = threading.Thread(target=initiate_legit_traffic, args=(client, destination_ip, destination_port))
@@ -64,8 +82,19 @@ syn_flood_thread.join()
 
 time.sleep(20)
 
-client.cmd('pkill nc')
+client.cmd('pkill -f legitTraffic.py')  # The generator writes its statistics on SIGTERM
+time.sleep(1)
 legit_traffic_thread.join()
 
 client.cmd('pkill tcpdump')
+server.cmd('pkill -f targetServer.py')
+if mitigation_mode == "dynamic":
+    server.cmd('pkill -f synGuard.py')  # The guard removes its rules and writes syn_guard_events.txt on exit
+    time.sleep(1)
+    events = read_events("syn_guard_events.txt")
+    if "detected" in events:
+        info(f"Flood detected {float(events['detected']) - syn_attack_start:.3f}s after it started, "
+             f"mitigated {events.get('onset_to_mitigated', 'never')}s after its onset\n")
+    else:
+        info("The guard did not detect the flood\n")
 network.stop()
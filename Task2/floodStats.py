@@ -0,0 +1,250 @@
+import argparse
+import matplotlib.pyplot as plt
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.fastPcap import iter_batches, ip_to_str, KIND_TCP
+from common.sketches import hash64, HyperLogLog, HeavyHitters
+
+TH_FIN, TH_SYN, TH_RST, TH_ACK = 0x01, 0x02, 0x04, 0x10
+attack_start_time = 20.0  # Attack start time, as in pcapAnalyser.py
+attack_end_time = 120.0   # Attack end time
+SOURCE_RING = 8  # intervals whose distinct-source sketch is still open
+
+class FloodStats:
+    """Per-interval SYN / SYN-ACK / ACK / RST counts, an estimate of the server's half-open backlog,
+    distinct SYN sources and the most targeted destinations, in one pass and fixed-size state.
+
+    The backlog is tracked in a table of 2**table_bits slots indexed by a hash of the client's
+    4-tuple: a SYN-ACK marks the slot pending, the client's next ACK clears it, and an entry
+    left pending for half_open_timeout seconds (the server giving up on the SYN-ACK) expires
+    (never with half_open_timeout None or 0). Hash
+    collisions make it an estimate, but the table never grows. Distinct sources come from
+    HyperLogLog sketches (one for the whole capture, one per interval) and heavy-hitter
+    destinations (ip:port of SYNs) from a count-min sketch.
+
+    The per-interval sketches live in a ring of SOURCE_RING rows: once SYNs arrive that many
+    intervals later, an interval's sketch is reduced to its estimate and the row reused (a SYN
+    older than that counts in the oldest open interval). What still grows with the capture's
+    duration is six numbers per interval (the counts, the backlog change and the estimate),
+    about 4 MB for a day at 1 s intervals.
+
+    A packet consumer for common.packetPipeline.
+    """
+
+    name = "flood"
+
+    def __init__(self, interval=1.0, half_open_timeout=10.0, table_bits=20, top_k=10):
+        self.interval = interval
+        self.timeout = half_open_timeout or None
+        self.mask = np.uint64((1 << table_bits) - 1)
+        self.pending = np.full(1 << table_bits, np.nan)  # SYN-ACK time per slot, NaN when empty
+        self.origin = None
+        self.last_time = 0.0
+        # Per-interval arrays, grown as the capture goes on; backlog_delta holds the change in the
+        # number of pending entries.
+        self.counts = {kind: np.zeros(0, dtype=np.int64) for kind in ("syn", "synack", "ack", "rst", "backlog_delta")}
+        self.sources = HyperLogLog(12)
+        self.interval_sources = HyperLogLog(11, rows=SOURCE_RING)
+        self.open_from = 0  # first interval whose sketch is still in the ring
+        self.distinct = np.zeros(0)  # estimates of the intervals before open_from
+        self.destinations = HeavyHitters(top_k)
+
+    def _bin(self, name, times, weights=None):
+        """Add events at `times` (seconds since the first packet) to a per-interval array."""
+        if not len(times):
+            return
+        index = np.maximum((times / self.interval).astype(np.int64), 0)
+        add = np.bincount(index, weights=weights).astype(np.int64)
+        current = self.counts[name]
+        if len(add) > len(current):
+            current = self.counts[name] = np.concatenate([current, np.zeros(max(len(add), 2 * len(current)) - len(current), dtype=np.int64)])
+        current[:len(add)] += add
+
+    def _slots(self, client_ip, client_port, server_ip, server_port):
+        hosts = (client_ip.astype(np.uint64) << np.uint64(32)) | server_ip.astype(np.uint64)
+        ports = (client_port.astype(np.uint64) << np.uint64(16)) | server_port.astype(np.uint64)
+        return ((hash64(hosts) ^ hash64(ports, seed=7)) & self.mask).astype(np.int64)
+
+    def feed(self, packets):
+        tcp = packets[packets['kind'] == KIND_TCP]
+        if not len(tcp):
+            return
+        if self.origin is None:
+            self.origin = tcp['ts'][0]
+        times = tcp['ts'] - self.origin
+        self.last_time = max(self.last_time, float(times.max()))
+        flags = tcp['flags']
+        syn = (flags & TH_SYN) != 0
+        ack = (flags & TH_ACK) != 0
+        rst = (flags & TH_RST) != 0
+        is_syn = syn & ~ack
+        is_synack = syn & ack
+        is_ack = ack & ~syn & ~rst
+
+        self._bin("syn", times[is_syn])
+        self._bin("synack", times[is_synack])
+        self._bin("ack", times[is_ack])
+        self._bin("rst", times[rst])
+
+        sources = tcp['src'][is_syn]
+        self.sources.add(sources)
+        self._add_sources(sources, times[is_syn])
+        self.destinations.add((tcp['dst'][is_syn].astype(np.int64) << 16) | tcp['dport'][is_syn])
+        self._track_backlog(tcp, times, is_synack, is_ack)
+
+    def _add_sources(self, sources, times):
+        if not len(sources):
+            return
+        index = np.maximum((times / self.interval).astype(np.int64), self.open_from)
+        # A batch can span more intervals than the ring holds: add what fits, then close the oldest.
+        while True:
+            fits = index < self.open_from + SOURCE_RING
+            self.interval_sources.add(sources[fits], index[fits] % SOURCE_RING)
+            sources, index = sources[~fits], index[~fits]
+            if not len(index):
+                break
+            self._close_sources(int(index.min()) - SOURCE_RING + 1)
+
+    def _close_sources(self, upto):
+        """Reduce the sketches of the intervals before `upto` to estimates and free their rows."""
+        if upto <= self.open_from:
+            return
+        if upto > len(self.distinct):
+            self.distinct = np.concatenate([self.distinct, np.zeros(max(upto, 2 * len(self.distinct)) - len(self.distinct))])
+        # Only the intervals still in the ring have sketches; later ones saw no SYN yet.
+        closing = np.arange(self.open_from, min(upto, self.open_from + SOURCE_RING))
+        self.distinct[closing] = self.interval_sources.estimate()[closing % SOURCE_RING]
+        self.interval_sources.registers[closing % SOURCE_RING] = 0
+        self.open_from = upto
+
+    def _track_backlog(self, tcp, times, is_synack, is_ack):
+        # A SYN-ACK goes from the server to the client, the completing ACK the other way.
+        slots = np.concatenate([
+            self._slots(tcp['dst'][is_synack], tcp['dport'][is_synack], tcp['src'][is_synack], tcp['sport'][is_synack]),
+            self._slots(tcp['src'][is_ack], tcp['sport'][is_ack], tcp['dst'][is_ack], tcp['dport'][is_ack]),
+        ])
+        event_times = np.concatenate([times[is_synack], times[is_ack]])
+        kinds = np.concatenate([np.ones(int(is_synack.sum()), dtype=bool), np.zeros(int(is_ack.sum()), dtype=bool)])
+        if not len(slots):
+            return
+        # Entries still pending from earlier batches take part as SYN-ACKs that come first.
+        touched = np.unique(slots)
+        carried = touched[~np.isnan(self.pending[touched])]
+        slots = np.concatenate([carried, slots])
+        event_times = np.concatenate([self.pending[carried], event_times])
+        kinds = np.concatenate([np.ones(len(carried), dtype=bool), kinds])
+        real = np.concatenate([np.zeros(len(carried), dtype=bool), np.ones(len(event_times) - len(carried), dtype=bool)])
+        order = np.lexsort((real, event_times, slots))
+        slots, event_times, kinds, real = slots[order], event_times[order], kinds[order], real[order]
+
+        same_as_prev = np.zeros(len(slots), dtype=bool)
+        same_as_prev[1:] = slots[1:] == slots[:-1]
+        prev_times = np.concatenate([[0.0], event_times[:-1]])
+        prev_kinds = np.concatenate([[False], kinds[:-1]])
+        occupied = same_as_prev & prev_kinds
+        if self.timeout is not None:
+            occupied &= event_times - prev_times <= self.timeout
+
+        # Every SYN-ACK schedules its entry's expiry `timeout` later; one into a free slot opens
+        # the entry, one into a pending slot (a retransmission or a collision) replaces it.
+        opens = real & kinds & ~occupied
+        self._bin("backlog_delta", event_times[opens])
+        if self.timeout is not None:
+            self._bin("backlog_delta", event_times[real & kinds] + self.timeout, weights=-np.ones(int((real & kinds).sum())))
+            # Any event on a pending slot cancels the expiry scheduled by the SYN-ACK before it,
+            # and an ACK closes the entry.
+            self._bin("backlog_delta", prev_times[occupied] + self.timeout, weights=np.ones(int(occupied.sum())))
+        closes = real & ~kinds & occupied
+        self._bin("backlog_delta", event_times[closes], weights=-np.ones(int(closes.sum())))
+
+        last = np.ones(len(slots), dtype=bool)
+        last[:-1] = ~same_as_prev[1:]
+        self.pending[slots[last]] = np.where(kinds[last], event_times[last], np.nan)
+
+    def intervals(self):
+        """Per-interval series: start times and counts, the backlog at each interval's end and
+        the estimated distinct SYN sources."""
+        n = int(self.last_time / self.interval) + 1 if self.origin is not None else 0
+        series = {"time": np.arange(n) * self.interval}
+        for kind, values in self.counts.items():
+            series[kind] = np.pad(values, (0, max(n - len(values), 0)))[:n]
+        series["backlog"] = np.cumsum(series.pop("backlog_delta"))
+        distinct = np.zeros(n)
+        closed = min(self.open_from, n)
+        distinct[:closed] = self.distinct[:closed]
+        still_open = np.arange(closed, min(self.open_from + SOURCE_RING, n))
+        distinct[still_open] = self.interval_sources.estimate()[still_open % SOURCE_RING]
+        series["distinct_sources"] = distinct
+        series["distinct_sources"][series["syn"] == 0] = 0
+        return series
+
+    def summary(self):
+        series = self.intervals()
+        return {
+            "seconds": self.last_time,
+            "syn": int(series["syn"].sum()),
+            "synack": int(series["synack"].sum()),
+            "ack": int(series["ack"].sum()),
+            "rst": int(series["rst"].sum()),
+            "peak_syn_rate": float(series["syn"].max() / self.interval) if len(series["syn"]) else 0.0,
+            "peak_backlog": int(series["backlog"].max()) if len(series["backlog"]) else 0,
+            "distinct_sources": round(self.sources.count()),
+            "top_destinations": [(f"{ip_to_str(key >> 16)}:{key & 0xffff}", count) for key, count in self.destinations.top()],
+        }
+
+    def finish(self, file_path, output_dir):
+        """Write <name>_flood_rates.csv, <name>_flood_summary.txt and <name>_flood_rates.png;
+        returns the summary."""
+        base = os.path.splitext(os.path.basename(file_path))[0]
+        series = self.intervals()
+        totals = self.summary()
+        columns = ("time", "syn", "synack", "ack", "rst", "backlog", "distinct_sources")
+        with open(os.path.join(output_dir, base + "_flood_rates.csv"), 'w') as f:
+            f.write(",".join(columns) + "\n")
+            for row in zip(*(series[c] for c in columns)):
+                f.write(f"{row[0]:.3f}," + ",".join(str(int(round(v))) for v in row[1:]) + "\n")
+        with open(os.path.join(output_dir, base + "_flood_summary.txt"), 'w') as f:
+            for key in ("seconds", "syn", "synack", "ack", "rst", "peak_syn_rate", "peak_backlog", "distinct_sources"):
+                f.write(f"{key}: {totals[key]}\n")
+            for destination, count in totals["top_destinations"]:
+                f.write(f"top destination {destination}: ~{count} SYNs\n")
+        if len(series["time"]):
+            self.plot(series, base, output_dir)
+        return totals
+
+    def plot(self, series, base, output_dir):
+        fig, (rates, backlog) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+        for kind, label in (("syn", "SYN"), ("synack", "SYN-ACK"), ("ack", "ACK"), ("rst", "RST")):
+            rates.plot(series["time"], series[kind] / self.interval, label=label)
+        rates.set_ylabel("Packets per second")
+        rates.set_title("TCP Handshake Rates")
+        backlog.plot(series["time"], series["backlog"], color='purple', label='Half-open backlog (estimate)')
+        backlog.plot(series["time"], series["distinct_sources"], color='gray', label='Distinct SYN sources per interval')
+        backlog.set_xlabel("Elapsed Time (seconds)")
+        backlog.set_ylabel("Entries")
+        for axis in (rates, backlog):
+            axis.axvline(x=attack_start_time, color='red', linestyle='--')
+            axis.axvline(x=attack_end_time, color='green', linestyle='--')
+            axis.grid(True)
+            axis.legend()
+        fig.savefig(os.path.join(output_dir, base + "_flood_rates.png"), dpi=300)
+        plt.close(fig)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming SYN-flood statistics of a Task2 capture")
+    parser.add_argument('--input', type=str, default="Q2_attack_copy.pcap", help="Capture file")
+    parser.add_argument('--output', type=str, default="flood_stats", help="Folder for the statistics and plot")
+    parser.add_argument('--interval', type=float, default=1.0, help="Interval width in seconds")
+    parser.add_argument('--half-open-timeout', type=float, default=10.0, help="Seconds before a pending SYN-ACK counts as abandoned (0: never)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    stats = FloodStats(interval=args.interval, half_open_timeout=args.half_open_timeout)
+    for packets in iter_batches(args.input):
+        stats.feed(packets)
+    totals = stats.finish(args.input, args.output)
+    print(f"{totals['syn']} SYNs from ~{totals['distinct_sources']} sources, peak {totals['peak_syn_rate']:.0f}/s, "
+          f"peak half-open backlog ~{totals['peak_backlog']}")
@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import resource
+import signal
+import time
+import numpy as np
+
+# Legitimate clients for the SYN-flood scenarios, run inside the client host
+# (e.g. client.cmd('python3 legitTraffic.py --host 10.0.0.2 --port 8080 --rate 200 &')).
+
+OUTCOMES = ("success", "timeout", "reset", "error")
+# Connect latency histogram bins: 0.1 ms to 10 s, 8 per decade, plus under- and overflow.
+LATENCY_EDGES = np.logspace(-4, 1, 41)
+
+class ConnectionLog:
+    """Per-second outcome counts and connect-latency histograms, the second being the epoch
+    second in which the connection attempt started (the same clock as the capture)."""
+
+    def __init__(self):
+        self.first_second = None
+        self.counts = np.zeros((0, len(OUTCOMES)), dtype=np.uint32)
+        self.histogram = np.zeros((0, len(LATENCY_EDGES) + 1), dtype=np.uint32)
+        self.skipped = np.zeros(0, dtype=np.uint32)  # attempts not made because max_in_flight was reached
+
+    def _row(self, started):
+        second = int(started)
+        if self.first_second is None:
+            self.first_second = second
+        row = second - self.first_second
+        if row >= len(self.counts):
+            extra = max(row + 1, 2 * len(self.counts)) - len(self.counts)
+            self.counts = np.vstack([self.counts, np.zeros((extra, len(OUTCOMES)), dtype=np.uint32)])
+            self.histogram = np.vstack([self.histogram, np.zeros((extra, self.histogram.shape[1]), dtype=np.uint32)])
+            self.skipped = np.concatenate([self.skipped, np.zeros(extra, dtype=np.uint32)])
+        return row
+
+    def record(self, started, outcome, latency=None):
+        row = self._row(started)
+        self.counts[row, OUTCOMES.index(outcome)] += 1
+        if latency is not None:
+            self.histogram[row, np.searchsorted(LATENCY_EDGES, latency, side='right')] += 1
+
+    def skip(self, started):
+        self.skipped[self._row(started)] += 1
+
+    def used(self):
+        return int(np.max(np.nonzero(self.counts.sum(axis=1) + self.skipped)[0], initial=-1)) + 1
+
+    def save(self, path):
+        """Write the log as a compressed .npz: seconds (epoch), counts[second, outcome],
+        histogram[second, bin] over latency_edges (bin 0 below the first edge), skipped[second]."""
+        used = self.used()
+        np.savez_compressed(path, seconds=np.arange(used, dtype=np.int64) + (self.first_second or 0),
+                            outcomes=np.array(OUTCOMES), counts=self.counts[:used], histogram=self.histogram[:used],
+                            latency_edges=LATENCY_EDGES, skipped=self.skipped[:used])
+
+    def summary(self):
+        totals = dict(zip(OUTCOMES, self.counts.sum(axis=0).tolist()))
+        totals["skipped"] = int(self.skipped.sum())
+        histogram = self.histogram.sum(axis=0)
+        if histogram.sum():
+            # Median from the histogram: the upper edge of the bin holding the middle connection.
+            middle = int(np.searchsorted(np.cumsum(histogram), histogram.sum() / 2))
+            totals["median_latency_ms"] = float(LATENCY_EDGES[min(middle, len(LATENCY_EDGES) - 1)] * 1000)
+        return totals
+
+async def connect_once(host, port, timeout, payload, log):
+    started = time.time()
+    clock = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except asyncio.TimeoutError:
+        log.record(started, "timeout")
+        return
+    except (ConnectionResetError, ConnectionRefusedError):
+        log.record(started, "reset")  # the server (or a mitigation) answered the SYN with a RST
+        return
+    except OSError:
+        log.record(started, "error")
+        return
+    log.record(started, "success", time.perf_counter() - clock)
+    try:
+        writer.write(payload)
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+    except OSError:
+        pass  # the handshake already succeeded; what happens afterwards is not a connect outcome
+
+async def generate(host, port, rate, duration, timeout, max_in_flight, payload, log):
+    """Open-loop pacing: attempt k starts at start + k / rate whether or not earlier ones have
+    finished, so a slow server shows up as latency and timeouts instead of a lower offered load."""
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    in_flight = set()
+    start = time.perf_counter()
+    launched = 0
+    while not stopping.is_set():
+        elapsed = time.perf_counter() - start
+        if duration and elapsed >= duration:
+            break
+        # Launch every attempt that is due; at thousands per second one wake-up covers several.
+        due = int(elapsed * rate) + 1
+        while launched < due:
+            launched += 1
+            if len(in_flight) >= max_in_flight:
+                log.skip(time.time())
+                continue
+            task = asyncio.ensure_future(connect_once(host, port, timeout, payload, log))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        try:
+            await asyncio.wait_for(stopping.wait(), max(launched / rate - (time.perf_counter() - start), 0.0))
+        except asyncio.TimeoutError:
+            pass
+    if stopping.is_set():
+        # Stopped by a signal: the attempts still open are dropped so the file is written at once.
+        for task in in_flight:
+            task.cancel()
+    elif in_flight:
+        await asyncio.wait(in_flight, timeout=timeout + 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop legitimate TCP clients with per-second connect statistics")
+    parser.add_argument('--host', type=str, required=True, help="Server address")
+    parser.add_argument('--port', type=int, default=8080, help="Server port")
+    parser.add_argument('--rate', type=float, default=20.0, help="Connection attempts per second")
+    parser.add_argument('--duration', type=float, default=0.0, help="Seconds to run (0: until SIGTERM/SIGINT)")
+    parser.add_argument('--timeout', type=float, default=3.0, help="Seconds before a connect attempt counts as timed out")
+    parser.add_argument('--max-in-flight', type=int, default=10000, help="Attempts open at once; further ones are counted as skipped")
+    parser.add_argument('--message', type=str, default="Hello, Server", help="Line sent on every connection")
+    parser.add_argument('--output', type=str, default="legit_traffic.npz", help="Per-second statistics file")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))  # one descriptor per open attempt
+    log = ConnectionLog()
+    asyncio.run(generate(args.host, args.port, args.rate, args.duration, args.timeout, args.max_in_flight,
+                         (args.message + "\n").encode(), log))
+    log.save(args.output)
+    print(log.summary())
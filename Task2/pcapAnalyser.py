@@ -1,10 +1,13 @@
-import dpkt # I am using dpkt to read the pcap file
-import datetime
+import dpkt # I am using dpkt for the TCP flag constants
 import matplotlib.pyplot as plt
 import os
-from collections import defaultdict
+import sys
+from collections import defaultdict, deque
 from tqdm import tqdm
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.fastPcap import iter_batches, timestamps_us, KIND_TCP
+
 def plot_connection_durations(start_times, durations, attack_start_time, attack_end_time, filename, output_dir):
     if not start_times: 
         print(f"No connection data to plot for {filename}")
@@ -29,56 +32,157 @@ pcap_file = "Q2_attack_copy.pcap" # I changed the name of the pcap file to Q2_at
 attack_start_time = 20.0  # Attack start time
 attack_end_time = 120.0   # Attack end time
 output_dir_plots = "connection_duration_plots" # This was the output directory for the plots
-
-os.makedirs(output_dir_plots, exist_ok=True) # Create output directory if it doesn't exist
-connections = defaultdict(lambda: {'start_time': None, 'end_time': None}) # This will store the connection data
-
-with open(pcap_file, 'rb') as f: # We will first read the pcap file in binary mode
-    pcap = dpkt.pcap.Reader(f) # We will use dpkt to read the pcap file
-    first_packet_time = None 
-
-    for ts, buf in tqdm(pcap, desc="Processing packets"):  # We will iterate over the packets in the pcap file
-        eth = dpkt.ethernet.Ethernet(buf) # We will read the ethernet frame
-        if isinstance(eth.data, dpkt.ip.IP): # We will check if the packet is an IP packet
-            ip = eth.data
-            if isinstance(ip.data, dpkt.tcp.TCP): # We will check if the IP packet is a TCP packet
-                tcp = ip.data
-                connection_id = (ip.src, ip.dst, tcp.sport, tcp.dport) # This is the 4-tuple that uniquely identifies a connection
-
-                if first_packet_time is None: # We will store the time of the first packet
-                    first_packet_time = datetime.datetime.utcfromtimestamp(ts) # We will convert the timestamp to a datetime object
-
-                packet_time = datetime.datetime.utcfromtimestamp(ts) # We will convert the timestamp to a datetime object
-
-                if tcp.flags & dpkt.tcp.TH_SYN: # We will check if the packet is a SYN packet
-                    if connections[connection_id]['start_time'] is None:
-                        connections[connection_id]['start_time'] = packet_time
-
-                if tcp.flags & dpkt.tcp.TH_FIN and tcp.flags & dpkt.tcp.TH_ACK: # We will check if the packet is a FIN-ACK packet
-                    connections[connection_id]['fin_ack_time'] = packet_time
-
-                if tcp.flags & dpkt.tcp.TH_RST: # We will check if the packet is a RST packet
-                    connections[connection_id]['end_time'] = packet_time
-
-                if tcp.flags & dpkt.tcp.TH_ACK and 'fin_ack_time' in connections[connection_id]: # We will check if the packet is an ACK packet that acknowledges the FIN-ACK
-                    if packet_time > connections[connection_id]['fin_ack_time']:
-                        connections[connection_id]['end_time'] = packet_time
-
-    connection_durations = []
-    connection_start_times = []
-
-    for connection_id, connection_data in connections.items(): # We will iterate over the connections
-        if connection_data['start_time'] is None:
-            continue
-        start_time = connection_data['start_time'] # We will get the start time of the connection
-        end_time = connection_data.get('end_time') # We will get the end time of the connection
-
-        if end_time: # We will calculate the duration of the connection
-            duration = (end_time - start_time).total_seconds()
-        else:
-            duration = 100.0 # If the connection is not closed, we will assume a default duration of 100 seconds
-
-        connection_durations.append(duration) # We will store the duration of the connection
-        connection_start_times.append((start_time - first_packet_time).total_seconds()) # We will store the start time of the connection
+half_open_timeout = 10.0  # Seconds a SYN may wait for its handshake to complete before it only counts in the totals (None or 0 keeps every entry)
+
+class Connection:
+    """One direction of a TCP connection, opened by a SYN. Times are integer microseconds."""
+
+    __slots__ = ('start_time', 'fin_ack_time', 'end_time', 'established')
+
+    def __init__(self, start_time):
+        self.start_time = start_time
+        self.fin_ack_time = None
+        self.end_time = None
+        self.established = False  # an ACK without SYN has followed the SYN: the handshake completed
+
+def connection_key(src, dst, sport, dport):
+    """The 4-tuple packed into one int, which is far smaller than a tuple as a dict key."""
+    return (src << 64) | (dst << 32) | (sport << 16) | dport
+
+class ConnectionLifetimes:
+    """Start time and duration of every TCP connection, fed one batch of decoded packets at a time.
+
+    Each spoofed SYN of a flood opens an entry that never completes, so entries still half-open
+    half_open_timeout seconds after their SYN are dropped and only counted, per second of the
+    capture; full records are kept for connections whose handshake completed. Memory is then
+    bounded by the SYN rate times the timeout instead of the length of the flood. With
+    half_open_timeout=None (or 0) every entry is kept and plotted, half-open ones with the
+    default duration of 100 seconds.
+
+    A packet consumer for common.packetPipeline; the script below feeds it one batch at a time.
+    """
+
+    name = "connections"
+
+    def __init__(self, progress=False, half_open_timeout=half_open_timeout):
+        self.connections = {} # This will store the connection data, keyed by connection_key
+        self.first_packet_time = None # We will store the time of the first packet
+        self.progress = progress
+        self.timeout_us = int(half_open_timeout * 1e6) if half_open_timeout else None
+        self.pending = deque() # (start time, key) of entries that may still be half-open, oldest first
+        self.opened = 0
+        self.half_open_evicted = 0
+        self.half_open_reset = 0
+        self.evicted_per_second = defaultdict(int) # SYN second (since the first packet) -> evicted entries
+        self.peak_entries = 0
+
+    def evict(self, now):
+        """Drop the entries whose handshake has not completed within the timeout of `now`."""
+        pending = self.pending
+        connections = self.connections
+        deadline = now - self.timeout_us
+        while pending and pending[0][0] < deadline:
+            start_time, key = pending.popleft()
+            connection = connections.get(key)
+            if connection is not None and connection.start_time == start_time and not connection.established:
+                del connections[key]
+                self.half_open_evicted += 1
+                self.evicted_per_second[(start_time - self.first_packet_time) // 1000000] += 1
+
+    def feed(self, packets):
+        tcp_packets = packets[packets['kind'] == KIND_TCP] # We will only keep the TCP packets
+        packet_times = timestamps_us(tcp_packets['ts']).tolist() # Microsecond timestamps, rounded the same way datetime.utcfromtimestamp rounds them
+        if self.first_packet_time is None and packet_times:
+            self.first_packet_time = packet_times[0]
+
+        connections = self.connections
+        evicting = self.timeout_us is not None
+        columns = zip(tcp_packets['src'].tolist(), tcp_packets['dst'].tolist(), tcp_packets['sport'].tolist(),
+                      tcp_packets['dport'].tolist(), tcp_packets['flags'].tolist(), packet_times)
+        for src, dst, sport, dport, flags, packet_time in tqdm(columns, total=len(packet_times), desc="Processing packets", disable=not self.progress):  # We will iterate over the TCP packets in the pcap file
+            if evicting and self.pending and self.pending[0][0] < packet_time - self.timeout_us:
+                self.evict(packet_time)
+            connection_id = connection_key(src, dst, sport, dport) # The 4-tuple that uniquely identifies a connection
+            connection = connections.get(connection_id)
+
+            if flags & dpkt.tcp.TH_SYN: # We will check if the packet is a SYN packet
+                if connection is None:
+                    connection = connections[connection_id] = Connection(packet_time)
+                    self.opened += 1
+                    if evicting:
+                        self.pending.append((packet_time, connection_id))
+                    if len(connections) > self.peak_entries:
+                        self.peak_entries = len(connections)
+            elif connection is None:
+                continue # Only connections we saw opening are tracked
+            elif flags & dpkt.tcp.TH_ACK:
+                connection.established = True
+
+            if flags & dpkt.tcp.TH_FIN and flags & dpkt.tcp.TH_ACK: # We will check if the packet is a FIN-ACK packet
+                connection.fin_ack_time = packet_time
+
+            if flags & dpkt.tcp.TH_RST: # We will check if the packet is a RST packet
+                if evicting and not connection.established:
+                    del connections[connection_id] # A refused or aborted handshake only counts in the totals
+                    self.half_open_reset += 1
+                    continue
+                connection.end_time = packet_time
+
+            if flags & dpkt.tcp.TH_ACK and connection.fin_ack_time is not None: # We will check if the packet is an ACK packet that acknowledges the FIN-ACK
+                if packet_time > connection.fin_ack_time:
+                    connection.end_time = packet_time
+
+    def durations(self):
+        """(start times, durations) in seconds, one entry per tracked connection."""
+        connection_durations = []
+        connection_start_times = []
+
+        for connection in self.connections.values(): # We will iterate over the connections
+            if self.timeout_us is not None and not connection.established:
+                continue # Still half-open at the end of the capture; counted in summary()
+            start_time = connection.start_time # We will get the start time of the connection
+            end_time = connection.end_time # We will get the end time of the connection
+
+            if end_time: # We will calculate the duration of the connection
+                duration = (end_time - start_time) / 1e6
+            else:
+                duration = 100.0 # If the connection is not closed, we will assume a default duration of 100 seconds
+
+            connection_durations.append(duration) # We will store the duration of the connection
+            connection_start_times.append((start_time - self.first_packet_time) / 1e6) # We will store the start time of the connection
+        return connection_start_times, connection_durations
+
+    def summary(self):
+        """Aggregate counters of the connection table."""
+        established = sum(1 for connection in self.connections.values() if connection.established)
+        return {
+            "opened": self.opened,
+            "established": established,
+            "half_open_evicted": self.half_open_evicted,
+            "half_open_reset": self.half_open_reset,
+            "half_open_at_end": len(self.connections) - established,
+            "peak_entries": self.peak_entries,
+            "evicted_per_second": dict(sorted(self.evicted_per_second.items())),
+        }
+
+    def finish(self, file_path, output_dir):
+        """Plot the connection durations and write the table's counters next to the plot;
+        returns the counters."""
+        start_times, durations = self.durations()
+        plot_connection_durations(start_times, durations, attack_start_time, attack_end_time, os.path.basename(file_path), output_dir)
+        totals = self.summary()
+        summary_file = os.path.splitext(os.path.basename(file_path))[0] + "_connection_summary.txt"
+        with open(os.path.join(output_dir, summary_file), 'w') as f:
+            for name in ("opened", "established", "half_open_evicted", "half_open_reset", "half_open_at_end", "peak_entries"):
+                f.write(f"{name}: {totals[name]}\n")
+            f.write("evicted half-open per second: " + " ".join(f"{second}:{count}" for second, count in totals["evicted_per_second"].items()) + "\n")
+        return totals
+
+if __name__ == "__main__":
+    os.makedirs(output_dir_plots, exist_ok=True) # Create output directory if it doesn't exist
+    lifetimes = ConnectionLifetimes()
+    # We will decode the pcap file in batches with the fast header reader, so memory follows the connection table rather than the capture
+    for packets in tqdm(iter_batches(pcap_file), desc="Processing packet batches"):
+        lifetimes.feed(packets)
     # We will plot the connection durations and save the plot
-    plot_connection_durations(connection_start_times, connection_durations, attack_start_time, attack_end_time, os.path.basename(pcap_file), output_dir_plots)
+    lifetimes.finish(pcap_file, output_dir_plots)
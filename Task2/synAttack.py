@@ -1,4 +1,6 @@
+import os
 import subprocess
+import sys
 import time
 import threading
 from mininet.topo import Topo
@@ -15,12 +17,17 @@ class NetworkTopology(Topo):
         self.addLink(network_switch, server_node, bw=10)
 
 def begin_benign_connection(node, target_ip, port):
-    node.cmd(f'''while true; do nc {target_ip} {port} <<< "Hello";
-                sleep 1; done &''')
+    # Open-loop asyncio clients; per-second connect outcomes and latencies go to legit_traffic_attack.npz
+    node.cmd(f'{sys.executable} {client_script} --host {target_ip} --port {port} --rate {benign_rate} '
+             f'--message "Hello" --output legit_traffic_attack.npz &')
 
 def initiate_syn_attack(node, target_ip, port):
     node.cmd(f'hping3 -S -p {port} --flood --rand-source {target_ip} &')
 
+client_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "legitTraffic.py")
+server_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "targetServer.py")
+benign_rate = 20  # Benign connection attempts per second
+
 setLogLevel('info')
 custom_topo = NetworkTopology()
 network = Mininet(custom_topo)
@@ -37,7 +44,9 @@ server.cmd('sysctl -w net.ipv4.tcp_max_syn_backlog=10000')
 server.cmd('sysctl -w net.ipv4.tcp_syncookies=0')
 server.cmd('sysctl -w net.ipv4.tcp_synack_retries=1')
 
-client.cmd(f'tcpdump -w SYN_attack.pcap -i {client.defaultIntf()} tcp &')
+# The target server's accepts, accept queue and established connections go to target_server_attack.csv, on the capture's clock
+server.cmd(f'{sys.executable} {server_script} --ports {port} --output target_server_attack.csv &')
+client.cmd(f'tcpdump -s 128 -w SYN_attack.pcap -i {client.defaultIntf()} tcp &')
 time.sleep(1)
 
 benign_thread = threading.Thread(target=begin_benign_connection, 
@@ -59,8 +68,10 @@ attack_thread.join()
 
 time.sleep(20)
 
-client.cmd('pkill nc')
+client.cmd('pkill -f legitTraffic.py')  # The generator writes its statistics on SIGTERM
+time.sleep(1)
 benign_thread.join()
 
 client.cmd('pkill tcpdump')
+server.cmd('pkill -f targetServer.py')
 network.stop()
\ No newline at end of file
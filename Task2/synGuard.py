@@ -0,0 +1,227 @@
+import argparse
+import ctypes
+import os
+import signal
+import socket
+import struct
+import subprocess
+import time
+
+# Run inside the server host's namespace (e.g. server.cmd('python3 synGuard.py ... &') in
+# attackMitigate.py): it watches the interface, detects the SYN flood and installs the
+# mitigation while the attack is running.
+
+ETH_P_ALL = 0x0003
+SO_ATTACH_FILTER = 26
+PACKET_OUTGOING = 4
+TH_SYN, TH_RST, TH_ACK = 0x02, 0x04, 0x10
+NORMAL, DETECTED, MITIGATED = 0, 1, 2
+
+def syn_filter(interface, port):
+    """Classic BPF program passing only SYN / SYN-ACK segments of the port, compiled by tcpdump -dd.
+    Returns None when tcpdump is not available; every frame is then parsed in Python."""
+    try:
+        listing = subprocess.run(['tcpdump', '-i', interface, '-dd', f'tcp port {port} and tcp[tcpflags] & tcp-syn != 0'],
+                                 capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    program = [tuple(int(field, 0) for field in line.strip().strip('{},').split(','))
+               for line in listing.splitlines() if line.strip().startswith('{')]
+    return b''.join(struct.pack('HBBI', *instruction) for instruction in program), len(program)
+
+def open_socket(interface, port):
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+    compiled = syn_filter(interface, port)
+    if compiled is not None:
+        # The kernel then wakes us only for handshake segments instead of every frame of the run.
+        code, length = compiled
+        buffer = ctypes.create_string_buffer(code)
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, struct.pack('HL', length, ctypes.addressof(buffer)))
+        sock._filter = buffer  # the program must outlive the setsockopt call
+    sock.bind((interface, 0))
+    sock.settimeout(0.01)
+    return sock
+
+def mitigation_rules(mode, port, rate, burst):
+    """(table, chain, rule) triples installed by the mitigation, in insertion order."""
+    if mode == "hashlimit":
+        # The flood spoofs random sources, so the SYNs are limited per destination port rather than per source.
+        return [('filter', 'INPUT', ['-p', 'tcp', '--syn', '--dport', str(port), '-m', 'hashlimit', '--hashlimit-name', 'synguard',
+                                     '--hashlimit-mode', 'dstport', '--hashlimit-above', f'{rate}/sec',
+                                     '--hashlimit-burst', str(burst), '-j', 'DROP'])]
+    # SYNPROXY answers the SYNs with cookies itself, so only clients that complete the handshake reach the listener.
+    return [('raw', 'PREROUTING', ['-p', 'tcp', '--syn', '--dport', str(port), '-j', 'CT', '--notrack']),
+            ('filter', 'INPUT', ['-p', 'tcp', '--dport', str(port), '-m', 'conntrack', '--ctstate', 'INVALID,UNTRACKED',
+                                 '-j', 'SYNPROXY', '--sack-perm', '--timestamp', '--wscale', '7', '--mss', '1460']),
+            ('filter', 'INPUT', ['-p', 'tcp', '--dport', str(port), '-m', 'conntrack', '--ctstate', 'INVALID', '-j', 'DROP'])]
+
+class SynGuard:
+    """Per-tick SYN / SYN-ACK counts of one port with an anomaly detector and on-the-fly mitigation.
+
+    The SYN rate of each tick is compared with max(min_rate, factor x baseline), where the
+    baseline is an exponential average of the rate while no attack is going on. `hold`
+    consecutive ticks above it are a detection; the attack's onset is the start of the first of
+    them. The mitigation rules are then installed at once, and once the rate has stayed below the
+    threshold for `cooldown` seconds the attack is logged as over (and the rules removed with release).
+    """
+
+    def __init__(self, port, mode="synproxy", tick=0.1, min_rate=200.0, factor=10.0, hold=2, cooldown=5.0,
+                 limit_rate=100, limit_burst=200, release=False):
+        self.port = port
+        self.tick = tick
+        self.min_rate = min_rate
+        self.factor = factor
+        self.hold = hold
+        self.cooldown = cooldown
+        self.release = release
+        self.rules = mitigation_rules(mode, port, limit_rate, limit_burst)
+        self.mode = mode
+        self.baseline = 0.0
+        self.state = NORMAL
+        self.above = 0  # consecutive ticks above the threshold
+        self.below_since = None
+        self.onset = None
+        self.installed = []
+        self.events = []  # (name, epoch seconds)
+
+    def threshold(self):
+        return max(self.min_rate, self.factor * self.baseline)
+
+    def iptables(self, action, table, chain, rule):
+        position = ['1'] if action == '-I' else []
+        subprocess.run(['iptables', '-t', table, action, chain] + position + rule, check=True)
+
+    def mitigate(self):
+        if self.mode == "synproxy":
+            subprocess.run(['sysctl', '-qw', 'net.netfilter.nf_conntrack_tcp_loose=0'], check=False)
+            subprocess.run(['sysctl', '-qw', 'net.ipv4.tcp_timestamps=1'], check=False)
+        # -I puts a rule first, so they are inserted last-to-first to keep their order.
+        for table, chain, rule in reversed(self.rules):
+            self.iptables('-I', table, chain, rule)
+            self.installed.append((table, chain, rule))
+
+    def unmitigate(self):
+        while self.installed:
+            table, chain, rule = self.installed.pop()
+            self.iptables('-D', table, chain, rule)
+
+    def update(self, start, syn):
+        """Feed the SYN count of the tick starting at `start` (epoch seconds); returns the state."""
+        rate = syn / self.tick
+        threshold = self.threshold()
+        if rate > threshold:
+            self.above += 1
+            self.below_since = None
+            if self.above == 1:
+                self.onset = start
+            if self.state == NORMAL and self.above >= self.hold:
+                self.state = DETECTED
+                self.events += [("onset", self.onset), ("detected", time.time())]
+                try:
+                    self.mitigate()
+                except (OSError, subprocess.CalledProcessError) as err:
+                    print(f"Mitigation failed: {err}")  # keep detecting and logging without it
+                    self.events.append(("mitigation_failed", time.time()))
+                else:
+                    self.state = MITIGATED
+                    self.events.append(("mitigated", time.time()))
+        else:
+            self.above = 0
+            if self.state == NORMAL:
+                self.baseline += 0.05 * (rate - self.baseline)
+            elif self.below_since is None:
+                self.below_since = start
+            elif start + self.tick - self.below_since >= self.cooldown:
+                self.events.append(("attack_end", self.below_since))
+                if self.release:
+                    self.unmitigate()
+                    self.events.append(("released", time.time()))
+                self.state = NORMAL
+                self.below_since = None
+        return self.state
+
+    def summary(self):
+        """Event times plus detection latency and time-to-mitigate of the first attack, in seconds."""
+        times = {}
+        for name, when in self.events:
+            times.setdefault(name, when)
+        totals = {name: f"{when:.6f}" for name, when in times.items()}
+        if "detected" in times:
+            totals["detection_latency"] = f"{times['detected'] - times['onset']:.3f}"
+        if "mitigated" in times:
+            totals["time_to_mitigate"] = f"{times['mitigated'] - times['detected']:.3f}"
+            totals["onset_to_mitigated"] = f"{times['mitigated'] - times['onset']:.3f}"
+        totals["attacks"] = sum(1 for name, _ in self.events if name == "detected")
+        totals["mode"] = self.mode
+        return totals
+
+def stop(signum, frame):
+    raise KeyboardInterrupt  # pkill's SIGTERM ends the run like Ctrl-C, writing the events
+
+def run(guard, interface, output):
+    """Watch the interface until SIGTERM/SIGINT; per-tick counts go to <output>_rates.csv and the
+    events to <output>_events.txt. Times are epoch seconds, like the capture's timestamps."""
+    signal.signal(signal.SIGTERM, stop)
+    sock = open_socket(interface, guard.port)
+    port = guard.port
+    buffer = bytearray(256)
+    syn = synack = 0
+    tick_start = time.time()
+    with open(output + "_rates.csv", 'w') as rates:
+        rates.write("time,syn,synack,threshold,state\n")
+        try:
+            while True:
+                try:
+                    size, address = sock.recvfrom_into(buffer)
+                except socket.timeout:
+                    size = 0
+                if size >= 34 and buffer[12] == 0x08 and buffer[13] == 0x00 and buffer[23] == socket.IPPROTO_TCP:
+                    offset = 14 + (buffer[14] & 0x0f) * 4
+                    if size >= offset + 14:
+                        flags = buffer[offset + 13]
+                        if flags & TH_SYN:
+                            if flags & TH_ACK:
+                                if address[2] == PACKET_OUTGOING and (buffer[offset] << 8 | buffer[offset + 1]) == port:
+                                    synack += 1
+                            elif address[2] != PACKET_OUTGOING and (buffer[offset + 2] << 8 | buffer[offset + 3]) == port:
+                                syn += 1
+                now = time.time()
+                while now >= tick_start + guard.tick:
+                    threshold = guard.threshold()
+                    state = guard.update(tick_start, syn)
+                    rates.write(f"{tick_start:.3f},{syn},{synack},{threshold:.0f},{state}\n")
+                    syn = synack = 0
+                    tick_start += guard.tick
+        except KeyboardInterrupt:
+            pass
+        finally:
+            guard.unmitigate()
+            with open(output + "_events.txt", 'w') as f:
+                for key, value in guard.summary().items():
+                    f.write(f"{key}: {value}\n")
+
+def read_events(path):
+    """The key: value lines of a <output>_events.txt file as a dict of strings."""
+    with open(path) as f:
+        return dict(line.rstrip("\n").split(": ", 1) for line in f if ": " in line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect a SYN flood on the server host and mitigate it while it runs")
+    parser.add_argument('--interface', type=str, required=True, help="Server interface to watch (e.g. hostB-eth0)")
+    parser.add_argument('--port', type=int, default=9090, help="Server port under attack")
+    parser.add_argument('--mode', choices=("synproxy", "hashlimit"), default="synproxy", help="Mitigation installed on detection")
+    parser.add_argument('--output', type=str, default="syn_guard", help="Prefix of the rates CSV and events file")
+    parser.add_argument('--tick', type=float, default=0.1, help="Detector interval in seconds")
+    parser.add_argument('--min-rate', type=float, default=200.0, help="SYNs per second never considered an attack")
+    parser.add_argument('--factor', type=float, default=10.0, help="Multiple of the baseline SYN rate considered an attack")
+    parser.add_argument('--hold', type=int, default=2, help="Consecutive ticks above the threshold before mitigating")
+    parser.add_argument('--cooldown', type=float, default=5.0, help="Seconds below the threshold before the attack counts as over")
+    parser.add_argument('--limit-rate', type=int, default=100, help="hashlimit: SYNs per second let through")
+    parser.add_argument('--limit-burst', type=int, default=200, help="hashlimit: burst let through")
+    parser.add_argument('--release', action='store_true', help="Remove the rules when the attack is over instead of at exit")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    guard = SynGuard(args.port, mode=args.mode, tick=args.tick, min_rate=args.min_rate, factor=args.factor, hold=args.hold,
+                     cooldown=args.cooldown, limit_rate=args.limit_rate, limit_burst=args.limit_burst, release=args.release)
+    run(guard, args.interface, args.output)
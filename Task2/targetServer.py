@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import struct
+import time
+
+# The server the SYN-flood scenarios attack, run inside the server host
+# (e.g. server.cmd('python3 targetServer.py --ports 8080 --output target_server.csv &')).
+
+TCP_LISTEN, TCP_SYN_RECV, TCP_ESTABLISHED = 0x0A, 0x03, 0x01
+COUNTERS = 3  # per worker and port: accepts, accept queue length, accept queue limit
+
+def listen_queue(sock):
+    """(queued connections, queue limit) of a listening socket. For a listener TCP_INFO's
+    tcpi_unacked and tcpi_sacked hold the accept queue's length and limit."""
+    info = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, 32)
+    return struct.unpack_from('II', info, 24)
+
+def socket_states(ports):
+    """{port: (SYN_RECV, ESTABLISHED)} of the local ports from /proc/net/tcp, the same table ss reads."""
+    counts = {port: [0, 0] for port in ports}
+    with open('/proc/net/tcp') as f:
+        next(f)
+        for line in f:
+            fields = line.split(None, 4)
+            port = int(fields[1].rsplit(':', 1)[1], 16)
+            if port in counts:
+                state = int(fields[3], 16)
+                if state == TCP_SYN_RECV:
+                    counts[port][0] += 1
+                elif state == TCP_ESTABLISHED:
+                    counts[port][1] += 1
+    return counts
+
+async def handle(reader, writer):
+    # Read the client's line (nc and legitTraffic.py send one) and close, as a tiny request/response server would.
+    try:
+        await asyncio.wait_for(reader.readline(), 5.0)
+        writer.write(b"OK\n")
+        await writer.drain()
+    except (asyncio.TimeoutError, OSError):
+        pass
+    writer.close()
+
+async def serve(index, ports, backlog, counters, interval):
+    base = index * len(ports) * COUNTERS
+    listeners = []
+    for slot, port in enumerate(ports):
+        def accepted(reader, writer, slot=slot):
+            counters[base + slot * COUNTERS] += 1  # only this worker writes its slots, so no lock is needed
+            return handle(reader, writer)
+        # Every worker binds its own listening socket with SO_REUSEPORT, so the kernel spreads the
+        # handshakes over the workers' accept queues and they accept in parallel (epoll under asyncio).
+        server = await asyncio.start_server(accepted, '0.0.0.0', port, backlog=backlog, reuse_port=True)
+        listeners.append(server.sockets[0])
+    while True:
+        for slot, sock in enumerate(listeners):
+            counters[base + slot * COUNTERS + 1], counters[base + slot * COUNTERS + 2] = listen_queue(sock)
+        await asyncio.sleep(interval / 4)
+
+def worker(index, ports, backlog, counters, interval):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent stops the workers
+    asyncio.run(serve(index, ports, backlog, counters, interval))
+
+def sample(ports, workers, counters, interval, output):
+    """Write one row per port every interval until SIGTERM/SIGINT: epoch time (the capture's clock),
+    accepts in the interval and per second, accept queue length and limit summed over the
+    workers, and the SYN_RECV and ESTABLISHED sockets of the port."""
+    previous = [0] * len(ports)
+    with open(output, 'w') as f:
+        f.write("time,port,accepts,accepts_per_s,accept_queue,accept_queue_max,syn_recv,established\n")
+        next_tick = (int(time.time() / interval) + 1) * interval
+        try:
+            while True:
+                time.sleep(max(next_tick - time.time(), 0.0))
+                states = socket_states(ports)
+                for slot, port in enumerate(ports):
+                    columns = [sum(counters[(w * len(ports) + slot) * COUNTERS + c] for w in range(workers)) for c in range(COUNTERS)]
+                    accepts = columns[0] - previous[slot]
+                    previous[slot] = columns[0]
+                    f.write(f"{next_tick:.3f},{port},{accepts},{accepts / interval:.1f},{columns[1]},{columns[2]},"
+                            f"{states[port][0]},{states[port][1]}\n")
+                f.flush()
+                next_tick += interval
+        except KeyboardInterrupt:
+            pass
+
+def stop(signum, frame):
+    raise KeyboardInterrupt  # pkill's SIGTERM ends the run like Ctrl-C
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-worker TCP server for the SYN-flood scenarios, with live accept statistics")
+    parser.add_argument('--ports', type=str, default="8080,9090", help="Comma-separated ports to listen on")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes sharing each port through SO_REUSEPORT")
+    parser.add_argument('--backlog', type=int, default=1024, help="listen() backlog of every worker socket (capped by net.core.somaxconn)")
+    parser.add_argument('--interval', type=float, default=0.5, help="Seconds between statistics rows")
+    parser.add_argument('--output', type=str, default="target_server.csv", help="Statistics time series")
+    args = parser.parse_args()
+
+    ports = [int(p) for p in args.ports.split(',') if p.strip()]
+    counters = multiprocessing.RawArray('q', args.workers * len(ports) * COUNTERS)
+    processes = [multiprocessing.Process(target=worker, args=(index, ports, args.backlog, counters, args.interval), daemon=True)
+                 for index in range(args.workers)]
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, stop)
+    sample(ports, args.workers, counters, args.interval, args.output)
+    for process in processes:
+        process.terminate()
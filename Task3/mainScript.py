@@ -33,7 +33,7 @@ def run_experiment():
 
         # Start packet capture
         pcap = f"task3_{idx}.pcap"
-        h7.cmd(f'tcpdump -i h7-eth0 -w {pcap} &')
+        h7.cmd(f'tcpdump -s 128 -i h7-eth0 -w {pcap} &')
         time.sleep(2)
 
         # Run client
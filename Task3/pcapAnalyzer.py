@@ -1,102 +1,117 @@
 #!/usr/bin/env python3
 import os
-import dpkt
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.captureCache import load_capture
+from common.fastPcap import capture_files, KIND_TCP
+from common.seqTracker import FlowTracker
+
+class PayloadStats:
+    """Throughput, goodput and retransmission totals of the iperf3 flows (port 5201), fed one
+    batch of decoded packets at a time.
+
+    A packet consumer for common.packetPipeline; analyze() feeds it the whole capture at once.
+    """
+
+    name = "payload"
+
+    def __init__(self):
+        # Retransmissions are detected per connection by byte coverage of the sequence space, so a
+        # resent segment that Nagle coalesced differently is still recognised. The server's ACKs
+        # prune what has been delivered, keeping the tracker small.
+        self.tracker = FlowTracker()
+        self.first_ts = None
+        self.last_ts = None
+        self.total_packets = 0
+        self.frame_bytes = 0
+        self.payload_bytes = 0
+        self.new_bytes = 0
+        self.lost_packets = 0
+        self.max_frame = 0
+        self.max_payload = 0
+
+    def feed(self, packets):
+        if not len(packets):
+            return
+        # Capture duration comes from the packet timestamps
+        first_ts = packets['ts'].min()
+        last_ts = packets['ts'].max()
+        self.first_ts = first_ts if self.first_ts is None else min(self.first_ts, first_ts)
+        self.last_ts = last_ts if self.last_ts is None else max(self.last_ts, last_ts)
+
+        # Only TCP to/from port 5201 matters: data towards the server, ACKs coming back from it
+        tcp = packets[(packets['kind'] == KIND_TCP) & ((packets['dport'] == 5201) | (packets['sport'] == 5201))]
+        new_bytes = self.tracker.feed(tcp)
+
+        # Filter: only TCP packets with destination port 5201 and non-zero TCP payload
+        is_data = (tcp['dport'] == 5201) & (tcp['payload'] > 0)
+        frame_len = tcp['wirelen'][is_data].astype(np.int64)
+        payload_len = tcp['payload'][is_data].astype(np.int64)
+        new_len = new_bytes[is_data]
+
+        count = int(is_data.sum())
+        self.total_packets += count
+        self.frame_bytes += int(frame_len.sum())
+        self.payload_bytes += int(payload_len.sum())
+        self.new_bytes += int(new_len.sum())
+        self.lost_packets += int((new_len == 0).sum())  # segments that carried nothing new
+        if count:
+            self.max_frame = max(self.max_frame, int(frame_len.max()))
+            self.max_payload = max(self.max_payload, int(payload_len.max()))
+
+    def summary(self):
+        duration = float(self.last_ts - self.first_ts) if self.first_ts is not None else 0.0
+        total_bits_throughput = float(self.frame_bytes * 8)  # frame bits for throughput
+        total_bits_goodput = float(self.new_bytes * 8)  # only count payload bytes not seen before
+        return {
+            "duration": duration,
+            "throughput": total_bits_throughput / (duration * 1e6) if duration > 0 else 0.0,
+            "goodput": total_bits_goodput / 1e6,
+            # Loss rate computed similar to the original script, with +1 in denominator to avoid div-by-zero.
+            "loss_rate": (self.lost_packets * 100) / (self.total_packets + 1),
+            "retransmitted_bytes": self.payload_bytes - self.new_bytes,
+            "max_payload": self.max_payload,
+            "max_frame": self.max_frame,
+        }
+
+    def finish(self, file_path=None, output_dir=None):
+        """Print the statistics (Task3 only reports on stdout) and return them."""
+        stats = self.summary()
+        print(f"Capture duration: {stats['duration']:.2f} seconds")
+        if stats['duration'] < 100:
+            print(f"WARNING: Short capture duration ({stats['duration']:.2f} seconds)")
+        print(f"Throughput: {stats['throughput']:.8f} Mbps")
+        print(f"Goodput: {stats['goodput']:.8f} Mbps")
+        print(f"Packet Loss Rate: {stats['loss_rate']:.2f}%")
+        print(f"Retransmitted Bytes: {stats['retransmitted_bytes']}")
+        print(f"Max TCP Payload: {stats['max_payload']} bytes")
+        print(f"Max Frame Size: {stats['max_frame']} bytes")
+        return stats
 
 def analyze(pcap, config):
     print(f"\n===== Analysis: {config} =====")
     
-    # Validate pcap file
-    if not os.path.isfile(pcap):
+    # Validate pcap file (or the rotated set it starts)
+    if not capture_files(pcap):
         print(f"ERROR: File {pcap} not found!")
         return
     
     # Open and read pcap file
     try:
-        with open(pcap, 'rb') as f:
-            pcap_reader = dpkt.pcap.Reader(f)
-            packets = list(pcap_reader)
+        packets = load_capture(pcap)
     except Exception as e:
         print("Error reading pcap file:", e)
         return
 
-    if not packets:
+    if not len(packets):
         print("No packets found in pcap.")
         return
 
-    # Compute capture duration from packet timestamps
-    timestamps = [ts for ts, _ in packets]
-    first_ts = min(timestamps)
-    last_ts = max(timestamps)
-    duration = last_ts - first_ts
-    print(f"Capture duration: {duration:.2f} seconds")
-    if duration < 100:
-        print(f"WARNING: Short capture duration ({duration:.2f} seconds)")
-    
-    total_bits_throughput = 0.0
-    total_bits_goodput = 0.0
-    total_packets = 0
-    lost_packets = 0
-    max_payload = 0
-    max_frame = 0
-
-    # For retransmission detection, maintain a set keyed by (src, dst, sport, dport, seq)
-    seen_keys = set()
-
-    # Process each packet in the pcap file
-    for ts, buf in packets:
-        frame_len = len(buf)
-        # Parse the Ethernet frame; skip malformed frames
-        try:
-            eth = dpkt.ethernet.Ethernet(buf)
-        except Exception:
-            continue
-        
-        # Only process IP packets carrying TCP
-        if not isinstance(eth.data, dpkt.ip.IP):
-            continue
-        ip = eth.data
-        if ip.p != dpkt.ip.IP_PROTO_TCP:
-            continue
-        
-        try:
-            tcp = ip.data
-        except Exception:
-            continue
-        
-        # Filter: only TCP packets with destination port 5201 and non-zero TCP payload
-        if tcp.dport != 5201:
-            continue
-        payload_len = len(tcp.data)
-        if payload_len <= 0:
-            continue
-        
-        total_packets += 1
-        total_bits_throughput += frame_len * 8  # frame bits for throughput
-        
-        if frame_len > max_frame:
-            max_frame = frame_len
-        if payload_len > max_payload:
-            max_payload = payload_len
-        
-        # Use (src, dst, sport, dport, seq) as a key to detect retransmissions.
-        # Note: This is a simple heuristic and may not catch all retransmissions.
-        key = (ip.src, ip.dst, tcp.sport, tcp.dport, tcp.seq)
-        if key in seen_keys:
-            lost_packets += 1
-        else:
-            seen_keys.add(key)
-            total_bits_goodput += payload_len * 8  # only count non-retransmitted payload bits
-
-    throughput = total_bits_throughput / (duration * 1e6) if duration > 0 else 0.0
-    goodput = total_bits_goodput / 1e6
-    # Loss rate computed similar to the original script, with +1 in denominator to avoid div-by-zero.
-    loss_rate = (lost_packets * 100) / (total_packets + 1)
-
-    print(f"Throughput: {throughput:.8f} Mbps")
-    print(f"Goodput: {goodput:.8f} Mbps")
-    print(f"Packet Loss Rate: {loss_rate:.2f}%")
-    print(f"Max TCP Payload: {max_payload} bytes")
-    print(f"Max Frame Size: {max_frame} bytes")
+    stats = PayloadStats()
+    stats.feed(packets)
+    stats.finish(pcap)
 
 def main():
     analyze("task3_1.pcap", "Nagle ON, Delayed-ACK ON")
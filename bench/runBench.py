@@ -0,0 +1,213 @@
+"""Benchmark the capture analyzers on synthetic captures and compare against stored baselines.
+
+Every analyzer runs in its own child process, so wall time and peak RSS (from the child's
+rusage) belong to that run alone. Analyzers that go through the decoded-capture cache run twice
+against a fresh cache directory: "cold" parses the pcap and fills the cache, "warm" loads it.
+
+    python bench/runBench.py --profile small                  # generate if needed, run, compare
+    python bench/runBench.py --profile medium --save-baseline  # record this machine's numbers
+
+Baselines are machine specific; record them on the machine the comparisons run on.
+"""
+import argparse
+import json
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baselines.json")
+MIN_DELTA = {"wall_s": 0.5, "peak_rss_mb": 16.0}
+
+# Generator parameters per profile (see synthPcap.py). Each one keeps the SYN flood inside the
+# capture so the Task2 scripts have an attack to look at.
+PROFILES = {
+    "small": dict(size="10M", flows=4, rate=20.0, conn_rate=50.0, syn_rate=1000.0, syn_start=1.0, syn_end=3.0),
+    "medium": dict(size="1G", flows=10, rate=100.0, conn_rate=50.0, syn_rate=5000.0, syn_start=20.0, syn_end=60.0),
+    "large": dict(size="10G", flows=20, rate=500.0, conn_rate=200.0, syn_rate=20000.0, syn_start=20.0, syn_end=120.0),
+    "huge": dict(size="40G", flows=40, rate=1000.0, conn_rate=500.0, syn_rate=50000.0, syn_start=20.0, syn_end=120.0),
+}
+
+# name -> (runs through the decoded-capture cache, description)
+ANALYZERS = {
+    "task1": (True, "Task1 process_capture"),
+    "task1-stream": (False, "Task1 process_capture_streaming"),
+    "task2-connections": (False, "Task2/pcapAnalyser.py"),
+    "task2-ioplot": (True, "Task2/IO_Plot.py"),
+    "task3": (True, "Task3 analyze"),
+    "pipeline": (False, "common/packetPipeline.py, every report from one pass"),
+}
+
+def capture_path(profile):
+    return os.path.join(DATA_DIR, "synth_%s.pcap" % profile)
+
+def ensure_capture(profile, seed=1):
+    """Generate the profile's capture unless a matching one is already there. Returns its sidecar."""
+    path = capture_path(profile)
+    params = dict(PROFILES[profile], seed=seed)
+    try:
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        if os.path.getsize(path) == meta["bytes"] and meta.get("profile") == params:
+            return meta
+    except (OSError, ValueError, KeyError):
+        pass
+    os.makedirs(DATA_DIR, exist_ok=True)
+    command = [sys.executable, os.path.join(BENCH_DIR, "synthPcap.py"), "--out", path]
+    for name, value in params.items():
+        command += ["--" + name.replace("_", "-"), str(value)]
+    print("Generating %s capture (%s)" % (profile, params["size"]))
+    subprocess.run(command, check=True)
+    with open(path + ".json") as f:
+        meta = json.load(f)
+    meta["profile"] = params
+    with open(path + ".json", "w") as f:
+        json.dump(meta, f, indent=1)
+    return meta
+
+def run_analyzer(name, pcap, work_dir):
+    """Body of the child process: run one analyzer on pcap with its outputs in work_dir."""
+    os.chdir(work_dir)
+    if name in ("task1", "task1-stream"):
+        sys.path.insert(0, os.path.join(REPO_DIR, "Task1"))
+        from pcapAnalyser import process_capture, process_capture_streaming
+        if name == "task1":
+            process_capture(pcap, work_dir, work_dir, raise_errors=True)
+        else:
+            process_capture_streaming(pcap, work_dir, work_dir, raise_errors=True)
+    elif name in ("task2-connections", "task2-ioplot"):
+        # Both scripts read a fixed file name from the current directory.
+        script, link = (("pcapAnalyser.py", "Q2_attack_copy.pcap") if name == "task2-connections"
+                        else ("IO_Plot.py", "syn_mitigation.pcap"))
+        if not os.path.lexists(link):
+            os.symlink(pcap, link)
+        runpy.run_path(os.path.join(REPO_DIR, "Task2", script), run_name="__main__")
+    elif name == "task3":
+        sys.path.insert(0, os.path.join(REPO_DIR, "Task3"))
+        from pcapAnalyzer import analyze
+        analyze(pcap, "benchmark")
+    elif name == "pipeline":
+        sys.path.insert(0, REPO_DIR)
+        from common.packetPipeline import analyse, CONSUMERS
+        analyse(pcap, list(CONSUMERS), work_dir)
+    else:
+        raise ValueError("unknown analyzer %s" % name)
+
+def measure(name, pcap, cache_dir, work_dir):
+    """Run one analyzer in a child process. Returns (wall seconds, peak RSS in MB)."""
+    env = dict(os.environ, PCAP_CACHE_DIR=cache_dir, MPLBACKEND="Agg", TQDM_DISABLE="1")
+    command = [sys.executable, os.path.abspath(__file__), "--child", name, os.path.abspath(pcap), work_dir]
+    start = time.monotonic()
+    child = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(child.pid, 0)
+    wall = time.monotonic() - start
+    code = os.waitstatus_to_exitcode(status)
+    if code:
+        raise RuntimeError("%s failed with exit code %d" % (name, code))
+    return wall, usage.ru_maxrss / 1024
+
+def run_profile(profile, analyzers, seed=1, repeat=1):
+    """{analyzer[/cold|/warm]: {wall_s, peak_rss_mb, packets_per_s}} for one profile; with
+    repeat > 1 every run is repeated and the fastest one kept."""
+    meta = ensure_capture(profile, seed)
+    pcap = capture_path(profile)
+    results = {}
+    for name in analyzers:
+        cached = ANALYZERS[name][0]
+        for mode in (("cold", "warm") if cached else ("",)):
+            key = name + ("/" + mode if mode else "")
+            runs = []
+            for _ in range(repeat):
+                # The cache key includes the capture's path, so the Task2 symlink has to stay
+                # in the same place for the warm run to hit what the cold run stored.
+                scratch = tempfile.mkdtemp(prefix="bench-%s-" % name)
+                cache_dir = os.path.join(scratch, "cache")
+                work_dir = os.path.join(scratch, "work")
+                os.makedirs(work_dir)
+                try:
+                    if mode == "warm":
+                        measure(name, pcap, cache_dir, work_dir)
+                    runs.append(measure(name, pcap, cache_dir, work_dir))
+                finally:
+                    shutil.rmtree(scratch, ignore_errors=True)
+            wall, rss = min(runs)
+            results[key] = {"wall_s": round(wall, 3), "peak_rss_mb": round(rss, 1),
+                            "packets_per_s": round(meta["packets"] / wall) if wall else 0}
+            print("%-26s %9.2f s %12.0f pkt/s %9.1f MB" % (key, wall, results[key]["packets_per_s"], rss))
+    return {"packets": meta["packets"], "bytes": meta["bytes"], "results": results}
+
+def compare(current, baseline, threshold):
+    """Lines describing every result that is more than threshold (a fraction) slower or bigger.
+
+    Differences below MIN_DELTA never count, so interpreter start-up jitter on the small
+    profile does not read as a regression.
+    """
+    regressions = []
+    for key, now in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if not before:
+            continue
+        for metric in ("wall_s", "peak_rss_mb"):
+            if before[metric] and now[metric] > max(before[metric] * (1 + threshold), before[metric] + MIN_DELTA[metric]):
+                regressions.append("%s %s: %.2f -> %.2f (+%.0f%%)" % (
+                    key, metric, before[metric], now[metric], 100 * (now[metric] / before[metric] - 1)))
+    return regressions
+
+def load_baselines(path=BASELINE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        run_analyzer(*sys.argv[2:])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark the capture analyzers on synthetic captures")
+    parser.add_argument('--profile', type=str, default="small", help="Comma-separated profiles: " + ", ".join(PROFILES))
+    parser.add_argument('--analyzers', type=str, default=",".join(ANALYZERS), help="Comma-separated analyzers to run")
+    parser.add_argument('--seed', type=int, default=1, help="Generator seed")
+    parser.add_argument('--baselines', type=str, default=BASELINE_FILE, help="Baseline file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baselines")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per measurement; the fastest is kept")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown / growth before a result counts as a regression")
+    parser.add_argument('--report', type=str, default=None, help="Also write the results as JSON here")
+    args = parser.parse_args()
+
+    profiles = [p.strip() for p in args.profile.split(',') if p.strip()]
+    analyzers = [a.strip() for a in args.analyzers.split(',') if a.strip()]
+    unknown = [p for p in profiles if p not in PROFILES] + [a for a in analyzers if a not in ANALYZERS]
+    if unknown:
+        parser.error("unknown profile or analyzer: %s" % ", ".join(unknown))
+
+    baselines = load_baselines(args.baselines)
+    report = {}
+    regressions = []
+    for profile in profiles:
+        print("== %s ==" % profile)
+        report[profile] = run_profile(profile, analyzers, args.seed, args.repeat)
+        if profile in baselines and not args.save_baseline:
+            regressions += ["%s %s" % (profile, line) for line in compare(report[profile], baselines[profile], args.threshold)]
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    if args.save_baseline:
+        for profile, result in report.items():
+            baselines.setdefault(profile, {"results": {}})
+            baselines[profile].update(packets=result["packets"], bytes=result["bytes"])
+            baselines[profile]["results"].update(result["results"])
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=1, sort_keys=True)
+        print("Saved baselines to %s" % args.baselines)
+    for line in regressions:
+        print("REGRESSION %s" % line)
+    sys.exit(1 if regressions else 0)
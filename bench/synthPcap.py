@@ -0,0 +1,276 @@
+"""Deterministic synthetic pcap generator for the analyzer benchmarks.
+
+The capture mixes the traffic the three tasks look at:
+
+* bulk iperf-like flows 10.0.0.<i> -> 10.0.0.7:5201 (Task1/Task3), with every second data
+  segment ACKed and a configurable share of segments retransmitted one RTO later;
+* short legitimate connections 10.0.0.1 -> 10.0.0.2:8080 with a full handshake and a
+  FIN-ACK / FIN-ACK / ACK close (Task2 connection durations);
+* a SYN flood towards 10.0.0.2:8080 from random sources during [syn_start, syn_end).
+
+Packets are built a block at a time with NumPy (headers as a packed structured array scattered
+into a zeroed buffer), so captures from a few MB to tens of GB are written at disk speed. The
+same parameters and seed always give a byte-identical file. A <pcap>.json sidecar records the
+parameters and the packet count.
+"""
+import argparse
+import json
+import numpy as np
+
+MSS = 1448
+HEADER_LEN = 14 + 20 + 20
+RTT = 0.02
+RTO = 0.2
+SERVER_BULK = 0x0a000007        # 10.0.0.7, iperf3 server of Task1/Task3
+SERVER_WEB = 0x0a000002         # 10.0.0.2, target of the Task2 connections and the flood
+CLIENT_WEB = 0x0a000001
+TH_FIN, TH_SYN, TH_RST, TH_PSH, TH_ACK = 0x01, 0x02, 0x04, 0x08, 0x10
+
+RECORD_DTYPE = np.dtype([
+    ('ts_sec', '<u4'), ('ts_usec', '<u4'), ('caplen', '<u4'), ('wirelen', '<u4'),
+    ('eth_dst', 'V6'), ('eth_src', 'V6'), ('eth_type', '>u2'),
+    ('ver_ihl', 'u1'), ('tos', 'u1'), ('ip_len', '>u2'), ('ip_id', '>u2'), ('frag', '>u2'),
+    ('ttl', 'u1'), ('proto', 'u1'), ('ip_sum', '>u2'), ('src', '>u4'), ('dst', '>u4'),
+    ('sport', '>u2'), ('dport', '>u2'), ('seq', '>u4'), ('ack', '>u4'), ('off_flags', '>u2'),
+    ('win', '>u2'), ('tcp_sum', '>u2'), ('urg', '>u2'),
+])
+FIELDS = ('t', 'src', 'dst', 'sport', 'dport', 'seq', 'ack', 'flags', 'payload')
+
+def parse_size(text):
+    """'10M', '2.5G', '500k' or plain bytes."""
+    units = {'k': 1e3, 'm': 1e6, 'g': 1e9, 't': 1e12}
+    text = str(text).strip().lower().rstrip('b')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text))
+
+def _columns(n):
+    return {name: np.zeros(n, dtype=np.float64 if name == 't' else np.int64) for name in FIELDS}
+
+def _concat(parts):
+    parts = [p for p in parts if len(p['t'])]
+    if not parts:
+        return _columns(0)
+    return {name: np.concatenate([p[name] for p in parts]) for name in FIELDS}
+
+def _take(cols, rows):
+    return {name: cols[name][rows] for name in FIELDS}
+
+def _periodic(rate, start, end, phase=0.0):
+    """Global indices g of events at times g/rate + phase falling in [start, end)."""
+    if rate <= 0 or end <= start:
+        return np.zeros(0, dtype=np.int64)
+    first = int(np.ceil((start - phase) * rate))
+    last = int(np.ceil((end - phase) * rate))
+    return np.arange(max(first, 0), max(last, 0), dtype=np.int64)
+
+class SynthCapture:
+    """Generates one capture block by block; see the module docstring for the traffic model."""
+
+    def __init__(self, flows=10, rate=100.0, retrans=0.01, conn_rate=50.0, syn_rate=0.0,
+                 syn_start=20.0, syn_end=120.0, snaplen=65535, seed=1, start_time=1700000000.0):
+        self.flows = flows
+        self.data_pps = rate * 1e6 / 8 / (HEADER_LEN + MSS) / max(flows, 1) if flows else 0.0
+        self.retrans = retrans
+        self.conn_rate = conn_rate
+        self.syn_rate = syn_rate
+        self.syn_start = syn_start
+        self.syn_end = syn_end
+        self.snaplen = snaplen
+        self.seed = seed
+        self.start_time = start_time
+        setup = np.random.default_rng([seed, 0])
+        self.flow_isn = setup.integers(0, 1 << 32, max(flows, 1))
+        self.flow_ack = setup.integers(0, 1 << 32, max(flows, 1))
+        self.flow_phase = setup.random(max(flows, 1)) / max(self.data_pps, 1.0)
+        self.carry = _columns(0)
+
+    def packets_per_second(self):
+        return self.flows * self.data_pps * (1.5 + self.retrans) + 6 * self.conn_rate + self.syn_rate
+
+    def bytes_per_second(self):
+        data = self.flows * self.data_pps * (1 + self.retrans) * (16 + min(HEADER_LEN + MSS, self.snaplen))
+        return data + (self.packets_per_second() - self.flows * self.data_pps * (1 + self.retrans)) * (16 + HEADER_LEN)
+
+    def block(self, index, start, end):
+        """Packets with start <= t < end (plus late packets of earlier blocks), time-ordered."""
+        rng = np.random.default_rng([self.seed, index + 1])
+        parts = [self.carry]
+
+        for f in range(self.flows):
+            g = _periodic(self.data_pps, start, end, self.flow_phase[f])
+            if not len(g):
+                continue
+            t = g / self.data_pps + self.flow_phase[f]
+            seq = (self.flow_isn[f] + g * MSS) % (1 << 32)
+            data = _columns(len(g))
+            data.update(t=t, src=np.full(len(g), 0x0a000001 + f), dst=np.full(len(g), SERVER_BULK),
+                        sport=np.full(len(g), 40000 + f), dport=np.full(len(g), 5201), seq=seq,
+                        ack=np.full(len(g), self.flow_ack[f]), flags=np.full(len(g), TH_PSH | TH_ACK),
+                        payload=np.full(len(g), MSS))
+            resent = _take(data, np.flatnonzero(rng.random(len(g)) < self.retrans))
+            resent['t'] = resent['t'] + RTO
+            acked = np.flatnonzero(g % 2 == 1)
+            acks = _columns(len(acked))
+            acks.update(t=t[acked] + RTT / 2, src=data['dst'][acked], dst=data['src'][acked],
+                        sport=data['dport'][acked], dport=data['sport'][acked], seq=data['ack'][acked],
+                        ack=(seq[acked] + MSS) % (1 << 32), flags=np.full(len(acked), TH_ACK))
+            parts += [data, resent, acks]
+
+        g = _periodic(self.conn_rate, start, end)
+        if len(g):
+            s = g / self.conn_rate
+            life = rng.uniform(0.05, 2.0, len(g))
+            sport = 1024 + g % 64000
+            cseq = rng.integers(0, 1 << 32, len(g))
+            sseq = rng.integers(0, 1 << 32, len(g))
+            steps = [  # (time, client->server?, seq, ack, flags)
+                (s, True, cseq, 0, TH_SYN),
+                (s + RTT / 2, False, sseq, cseq + 1, TH_SYN | TH_ACK),
+                (s + RTT, True, cseq + 1, sseq + 1, TH_ACK),
+                (s + life, True, cseq + 1, sseq + 1, TH_FIN | TH_ACK),
+                (s + life + RTT / 2, False, sseq + 1, cseq + 2, TH_FIN | TH_ACK),
+                (s + life + RTT, True, cseq + 2, sseq + 2, TH_ACK),
+            ]
+            for t, outbound, seq, ack, flags in steps:
+                step = _columns(len(g))
+                step.update(t=t, src=np.full(len(g), CLIENT_WEB if outbound else SERVER_WEB),
+                            dst=np.full(len(g), SERVER_WEB if outbound else CLIENT_WEB),
+                            sport=sport if outbound else np.full(len(g), 8080),
+                            dport=np.full(len(g), 8080) if outbound else sport,
+                            seq=seq % (1 << 32), ack=np.zeros(len(g), dtype=np.int64) + ack % (1 << 32),
+                            flags=np.full(len(g), flags))
+                parts.append(step)
+
+        g = _periodic(self.syn_rate, max(start, self.syn_start), min(end, self.syn_end))
+        if len(g):
+            flood = _columns(len(g))
+            flood.update(t=g / self.syn_rate, src=rng.integers(1, 1 << 32, len(g)), dst=np.full(len(g), SERVER_WEB),
+                         sport=rng.integers(1024, 65536, len(g)), dport=np.full(len(g), 8080),
+                         seq=rng.integers(0, 1 << 32, len(g)), flags=np.full(len(g), TH_SYN))
+            parts.append(flood)
+
+        cols = _concat(parts)
+        order = np.argsort(cols['t'], kind='stable')
+        cols = _take(cols, order)
+        cut = np.searchsorted(cols['t'], end)
+        self.carry = _take(cols, np.arange(cut, len(cols['t'])))
+        return _take(cols, np.arange(cut))
+
+    def flush(self):
+        rest, self.carry = self.carry, _columns(0)
+        return rest
+
+    def encode(self, cols):
+        """pcap records (header + frame, truncated to snaplen) for a block, as one bytes-like array."""
+        n = len(cols['t'])
+        wirelen = HEADER_LEN + cols['payload']
+        caplen = np.minimum(wirelen, self.snaplen)
+        rec = np.zeros(n, dtype=RECORD_DTYPE)
+        ts = self.start_time + cols['t']
+        sec = np.floor(ts)
+        usec = np.round((ts - sec) * 1e6).astype(np.int64)
+        rec['ts_sec'] = sec.astype(np.int64) + usec // 1000000
+        rec['ts_usec'] = usec % 1000000
+        rec['caplen'] = caplen
+        rec['wirelen'] = wirelen
+        rec['eth_dst'] = np.void(b'\x00\x00\x00\x00\x00\x02')
+        rec['eth_src'] = np.void(b'\x00\x00\x00\x00\x00\x01')
+        rec['eth_type'] = 0x0800
+        rec['ver_ihl'] = 0x45
+        rec['ip_len'] = wirelen - 14
+        rec['ip_id'] = np.arange(n) & 0xffff
+        rec['frag'] = 0x4000
+        rec['ttl'] = 64
+        rec['proto'] = 6
+        rec['src'] = cols['src']
+        rec['dst'] = cols['dst']
+        rec['sport'] = cols['sport']
+        rec['dport'] = cols['dport']
+        rec['seq'] = cols['seq']
+        rec['ack'] = cols['ack']
+        rec['off_flags'] = (5 << 12) | cols['flags']
+        rec['win'] = 65535
+        # IPv4 header checksum over the ten big-endian 16-bit words (checksum field still zero).
+        words = rec.view(np.uint8).reshape(n, RECORD_DTYPE.itemsize)[:, 30:50].reshape(n, 10, 2).astype(np.uint32)
+        total = (words[:, :, 0] << 8 | words[:, :, 1]).sum(axis=1)
+        total = (total & 0xffff) + (total >> 16)
+        total = (total & 0xffff) + (total >> 16)
+        rec['ip_sum'] = ~total & 0xffff
+
+        sizes = 16 + caplen
+        offsets = np.zeros(n, dtype=np.int64)
+        np.cumsum(sizes[:-1], out=offsets[1:])
+        out = np.zeros(int(sizes.sum()), dtype=np.uint8)
+        # snaplen >= HEADER_LEN, so every record holds the whole header; payload bytes stay zero.
+        header = rec.view(np.uint8).reshape(n, RECORD_DTYPE.itemsize)
+        for col in range(RECORD_DTYPE.itemsize):
+            out[offsets + col] = header[:, col]
+        return out
+
+def file_header(snaplen):
+    # magic, version 2.4, thiszone, sigfigs, snaplen, DLT_EN10MB
+    return np.array([0xa1b2c3d4, 0x00040002, 0, 0, snaplen, 1], dtype='<u4').view(np.uint8)
+
+def generate(path, size=None, duration=None, block_packets=1 << 16, block_bytes=1 << 23, **params):
+    """Write a capture of about `size` bytes (or `duration` seconds of traffic) to path.
+
+    Returns the sidecar metadata, which is also stored as <path>.json.
+    """
+    if size is None and duration is None:
+        raise ValueError("give a size or a duration")
+    synth = SynthCapture(**params)
+    # Blocks are bounded in packets (memory) and bytes (how far a --size target is overshot).
+    window = min(block_packets / max(synth.packets_per_second(), 1.0), block_bytes / max(synth.bytes_per_second(), 1.0))
+    written = 24
+    packets = 0
+    index = 0
+    with open(path, 'wb') as f:
+        f.write(file_header(synth.snaplen).tobytes())
+        while True:
+            start = index * window
+            if (duration is not None and start >= duration) or (size is not None and written >= size):
+                break
+            end = start + window if duration is None else min(start + window, duration)
+            cols = synth.block(index, start, end)
+            data = synth.encode(cols)
+            f.write(data.tobytes())
+            written += len(data)
+            packets += len(cols['t'])
+            index += 1
+        cols = synth.flush()
+        if duration is not None:
+            cols = _take(cols, np.flatnonzero(cols['t'] < duration))
+        data = synth.encode(cols)
+        f.write(data.tobytes())
+        written += len(data)
+        packets += len(cols['t'])
+    meta = {"params": dict(params, size=size, duration=duration), "packets": packets, "bytes": written,
+            "seconds": index * window}
+    with open(path + ".json", 'w') as f:
+        json.dump(meta, f, indent=1)
+    return meta
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic pcap for the benchmarks")
+    parser.add_argument('--out', type=str, required=True, help="Output pcap")
+    parser.add_argument('--size', type=str, default=None, help="Approximate file size, e.g. 10M or 20G")
+    parser.add_argument('--duration', type=float, default=None, help="Seconds of traffic (instead of --size)")
+    parser.add_argument('--flows', type=int, default=10, help="Bulk flows to 10.0.0.7:5201")
+    parser.add_argument('--rate', type=float, default=100.0, help="Aggregate bulk rate in Mbit/s")
+    parser.add_argument('--retrans', type=float, default=0.01, help="Share of data segments retransmitted")
+    parser.add_argument('--conn-rate', type=float, default=50.0, help="Short connections per second to 10.0.0.2:8080")
+    parser.add_argument('--syn-rate', type=float, default=0.0, help="Flood SYNs per second from random sources")
+    parser.add_argument('--syn-start', type=float, default=20.0, help="Flood start (seconds)")
+    parser.add_argument('--syn-end', type=float, default=120.0, help="Flood end (seconds)")
+    parser.add_argument('--snaplen', type=int, default=65535, help="Bytes kept per frame (at least 54)")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    if args.snaplen < HEADER_LEN:
+        parser.error("--snaplen must be at least %d" % HEADER_LEN)
+    meta = generate(args.out, size=parse_size(args.size) if args.size else None, duration=args.duration,
+                    flows=args.flows, rate=args.rate, retrans=args.retrans, conn_rate=args.conn_rate,
+                    syn_rate=args.syn_rate, syn_start=args.syn_start, syn_end=args.syn_end,
+                    snaplen=args.snaplen, seed=args.seed)
+    print(f"Wrote {meta['packets']} packets ({meta['bytes'] / 1e6:.1f} MB, {meta['seconds']:.1f}s of traffic) to {args.out}")
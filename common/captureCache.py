@@ -0,0 +1,109 @@
+"""On-disk cache of decoded captures.
+
+read_capture() output is saved column by column in an uncompressed .npz keyed on the absolute
+path, size and mtime of every file in the capture, so rerunning an analyzer after changing only plot styling or the
+bin width loads the columns instead of reparsing the pcap. A rewritten capture gets a new key and
+the stale entry ages out through the size-bounded LRU eviction.
+"""
+import hashlib
+import os
+import tempfile
+import numpy as np
+from common import stageProfile
+from common.fastPcap import read_capture, capture_files, PACKET_DTYPE
+
+# Bump whenever PACKET_DTYPE or the decoding rules change so old entries stop matching.
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.environ.get("PCAP_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "cn-assignment-2"))
+DEFAULT_MAX_BYTES = int(os.environ.get("PCAP_CACHE_MAX_BYTES", 4 * 1024**3))
+
+def cache_key(path):
+    """Key for a capture: changes whenever one of its files is moved, grows, is rewritten, or a
+    rotated file is added."""
+    members = capture_files(path)
+    if not members:
+        raise FileNotFoundError(f"no capture at {path}")
+    ident = [str(CACHE_VERSION)]
+    for member in members:
+        st = os.stat(member)
+        ident.append(f"{os.path.abspath(member)}|{st.st_size}|{st.st_mtime_ns}")
+    return hashlib.sha1("|".join(ident).encode()).hexdigest()
+
+def cache_path(path, cache_dir=None):
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, cache_key(path) + ".npz")
+
+def _load(entry):
+    with np.load(entry) as columns:
+        packets = np.empty(len(columns['ts']), dtype=PACKET_DTYPE)
+        for name in PACKET_DTYPE.names:
+            packets[name] = columns[name]
+    return packets
+
+def _store(entry, packets):
+    cache_dir = os.path.dirname(entry)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary name and rename so concurrent readers never see a half-written file.
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **{name: packets[name] for name in PACKET_DTYPE.names})
+        os.replace(tmp, entry)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def evict(cache_dir=None, max_bytes=None, keep=None):
+    """Delete least recently used entries until the cache fits in max_bytes.
+
+    `keep` (a path) is never deleted, so a capture larger than the whole budget still gets cached
+    for the run that produced it.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".npz"):
+            continue
+        full = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(full)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, full))
+    total = sum(size for _, size, _ in entries)
+    for _, size, full in sorted(entries):
+        if total <= max_bytes:
+            break
+        if full == keep:
+            continue
+        try:
+            os.remove(full)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def load_capture(path, cache_dir=None, max_bytes=None, use_cache=True):
+    """read_capture() with the on-disk cache in front of it."""
+    if not use_cache:
+        return read_capture(path)
+    entry = cache_path(path, cache_dir)
+    if os.path.exists(entry):
+        try:
+            with stageProfile.stage('read'):
+                packets = _load(entry)
+            stageProfile.count('read', len(packets))
+            stageProfile.note('capture_cache', 'hit')
+            os.utime(entry)  # mark as recently used for eviction
+            return packets
+        except (OSError, ValueError, KeyError):
+            pass  # unreadable entry: fall through and rebuild it
+    stageProfile.note('capture_cache', 'miss')
+    packets = read_capture(path)
+    try:
+        with stageProfile.stage('cache_store', len(packets)):
+            _store(entry, packets)
+        evict(os.path.dirname(entry), max_bytes, keep=entry)
+    except OSError as err:
+        print(f"WARNING: could not write capture cache {entry}: {err}")
+    return packets
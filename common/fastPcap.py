@@ -0,0 +1,289 @@
+"""Fast pcap reader shared by the Task1/Task2/Task3 analyzers.
+
+Instead of building a dpkt object tree per frame, the capture is memory-mapped, the record
+headers are walked once to find where every frame starts, and the Ethernet/IPv4/TCP fields
+the analyzers need are gathered with NumPy at fixed offsets. Frames the fast path does not
+understand (VLAN tags, IP options, fragments, truncated headers, ...) are decoded with dpkt instead.
+"""
+import mmap
+import os
+import struct
+import dpkt
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from common import stageProfile
+
+TCPDUMP_MAGIC = 0xa1b2c3d4
+TCPDUMP_MAGIC_NANO = 0xa1b23c4d
+DLT_EN10MB = 1
+
+# Values of the 'kind' column.
+KIND_OTHER = 0      # not IPv4 (ARP, IPv6, ...)
+KIND_IP = 1         # IPv4 carrying something other than TCP
+KIND_TCP = 2        # IPv4 + TCP
+KIND_BAD = 3        # dpkt could not decode the frame either
+
+PACKET_DTYPE = np.dtype([
+    ('ts', 'f8'),           # seconds since the epoch, as dpkt.pcap.Reader reports it
+    ('caplen', 'u4'),       # bytes stored in the file
+    ('wirelen', 'u4'),      # original length on the wire
+    ('kind', 'u1'),
+    ('proto', 'u1'),
+    ('src', 'u4'),
+    ('dst', 'u4'),
+    ('sport', 'u2'),
+    ('dport', 'u2'),
+    ('seq', 'u4'),
+    ('ack', 'u4'),
+    ('flags', 'u2'),        # the 9 TCP flag bits, same as dpkt's tcp.flags
+    ('win', 'u2'),
+    ('payload', 'u4'),      # TCP payload for KIND_TCP, IP payload for KIND_IP
+])
+
+FILE_HEADER_LEN = 24
+RECORD_HEADER_LEN = 16
+
+def read_file_header(buf):
+    """Parse the 24-byte pcap global header.
+
+    Returns (endian, divisor, linktype) where endian is a struct prefix and divisor turns the
+    sub-second field into seconds.
+    """
+    if len(buf) < FILE_HEADER_LEN:
+        raise ValueError("file too short for a pcap header")
+    for endian in ('<', '>'):
+        magic = struct.unpack_from(endian + 'I', buf, 0)[0]
+        if magic in (TCPDUMP_MAGIC, TCPDUMP_MAGIC_NANO):
+            divisor = 1e9 if magic == TCPDUMP_MAGIC_NANO else 1e6
+            linktype = struct.unpack_from(endian + 'I', buf, 20)[0]
+            return endian, divisor, linktype
+    raise ValueError("not a pcap file (pcapng is not supported)")
+
+def walk_records(buf, start, endian, limit=None):
+    """Find the offset of every complete record from `start` onwards.
+
+    Stops early after `limit` records. Returns (offsets, end) where end is the position just
+    past the last complete record, so a partially written trailing record is left for later.
+    """
+    caplen_at = struct.Struct(endian + 'I').unpack_from
+    size = len(buf)
+    last_header = size - RECORD_HEADER_LEN
+    if limit is None:
+        limit = size
+    offsets = []
+    append = offsets.append
+    pos = start
+    count = 0
+    while pos <= last_header and count < limit:
+        nxt = pos + RECORD_HEADER_LEN + caplen_at(buf, pos + 8)[0]
+        if nxt > size:
+            break
+        append(pos)
+        pos = nxt
+        count += 1
+    return np.array(offsets, dtype=np.int64), pos
+
+# Ethernet + option-less IPv4 + option-less TCP header; anything longer goes to dpkt.
+HEADER_WINDOW = 14 + 20 + 20
+
+def _be16(cols, at):
+    return (cols[:, at].astype(np.uint32) << 8) | cols[:, at + 1]
+
+def _be32(cols, at):
+    return (_be16(cols, at) << 16) | _be16(cols, at + 2)
+
+def decode_records(buf, offsets, endian, divisor):
+    """Decode the records starting at `offsets` into a PACKET_DTYPE array."""
+    out = np.zeros(len(offsets), dtype=PACKET_DTYPE)
+    if not len(offsets):
+        return out
+    data = np.frombuffer(buf, dtype=np.uint8)
+    try:
+        # Row i of a sliding-window view is just data[i:i+width], so indexing it with the
+        # offsets copies each record's leading bytes without building a per-byte index.
+        header = sliding_window_view(data, RECORD_HEADER_LEN)[offsets].view(endian + 'u4')
+        frame = offsets + RECORD_HEADER_LEN
+        last_start = len(data) - HEADER_WINDOW
+        near_end = frame > last_start
+        cols = sliding_window_view(data, HEADER_WINDOW)[np.minimum(frame, last_start)] if last_start >= 0 \
+            else np.zeros((len(offsets), HEADER_WINDOW), dtype=np.uint8)
+    finally:
+        # The mmap cannot be closed while a NumPy view of it is still alive.
+        del data
+
+    caplen = header[:, 2]
+    out['ts'] = header[:, 0].astype(np.float64) + header[:, 1].astype(np.float64) / divisor
+    out['caplen'] = caplen
+    out['wirelen'] = header[:, 3]
+
+    ethertype = _be16(cols, 12)
+    is_ip = (ethertype == 0x0800) & ~near_end
+    unusual = near_end | (caplen < 14) | (ethertype == 0x8100) | (ethertype == 0x88a8) | ((ethertype == 0x0800) & (caplen < 34))
+    is_ip &= ~unusual
+
+    ver_ihl = cols[:, 14]
+    ip_len = _be16(cols, 16)
+    frag = _be16(cols, 20) & 0x3fff
+    proto = cols[:, 23]
+    unusual |= is_ip & ((ver_ihl != 0x45) | (ip_len < 20) | (frag != 0))
+    is_ip &= ~unusual
+
+    is_tcp = is_ip & (proto == dpkt.ip.IP_PROTO_TCP)
+    off_flags = _be16(cols, 46)
+    doff = (off_flags >> 12) * 4
+    bad_tcp = is_tcp & ((caplen < HEADER_WINDOW) | (doff < 20) | (ip_len < 20 + doff))
+    unusual |= bad_tcp
+    is_ip &= ~bad_tcp
+    is_tcp &= is_ip
+
+    out['kind'] = np.where(is_tcp, KIND_TCP, np.where(is_ip, KIND_IP, KIND_OTHER))
+    out['proto'] = np.where(is_ip, proto, 0)
+    out['src'] = np.where(is_ip, _be32(cols, 26), 0)
+    out['dst'] = np.where(is_ip, _be32(cols, 30), 0)
+    out['payload'] = np.where(is_tcp, ip_len - 20 - doff, np.where(is_ip, ip_len - 20, 0))
+    out['sport'] = np.where(is_tcp, _be16(cols, 34), 0)
+    out['dport'] = np.where(is_tcp, _be16(cols, 36), 0)
+    out['seq'] = np.where(is_tcp, _be32(cols, 38), 0)
+    out['ack'] = np.where(is_tcp, _be32(cols, 42), 0)
+    out['flags'] = np.where(is_tcp, off_flags & 0x1ff, 0)
+    out['win'] = np.where(is_tcp, _be16(cols, 48), 0)
+
+    slow_rows = np.nonzero(unusual)[0]
+    # Part of the decode stage; reported separately because it is the per-frame dpkt path.
+    with stageProfile.stage('decode_dpkt', len(slow_rows)):
+        for row in slow_rows:
+            start = int(frame[row])
+            _decode_with_dpkt(out, row, bytes(buf[start:start + int(caplen[row])]))
+    return out
+
+def _decode_with_dpkt(out, row, frame_bytes):
+    """Slow path for a single frame, filling the same columns from dpkt objects."""
+    try:
+        eth = dpkt.ethernet.Ethernet(frame_bytes)
+    except Exception:
+        out['kind'][row] = KIND_BAD
+        return
+    ip = eth.data
+    # dpkt strips 802.1Q tags itself, so a tagged IPv4 frame still arrives here as dpkt.ip.IP.
+    if not isinstance(ip, dpkt.ip.IP):
+        out['kind'][row] = KIND_OTHER
+        return
+    out['src'][row] = struct.unpack('>I', ip.src)[0]
+    out['dst'][row] = struct.unpack('>I', ip.dst)[0]
+    out['proto'][row] = ip.p
+    if isinstance(ip.data, dpkt.tcp.TCP):
+        tcp = ip.data
+        out['kind'][row] = KIND_TCP
+        out['sport'][row] = tcp.sport
+        out['dport'][row] = tcp.dport
+        out['seq'][row] = tcp.seq
+        out['ack'][row] = tcp.ack
+        out['flags'][row] = tcp.flags
+        out['win'][row] = tcp.win
+        # From the IP total length like the fast path: with a short snaplen tcp.data is only the captured part.
+        out['payload'][row] = max(ip.len - ip.hl * 4 - tcp.off * 4, 0)
+    else:
+        out['kind'][row] = KIND_IP
+        out['payload'][row] = max(ip.len - ip.hl * 4, 0)
+
+def capture_files(path):
+    """The files of one logical capture, in capture order.
+
+    `tcpdump -C` rotates h7.pcap into h7.pcap1, h7.pcap2, ... (h7.pcap0, h7.pcap1, ... with -W), so a
+    capture is `path` itself (when it exists) followed by every `path<N>` sorted by N. A plain
+    pcap is a set of one.
+    """
+    directory, base = os.path.split(path)
+    numbered = []
+    try:
+        names = os.listdir(directory or '.')
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        suffix = name[len(base):]
+        if name.startswith(base) and suffix.isdigit():
+            numbered.append((int(suffix), os.path.join(directory, name)))
+    files = [path] if os.path.exists(path) else []
+    return files + [member for _, member in sorted(numbered)]
+
+def capture_name(filename):
+    """The capture a file belongs to (see capture_files): "h7.pcap" for h7.pcap, h7.pcap1 or
+    h7.pcap0, None for files that are not pcaps."""
+    base = filename.rstrip('0123456789')
+    return base if base.endswith('.pcap') else None
+
+def iter_batches(path, batch_size=1 << 18):
+    """Yield the packets of a capture (a pcap file or a rotated set, see capture_files) as
+    PACKET_DTYPE arrays of at most batch_size rows."""
+    members = capture_files(path)
+    if not members:
+        raise FileNotFoundError(f"no capture at {path}")
+    for member in members:
+        with open(member, 'rb') as f:
+            if f.seek(0, 2) == 0:
+                continue
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                endian, divisor, linktype = read_file_header(buf)
+                if linktype != DLT_EN10MB:
+                    raise ValueError(f"unsupported link type {linktype}, expected Ethernet")
+                pos = FILE_HEADER_LEN
+                while True:
+                    with stageProfile.stage('read'):
+                        offsets, pos = walk_records(buf, pos, endian, limit=batch_size)
+                    if not len(offsets):
+                        break
+                    stageProfile.count('read', len(offsets))
+                    with stageProfile.stage('decode', len(offsets)):
+                        packets = decode_records(buf, offsets, endian, divisor)
+                    yield packets
+                if pos < len(buf):
+                    stageProfile.skip('truncated_record')
+
+def read_capture(path):
+    """Read a whole capture (a pcap file or a rotated set) into one PACKET_DTYPE array."""
+    batches = list(iter_batches(path))
+    if not batches:
+        return np.zeros(0, dtype=PACKET_DTYPE)
+    return np.concatenate(batches)
+
+def record_skips(packets):
+    """Count the frames a TCP analysis leaves out, by reason, in the active stage profile."""
+    if stageProfile.active() is None or not len(packets):
+        return
+    kinds = np.bincount(packets['kind'], minlength=KIND_BAD + 1)
+    stageProfile.skip('not_ipv4', kinds[KIND_OTHER])
+    stageProfile.skip('not_tcp', kinds[KIND_IP])
+    stageProfile.skip('undecodable', kinds[KIND_BAD])
+
+def timestamps_us(ts):
+    """Round epoch timestamps to whole microseconds the way datetime.utcfromtimestamp does."""
+    ts = np.asarray(ts, dtype=np.float64)
+    whole = np.floor(ts)
+    micros = np.round((ts - whole) * 1e6)
+    return whole.astype(np.int64) * 1000000 + micros.astype(np.int64)
+
+def relative_times(ts, origin_us=None):
+    """Seconds since origin_us (default: the first timestamp), matching timedelta.total_seconds()."""
+    micros = timestamps_us(ts)
+    if origin_us is None:
+        origin_us = micros[0] if len(micros) else 0
+    return (micros - origin_us) / 1e6
+
+def ip_to_str(addr):
+    """Dotted-quad form of an address from the src/dst columns."""
+    addr = int(addr)
+    return f"{addr >> 24 & 255}.{addr >> 16 & 255}.{addr >> 8 & 255}.{addr & 255}"
+
+def first_occurrences(*columns):
+    """Indices (ascending) of rows whose combination of column values has not appeared in an earlier row."""
+    n = len(columns[0])
+    if not n:
+        return np.zeros(0, dtype=np.int64)
+    # lexsort is stable, so within a run of equal keys the earliest row comes first.
+    order = np.lexsort(columns[::-1])
+    starts = np.zeros(n, dtype=bool)
+    starts[0] = True
+    for column in columns:
+        ordered = np.asarray(column)[order]
+        starts[1:] |= ordered[1:] != ordered[:-1]
+    return np.sort(order[starts])
@@ -0,0 +1,103 @@
+"""Decode a capture once and fan the packets out to several analyses.
+
+Each analysis is a consumer object with
+
+    feed(packets)                   called once per decoded PACKET_DTYPE batch, in capture order
+    finish(file_path, output_dir)   writes the analysis' plots/metrics and returns a summary
+
+so asking for throughput, connection durations and the IO graph of one capture costs a single
+read and decode instead of one per script. The consumers live next to the scripts whose output
+they reproduce; CONSUMERS names them for the command line:
+
+    python common/packetPipeline.py --input Q2_attack.pcap --output reports --reports connections,iograph
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_DIR)
+from common import stageProfile
+from common.captureCache import load_capture
+from common.fastPcap import iter_batches
+
+# report name -> (script defining the consumer, class name, keyword arguments from the CLI)
+CONSUMERS = {
+    "throughput": ("Task1/pcapAnalyser.py", "StreamingMetrics", ("bin_duration",)),
+    "connections": ("Task2/pcapAnalyser.py", "ConnectionLifetimes", ("half_open_timeout",)),
+    "iograph": ("Task2/IO_Plot.py", "IOGraph", ("resolution",)),
+    "iopyramid": ("Task2/IO_Plot.py", "IOPyramid", ()),
+    "payload": ("Task3/pcapAnalyzer.py", "PayloadStats", ()),
+    "flood": ("Task2/floodStats.py", "FloodStats", ("interval", "half_open_timeout")),
+}
+
+_modules = {}
+
+def _load_module(script):
+    """Import a task script by path. Task1 and Task2 both have a pcapAnalyser module, so each is
+    registered under a name derived from its directory."""
+    if script not in _modules:
+        path = os.path.join(REPO_DIR, script)
+        directory = os.path.dirname(path)
+        if directory not in sys.path:
+            sys.path.insert(0, directory)  # for the script's own sibling imports (binning, plotRender, ...)
+        name = "_pipeline_" + os.path.splitext(script)[0].replace("/", "_")
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[script] = module
+    return _modules[script]
+
+def make_consumer(report, **options):
+    """A fresh consumer for one of the CONSUMERS reports; options it does not take, or that are
+    None (not given), are ignored. Pass half_open_timeout=0 to keep every half-open entry."""
+    script, class_name, accepted = CONSUMERS[report]
+    cls = getattr(_load_module(script), class_name)
+    return cls(**{key: value for key, value in options.items() if key in accepted and value is not None})
+
+def run_pipeline(file_path, consumers, batch_size=1 << 18, use_cache=False):
+    """Feed every packet of the capture to every consumer, reading and decoding it once.
+
+    By default the capture is streamed in batches of batch_size, so memory stays bounded for any
+    capture size; use_cache loads it whole through the decoded-capture cache instead, which is
+    faster when the same capture is analysed again.
+    """
+    batches = [load_capture(file_path)] if use_cache else iter_batches(file_path, batch_size=batch_size)
+    for packets in batches:
+        for consumer in consumers:
+            with stageProfile.stage('consume_' + consumer.name, len(packets)):
+                consumer.feed(packets)
+
+def finish_all(file_path, consumers, output_dir):
+    """Let every consumer write its report. Returns {consumer name: summary}."""
+    return {consumer.name: consumer.finish(file_path, output_dir) for consumer in consumers}
+
+def analyse(file_path, reports, output_dir, batch_size=1 << 18, use_cache=False, **options):
+    """run_pipeline with fresh consumers for the named reports, then finish_all."""
+    consumers = [make_consumer(report, **options) for report in reports]
+    run_pipeline(file_path, consumers, batch_size, use_cache)
+    return finish_all(file_path, consumers, output_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Produce several analyses of one capture from a single decoding pass")
+    parser.add_argument('--input', type=str, required=True, help="Capture file (or the first file of a rotated set)")
+    parser.add_argument('--output', type=str, default="reports", help="Folder for plots and metrics")
+    parser.add_argument('--reports', type=str, default=",".join(CONSUMERS), help="Comma-separated reports: " + ", ".join(CONSUMERS))
+    parser.add_argument('--bin', type=float, default=None, help="Throughput bin width in seconds")
+    parser.add_argument('--half-open-timeout', type=float, default=None, help="Seconds before a half-open connection only counts in the totals (0 keeps every entry)")
+    parser.add_argument('--interval', type=float, default=None, help="SYN-flood statistics interval in seconds")
+    parser.add_argument('--resolution', type=float, default=None, help="IO graph slot width in seconds")
+    parser.add_argument('--batch', type=int, default=1 << 18, help="Packets decoded per batch")
+    parser.add_argument('--cache', action='store_true', help="Load the capture whole through the decoded-capture cache")
+    args = parser.parse_args()
+
+    reports = [r.strip() for r in args.reports.split(',') if r.strip()]
+    unknown = [r for r in reports if r not in CONSUMERS]
+    if unknown:
+        parser.error("unknown report: %s" % ", ".join(unknown))
+    os.makedirs(args.output, exist_ok=True)
+    results = analyse(args.input, reports, args.output, batch_size=args.batch, use_cache=args.cache,
+                      bin_duration=args.bin, resolution=args.resolution, interval=args.interval, half_open_timeout=args.half_open_timeout)
+    for report, summary in results.items():
+        print(f"{report}: {summary}")
@@ -0,0 +1,208 @@
+"""Retransmission accounting by sequence-space coverage.
+
+Instead of remembering every sequence number ever seen, each direction of a connection keeps the
+byte ranges it has carried as a short list of merged intervals. Everything below the peer's
+cumulative ACK is known to be delivered, so those intervals collapse into a single floor and
+memory stays proportional to the data in flight. Sequence numbers are unwrapped to 64-bit
+positions so a flow that crosses 2**32 keeps working.
+
+Because a direction's state is just the union of what it covered, a capture can also be
+tracked in chunks: each chunk is run from empty state with record_boundary, and carry_state
+folds the chunk's final state into the state at its start, giving the state the next chunk
+starts from without replaying any segment.
+"""
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+SEQ_MOD = 1 << 32
+HALF_SEQ = 1 << 31
+
+TH_RST = 0x04
+SEGMENT_FIELDS = ('src', 'dst', 'sport', 'dport', 'seq', 'ack', 'flags', 'payload')
+TH_ACK = 0x10
+
+class SequenceRanges:
+    """Covered byte ranges of one direction of a TCP connection."""
+
+    __slots__ = ('origin', 'ref', 'floor', 'starts', 'ends')
+
+    def __init__(self):
+        self.origin = None      # first number unwrapped, which maps to itself
+        self.ref = None         # recent unwrapped position used to unwrap the next number
+        self.floor = None       # every byte below this has been delivered
+        self.starts = []        # sorted, non-overlapping, non-adjacent intervals above floor
+        self.ends = []
+
+    def unwrap(self, seq):
+        """Map a 32-bit sequence number to the 64-bit position closest to the last one seen."""
+        if self.ref is None:
+            self.origin = self.ref = seq
+            return seq
+        delta = (seq - self.ref) % SEQ_MOD
+        if delta >= HALF_SEQ:
+            delta -= SEQ_MOD
+        pos = self.ref + delta
+        if pos > self.ref:
+            self.ref = pos
+        return pos
+
+    def add(self, seq, length):
+        """Record a segment carrying `length` bytes from `seq`; return how many were new."""
+        if length <= 0:
+            return 0
+        start = self.unwrap(seq)
+        end = start + length
+        if self.floor is not None and start < self.floor:
+            start = self.floor
+            if start >= end:
+                return 0
+
+        # Intervals overlapping or touching [start, end) get merged into one.
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        covered = 0
+        for i in range(lo, hi):
+            covered += max(0, min(end, self.ends[i]) - max(start, self.starts[i]))
+        if lo < hi:
+            start_merged = min(start, self.starts[lo])
+            end_merged = max(end, self.ends[hi - 1])
+        else:
+            start_merged, end_merged = start, end
+        self.starts[lo:hi] = [start_merged]
+        self.ends[lo:hi] = [end_merged]
+        return (end - start) - covered
+
+    def ack(self, ack):
+        """Everything below a cumulative ACK is delivered: fold it into the floor."""
+        pos = self.unwrap(ack)
+        if self.floor is not None and pos <= self.floor:
+            return
+        self.floor = pos
+        cut = bisect_right(self.ends, pos)
+        del self.starts[:cut]
+        del self.ends[:cut]
+        if self.starts and self.starts[0] < pos:
+            self.starts[0] = pos
+
+    def copy(self):
+        other = SequenceRanges()
+        other.origin, other.ref, other.floor = self.origin, self.ref, self.floor
+        other.starts, other.ends = list(self.starts), list(self.ends)
+        return other
+
+    def union(self, other):
+        """This direction's state followed by `other`, the state of the same direction tracked
+        from empty over later segments, as a new SequenceRanges."""
+        merged = self.copy()
+        shift = merged.unwrap(other.origin) - other.origin
+        merged.ref = max(merged.ref, other.ref + shift)
+        floors = [f for f in (merged.floor, None if other.floor is None else other.floor + shift) if f is not None]
+        merged.floor = max(floors) if floors else None
+        pairs = sorted(list(zip(merged.starts, merged.ends)) + [(a + shift, b + shift) for a, b in zip(other.starts, other.ends)])
+        merged.starts, merged.ends = [], []
+        for start, end in pairs:
+            if merged.floor is not None:
+                start = max(start, merged.floor)
+            if start >= end:
+                continue
+            if merged.ends and start <= merged.ends[-1]:
+                merged.ends[-1] = max(merged.ends[-1], end)
+            else:
+                merged.starts.append(start)
+                merged.ends.append(end)
+        return merged
+
+    def __len__(self):
+        return len(self.starts)
+
+class FlowTracker:
+    """SequenceRanges per direction of every 4-tuple, fed one TCP segment at a time.
+
+    With record_boundary the tracker also notes what carry_state needs to continue from an
+    earlier state: the directions a RST dropped, and the ACKs for directions it had no data for
+    yet (which the earlier state may have had) as (first ACK number, furthest offset from it).
+    """
+
+    def __init__(self, record_boundary=False):
+        self.flows = {}
+        self.new_bytes = 0
+        self.retransmitted_bytes = 0
+        self.retransmitted_segments = 0
+        self.data_segments = 0
+        self.reset = set() if record_boundary else None
+        self.early_acks = {} if record_boundary else None
+
+    def segment(self, src, dst, sport, dport, seq, ack, flags, payload):
+        """Account for one segment and return the number of payload bytes not seen before."""
+        key = (src, dst, sport, dport)
+        new = 0
+        if payload > 0:
+            ranges = self.flows.get(key)
+            if ranges is None:
+                ranges = self.flows[key] = SequenceRanges()
+            new = ranges.add(seq, payload)
+            self.data_segments += 1
+            self.new_bytes += new
+            if new < payload:
+                self.retransmitted_bytes += payload - new
+                if new == 0:
+                    self.retransmitted_segments += 1
+
+        if flags & TH_ACK:
+            # The ACK number acknowledges the opposite direction's data.
+            reverse = self.flows.get((dst, src, dport, sport))
+            if reverse is not None:
+                reverse.ack(ack)
+            elif self.early_acks is not None:
+                self._early_ack((dst, src, dport, sport), ack)
+        if flags & TH_RST:
+            self.flows.pop(key, None)
+            self.flows.pop((dst, src, dport, sport), None)
+            if self.reset is not None:
+                self.reset.update((key, (dst, src, dport, sport)))
+        return new
+
+    def _early_ack(self, key, ack):
+        # Once the direction has data here its ACKs go to flows; after a RST the full run drops them too.
+        if key in self.reset:
+            return
+        seen = self.early_acks.get(key)
+        if seen is None:
+            self.early_acks[key] = (ack, 0)
+            return
+        delta = (ack - seen[0]) % SEQ_MOD
+        if delta < HALF_SEQ and delta > seen[1]:
+            self.early_acks[key] = (seen[0], delta)
+
+    def feed(self, packets):
+        """Run segment() over the TCP rows of a PACKET_DTYPE array; returns new bytes per row."""
+        columns = [packets[name].tolist() for name in SEGMENT_FIELDS]
+        segment = self.segment
+        return np.array([segment(*row) for row in zip(*columns)], dtype=np.int64)
+
+    def intervals(self):
+        """Total number of stored intervals, i.e. the tracker's memory footprint."""
+        return sum(len(r) for r in self.flows.values())
+
+def carry_state(flows, chunk):
+    """The flows of a FlowTracker that started from `flows` and then saw the segments `chunk`
+    (a FlowTracker with record_boundary, started empty) saw. Returns a new dict; neither input
+    is modified.
+
+    This matches running one tracker over both unless a direction's numbers jump by 2**31 or
+    more between the two, where unwrapping against the earlier state could pick another lap.
+    """
+    carried = dict(flows)
+    for key in chunk.reset:
+        carried.pop(key, None)
+    for key, seen in chunk.early_acks.items():
+        if key in chunk.reset or key not in carried:
+            continue
+        ranges = carried[key] = carried[key].copy()
+        ranges.ack(seen[0])
+        ranges.ack((seen[0] + seen[1]) % SEQ_MOD)
+    for key, ranges in chunk.flows.items():
+        earlier = carried.get(key)
+        # Without earlier state (none before, or dropped by a RST in the chunk) the chunk's own is exact.
+        carried[key] = ranges.copy() if earlier is None else earlier.union(ranges)
+    return carried
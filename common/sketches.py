@@ -0,0 +1,125 @@
+"""Fixed-size probabilistic summaries, updated a whole NumPy batch at a time.
+
+HyperLogLog estimates how many distinct keys were seen (about 1.04 / sqrt(2**p) relative
+error) and CountMinSketch how often each key was seen (never under, over by at most
+e/width of the total with probability 1 - exp(-depth)). Both merge by element-wise max/sum,
+so per-chunk sketches combine into the sketch of the whole capture.
+"""
+import numpy as np
+
+def hash64(keys, seed=0):
+    """splitmix64 of integer keys (any shape, up to 64 bits) as uint64."""
+    with np.errstate(over='ignore'):
+        z = np.asarray(keys).astype(np.uint64) + np.uint64((0x9e3779b97f4a7c15 * (seed + 1)) & 0xffffffffffffffff)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+        return z ^ (z >> np.uint64(31))
+
+class HyperLogLog:
+    """Distinct-count estimate in 2**p one-byte registers; rows > 1 keeps that many independent
+    sketches (e.g. one per time interval) in one array."""
+
+    def __init__(self, p=12, rows=1):
+        # The rank is taken from the low 64-p bits through a float64, which is exact below 2**53.
+        if not 11 <= p <= 18:
+            raise ValueError("p must be between 11 and 18")
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros((rows, self.m), dtype=np.uint8)
+
+    def _grow(self, rows):
+        if rows > len(self.registers):
+            rows = max(rows, 2 * len(self.registers))
+            extra = np.zeros((rows - len(self.registers), self.m), dtype=np.uint8)
+            self.registers = np.concatenate([self.registers, extra])
+
+    def add(self, keys, rows=None):
+        """Add integer keys; rows (same length) picks the sketch of each key (default 0)."""
+        keys = np.asarray(keys)
+        if not len(keys):
+            return
+        h = hash64(keys)
+        index = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = (h & np.uint64((1 << (64 - self.p)) - 1)).astype(np.float64)
+        # Position of the first 1-bit in the remaining 64-p bits, counting from 1; frexp's exponent
+        # is floor(log2(rest)) + 1 without log2's rounding just below a power of two.
+        exponent = np.frexp(rest)[1]
+        rank = np.where(rest > 0, (64 - self.p) - exponent + 1, 64 - self.p + 1).astype(np.uint8)
+        if rows is None:
+            rows = np.zeros(len(keys), dtype=np.int64)
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            self._grow(int(rows.max()) + 1)
+        np.maximum.at(self.registers, (rows, index), rank)
+
+    def merge(self, other):
+        self._grow(len(other.registers))
+        self.registers[:len(other.registers)] = np.maximum(self.registers[:len(other.registers)], other.registers)
+
+    def estimate(self):
+        """Estimated distinct count of every sketch, as an array with one entry per row."""
+        registers = self.registers.astype(np.float64)
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.exp2(-registers), axis=1)
+        zeros = np.sum(self.registers == 0, axis=1)
+        # Linear counting is more accurate while many registers are still empty.
+        small = (raw <= 2.5 * self.m) & (zeros > 0)
+        linear = self.m * np.log(self.m / np.maximum(zeros, 1))
+        return np.where(small, linear, raw)
+
+    def count(self):
+        """Estimated distinct count of the first sketch."""
+        return float(self.estimate()[0])
+
+class CountMinSketch:
+    """Frequency estimates of integer keys in a depth x width table of counters."""
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    def _columns(self, keys):
+        return [(hash64(keys, seed=row + 1) % np.uint64(self.width)).astype(np.int64) for row in range(self.depth)]
+
+    def add(self, keys, counts=1):
+        keys = np.asarray(keys)
+        if not len(keys):
+            return
+        counts = np.broadcast_to(np.asarray(counts, dtype=np.int64), keys.shape)
+        for row, columns in enumerate(self._columns(keys)):
+            self.table[row] += np.bincount(columns, weights=counts, minlength=self.width).astype(np.int64)
+        self.total += int(counts.sum())
+
+    def query(self, keys):
+        keys = np.asarray(keys)
+        if not len(keys):
+            return np.zeros(0, dtype=np.int64)
+        return np.min([self.table[row][columns] for row, columns in enumerate(self._columns(keys))], axis=0)
+
+    def merge(self, other):
+        self.table += other.table
+        self.total += other.total
+
+class HeavyHitters:
+    """The top-k keys by CountMinSketch estimate, keeping only k candidates in memory."""
+
+    def __init__(self, k=10, width=2048, depth=4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates = {}
+
+    def add(self, keys):
+        keys, counts = np.unique(np.asarray(keys), return_counts=True)
+        if not len(keys):
+            return
+        self.sketch.add(keys, counts)
+        pool = np.union1d(keys, np.fromiter(self.candidates, dtype=keys.dtype, count=len(self.candidates)))
+        estimates = self.sketch.query(pool)
+        top = np.argsort(-estimates, kind='stable')[:self.k]
+        self.candidates = {int(pool[i]): int(estimates[i]) for i in top}
+
+    def top(self):
+        """[(key, estimated count)], largest first."""
+        return sorted(self.candidates.items(), key=lambda item: -item[1])
@@ -0,0 +1,156 @@
+"""Opt-in per-stage profiling for the capture analyzers.
+
+The readers and analyzers wrap their stages (read, decode, classify, bin, plot, write) in
+stage(); while no profile is active that costs one global lookup. Inside `with profiling(name)`
+every stage adds its wall time, CPU time and item count to a StageProfile, and skip() counts
+packets that were left out of the analysis, by reason. When the block ends the profile's
+report goes to every function registered with add_hook().
+
+    with profiling("h1.pcap") as profile:
+        process_capture("h1.pcap", "plots", "plots")
+    write_report(profile.report(), "plots/h1.profile.json")
+
+Profiles are per process: work done in pool workers only shows up if the worker profiles
+itself and hands the report back (see batchAnalyser).
+"""
+import json
+import os
+import resource
+import time
+from contextlib import contextmanager, nullcontext
+
+STAGES = ('read', 'decode', 'classify', 'bin', 'plot', 'write')
+
+_active = None
+_hooks = []
+
+class StageProfile:
+    """Counters of one profiled run."""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.stages = {}
+        self.skipped = {}
+        self.notes = {}
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def _entry(self, name):
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0, "items": 0}
+        return entry
+
+    @contextmanager
+    def stage(self, name, items=0):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            entry = self._entry(name)
+            entry["wall_s"] += time.perf_counter() - wall
+            entry["cpu_s"] += time.process_time() - cpu
+            entry["calls"] += 1
+            entry["items"] += items
+
+    def count(self, name, items):
+        self._entry(name)["items"] += int(items)
+
+    def skip(self, reason, count=1):
+        if count:
+            self.skipped[reason] = self.skipped.get(reason, 0) + int(count)
+
+    def report(self):
+        """JSON-ready summary; stages in pipeline order, then any others by name."""
+        order = [s for s in STAGES if s in self.stages] + sorted(s for s in self.stages if s not in STAGES)
+        return {
+            "name": self.name,
+            "wall_s": time.perf_counter() - self.wall_start,
+            "cpu_s": time.process_time() - self.cpu_start,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "stages": {s: dict(self.stages[s]) for s in order},
+            "skipped": dict(sorted(self.skipped.items())),
+            "notes": dict(self.notes),
+        }
+
+def active():
+    """The profile being collected, or None."""
+    return _active
+
+def stage(name, items=0):
+    """Time a stage of the active profile (a no-op context when profiling is off)."""
+    return _active.stage(name, items) if _active is not None else nullcontext()
+
+def count(name, items):
+    if _active is not None:
+        _active.count(name, items)
+
+def skip(reason, count=1):
+    if _active is not None:
+        _active.skip(reason, count)
+
+def note(key, value):
+    if _active is not None:
+        _active.notes[key] = value
+
+def add_hook(hook):
+    """Call hook(report) whenever a profiling() block ends."""
+    _hooks.append(hook)
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+@contextmanager
+def profiling(name=None):
+    """Collect a StageProfile of everything run inside the block. Nested blocks collect their
+    own profile and leave the outer one untouched."""
+    global _active
+    outer = _active
+    profile = _active = StageProfile(name)
+    try:
+        yield profile
+    finally:
+        _active = outer
+        report = profile.report()
+        for hook in list(_hooks):
+            hook(report)
+
+def aggregate(reports):
+    """Totals over the reports of a batch: summed stage times, items and skips, the largest
+    peak RSS, and the per-capture wall times."""
+    stages = {}
+    skipped = {}
+    for report in reports:
+        for name, entry in report["stages"].items():
+            total = stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0, "items": 0})
+            for key in total:
+                total[key] += entry[key]
+        for reason, n in report["skipped"].items():
+            skipped[reason] = skipped.get(reason, 0) + n
+    order = [s for s in STAGES if s in stages] + sorted(s for s in stages if s not in STAGES)
+    return {
+        "captures": len(reports),
+        "wall_s": sum(r["wall_s"] for r in reports),
+        "cpu_s": sum(r["cpu_s"] for r in reports),
+        "peak_rss_mb": max((r["peak_rss_mb"] for r in reports), default=0.0),
+        "stages": {s: stages[s] for s in order},
+        "skipped": dict(sorted(skipped.items())),
+        "per_capture": {r["name"]: round(r["wall_s"], 3) for r in reports},
+    }
+
+def write_report(report, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+
+def format_report(report):
+    """A short text table of a report or an aggregate."""
+    lines = ["%-12s %10s %10s %8s %12s" % ("stage", "wall s", "cpu s", "calls", "items")]
+    for name, entry in report["stages"].items():
+        lines.append("%-12s %10.3f %10.3f %8d %12d" % (name, entry["wall_s"], entry["cpu_s"], entry["calls"], entry["items"]))
+    lines.append("%-12s %10.3f %10.3f   peak RSS %.1f MB" % ("total", report["wall_s"], report["cpu_s"], report["peak_rss_mb"]))
+    for reason, n in report["skipped"].items():
+        lines.append("skipped %-20s %d" % (reason, n))
+    return "\n".join(lines)
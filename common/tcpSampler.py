@@ -0,0 +1,201 @@
+"""Periodic TCP socket state sampler built on netlink INET_DIAG.
+
+Run inside a host's network namespace (e.g. with host.popen) it dumps struct tcp_info for every
+IPv4 TCP socket of that namespace every `interval` seconds, with a single netlink round trip per
+sample instead of an `ss` fork, and appends the fields worth plotting to a compact binary file:
+
+    b"TCPS" | u32 version | u32 record size | records of SAMPLE_DTYPE ...
+
+load_samples() reads the records back and per_flow() splits them into per-connection arrays.
+"""
+import argparse
+import os
+import signal
+import socket
+import struct
+import time
+import numpy as np
+
+MAGIC = b"TCPS"
+VERSION = 1
+
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+INET_DIAG_INFO = 2
+
+# Every state except TIME_WAIT (6), CLOSE (7) and LISTEN (10): sockets that carry a flow.
+TCP_STATES = 0xfff & ~((1 << 6) | (1 << 7) | (1 << 10))
+
+NLMSG_HEADER = struct.Struct("=IHHII")
+# struct inet_diag_req_v2: family, protocol, ext, pad, states, then a zeroed inet_diag_sockid.
+DIAG_REQUEST = struct.Struct("=BBBxI48x")
+# struct inet_diag_msg up to the end of the socket id (ports and addresses are network order).
+DIAG_MSG = struct.Struct("=BBBB2s2s4s12x4s12x")
+DIAG_MSG_LEN = 72
+RTATTR = struct.Struct("=HH")
+
+# Offsets into struct tcp_info (linux/tcp.h); fields a kernel does not report read as zero.
+TCP_INFO_FIELDS = struct.Struct("=BB66x4I16xIQ48xQ")
+TCP_INFO_LEN = TCP_INFO_FIELDS.size     # through tcpi_delivery_rate
+TCP_INFO_BYTES_RETRANS = 208
+
+SAMPLE_DTYPE = np.dtype([
+    ('t', '<f8'),               # wall-clock seconds, comparable with pcap timestamps
+    ('src', '<u4'), ('dst', '<u4'),
+    ('sport', '<u2'), ('dport', '<u2'),
+    ('state', 'u1'), ('ca_state', 'u1'),
+    ('cwnd', '<u4'),            # segments
+    ('ssthresh', '<u4'),        # segments
+    ('srtt', '<u4'),            # microseconds
+    ('rttvar', '<u4'),          # microseconds
+    ('retrans', '<u4'),         # total retransmitted segments so far
+    ('bytes_retrans', '<u8'),
+    ('delivery_rate', '<u8'),   # bytes/s
+    ('pacing_rate', '<u8'),     # bytes/s
+])
+
+def build_request(seq=1):
+    body = DIAG_REQUEST.pack(socket.AF_INET, socket.IPPROTO_TCP, 1 << (INET_DIAG_INFO - 1), TCP_STATES)
+    return NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), SOCK_DIAG_BY_FAMILY, NLM_F_REQUEST | NLM_F_DUMP, seq, 0) + body
+
+def parse_diag_msg(msg, now):
+    """One SAMPLE_DTYPE row (as a tuple) from an inet_diag_msg with its attributes, or None."""
+    if len(msg) < DIAG_MSG_LEN:
+        return None
+    family, state, _, _, sport, dport, src, dst = DIAG_MSG.unpack_from(msg)
+    if family != socket.AF_INET:
+        return None
+    info = None
+    pos = DIAG_MSG_LEN
+    while pos + RTATTR.size <= len(msg):
+        length, kind = RTATTR.unpack_from(msg, pos)
+        if length < RTATTR.size:
+            break
+        if kind == INET_DIAG_INFO:
+            info = msg[pos + RTATTR.size:pos + length]
+        pos += (length + 3) & ~3
+    if info is None:
+        return None
+    bytes_retrans = 0
+    if len(info) >= TCP_INFO_BYTES_RETRANS + 8:
+        bytes_retrans = struct.unpack_from("=Q", info, TCP_INFO_BYTES_RETRANS)[0]
+    if len(info) < TCP_INFO_LEN:
+        info = info + bytes(TCP_INFO_LEN - len(info))
+    _, ca_state, srtt, rttvar, ssthresh, cwnd, retrans, pacing_rate, delivery_rate = TCP_INFO_FIELDS.unpack_from(info)
+    return (now, struct.unpack(">I", src)[0], struct.unpack(">I", dst)[0],
+            struct.unpack(">H", sport)[0], struct.unpack(">H", dport)[0], state, ca_state,
+            cwnd, ssthresh, srtt, rttvar, retrans, bytes_retrans, delivery_rate, pacing_rate)
+
+class DiagSocket:
+    """A netlink socket that dumps the tcp_info of every TCP socket in the current namespace."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_SOCK_DIAG)
+        self.sock.bind((0, 0))
+        self.seq = 0
+
+    def sample(self):
+        """One dump as a list of SAMPLE_DTYPE tuples, all stamped with the time of the request."""
+        self.seq += 1
+        now = time.time()
+        self.sock.send(build_request(self.seq))
+        rows = []
+        while True:
+            data = self.sock.recv(1 << 16)
+            pos = 0
+            while pos + NLMSG_HEADER.size <= len(data):
+                length, kind, _, seq, _ = NLMSG_HEADER.unpack_from(data, pos)
+                if length < NLMSG_HEADER.size:
+                    return rows
+                if seq == self.seq:
+                    if kind == NLMSG_DONE:
+                        return rows
+                    if kind == NLMSG_ERROR:
+                        errno = -struct.unpack_from("=i", data, pos + NLMSG_HEADER.size)[0]
+                        raise OSError(errno, "INET_DIAG dump failed: %s" % os.strerror(errno))
+                    if kind == SOCK_DIAG_BY_FAMILY:
+                        row = parse_diag_msg(data[pos + NLMSG_HEADER.size:pos + length], now)
+                        if row is not None:
+                            rows.append(row)
+                pos += (length + 3) & ~3
+
+    def close(self):
+        self.sock.close()
+
+def run_sampler(out_file, interval=0.1, port=None, duration=None, flush_every=1.0):
+    """Sample until SIGTERM/SIGINT (or `duration` seconds), appending to out_file.
+
+    With `port`, only sockets with that local or remote port are kept. Samples are taken against
+    a monotonic schedule, so a slow dump delays one sample instead of shifting all later ones.
+    """
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    diag = DiagSocket()
+    pending = []
+    samples = 0
+    with open(out_file, "wb") as f:
+        f.write(MAGIC + struct.pack("<II", VERSION, SAMPLE_DTYPE.itemsize))
+        start = next_sample = last_flush = time.monotonic()
+        try:
+            while not stopping and (duration is None or time.monotonic() - start < duration):
+                rows = diag.sample()
+                if port is not None:
+                    rows = [row for row in rows if row[3] == port or row[4] == port]
+                pending.extend(rows)
+                samples += 1
+                if time.monotonic() - last_flush >= flush_every:
+                    f.write(np.array(pending, dtype=SAMPLE_DTYPE).tobytes())
+                    f.flush()
+                    pending = []
+                    last_flush = time.monotonic()
+                next_sample += interval
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_sample = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            f.write(np.array(pending, dtype=SAMPLE_DTYPE).tobytes())
+            diag.close()
+    return samples
+
+def load_samples(path):
+    """All records of a sampler file as a SAMPLE_DTYPE array (a torn final record is dropped)."""
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != MAGIC:
+            raise ValueError("%s is not a TCP sampler file" % path)
+        version, itemsize = struct.unpack("<II", header[4:])
+        if version != VERSION or itemsize != SAMPLE_DTYPE.itemsize:
+            raise ValueError("%s has sampler format %d, expected %d" % (path, version, VERSION))
+        data = f.read()
+    return np.frombuffer(data[:len(data) - len(data) % itemsize], dtype=SAMPLE_DTYPE)
+
+def per_flow(samples):
+    """Split samples into {(src, dst, sport, dport): {field: array}} in time order per flow."""
+    if not len(samples):
+        return {}
+    order = np.lexsort((samples['t'], samples['dport'], samples['sport'], samples['dst'], samples['src']))
+    ordered = samples[order]
+    key = np.stack([ordered[name].astype(np.int64) for name in ('src', 'dst', 'sport', 'dport')], axis=1)
+    bounds = np.flatnonzero(np.any(key[1:] != key[:-1], axis=1)) + 1
+    flows = {}
+    for rows in np.split(ordered, bounds):
+        flow = tuple(int(rows[0][name]) for name in ('src', 'dst', 'sport', 'dport'))
+        flows[flow] = {name: rows[name] for name in SAMPLE_DTYPE.names if name not in ('src', 'dst', 'sport', 'dport')}
+    return flows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sample tcp_info of this namespace's TCP sockets over netlink")
+    parser.add_argument('--out', type=str, required=True, help="Output file")
+    parser.add_argument('--interval', type=float, default=0.1, help="Seconds between samples")
+    parser.add_argument('--port', type=int, default=None, help="Only keep sockets using this port")
+    parser.add_argument('--duration', type=float, default=None, help="Stop after this many seconds (default: until SIGTERM)")
+    args = parser.parse_args()
+    run_sampler(args.out, args.interval, args.port, args.duration)
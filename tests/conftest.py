@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The task scripts import their neighbours by name and the shared code as common.*, so the
+# tests see the same layout.
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+for path in (ROOT, os.path.join(ROOT, 'Task1'), os.path.join(ROOT, 'Task2')):
+    sys.path.insert(0, os.path.abspath(path))
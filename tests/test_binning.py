@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from binning import bin_rate_series, RunningBins
+
+def reference_series(times, values, duration, bin_duration):
+    """bin_rate_series written out bin by bin: bin i holds i*w <= t <= i*w + w."""
+    centres, rates = [], []
+    for i in range(int(duration / bin_duration) + 1):
+        start = i * bin_duration
+        members = [v for t, v in zip(times, values) if start <= t <= start + bin_duration]
+        if members:
+            centres.append(start + bin_duration / 2)
+            rates.append(sum(members) * 8 / bin_duration)
+    return centres, rates
+
+def sample(bin_duration, seed=1):
+    rng = np.random.default_rng(seed)
+    times = rng.uniform(0, 5, 400)
+    # Values exactly on bin edges, both as i*w and as the decimal literal (0.6 is not 3*0.2 in binary).
+    edges = [i * bin_duration for i in range(0, 20)] + [0.6, 0.9, 1.2, 1.5, 2.1, 3.0, 4.2]
+    times = np.concatenate([times, edges, [0.0, 5.0]])
+    values = rng.integers(40, 1500, len(times)).astype(np.float64)
+    return times, values
+
+@pytest.mark.parametrize("bin_duration", [0.2, 0.3, 0.25, 1.0])
+def test_bin_rate_series_matches_the_per_bin_loop(bin_duration):
+    times, values = sample(bin_duration)
+    centres, rates = bin_rate_series(times, values, 5.0, bin_duration)
+    ref_centres, ref_rates = reference_series(times, values, 5.0, bin_duration)
+    assert np.allclose(centres, ref_centres)
+    assert np.allclose(rates, ref_rates)
+
+@pytest.mark.parametrize("bin_duration", [0.2, 0.3])
+def test_running_bins_over_split_batches_match_one_call(bin_duration):
+    times, values = sample(bin_duration, seed=2)
+    order = np.argsort(times, kind='stable')
+    times, values = times[order], values[order]
+    whole = RunningBins(bin_duration, track_peak=True)
+    whole.add(times, values)
+    split = RunningBins(bin_duration, track_peak=True)
+    for part in np.array_split(np.arange(len(times)), 7):
+        split.add(times[part], values[part])
+    assert split.series(5.0) == whole.series(5.0)
+    assert split.peak_series() == whole.peak_series()
+    assert whole.series(5.0) == bin_rate_series(times, values, 5.0, bin_duration)
+
+def test_merged_running_bins_match_one_call():
+    times, values = sample(0.2, seed=3)
+    whole = RunningBins(0.2)
+    whole.add(times, values)
+    left, right = RunningBins(0.2), RunningBins(0.2)
+    left.add(times[::2], values[::2])
+    right.add(times[1::2], values[1::2])
+    left.merge(right)
+    centres, rates = left.series(5.0)
+    assert centres == whole.series(5.0)[0]
+    assert np.allclose(rates, whole.series(5.0)[1])
+
+def test_peak_ignores_times_before_the_first_bin():
+    bins = RunningBins(0.2, track_peak=True)
+    bins.add([-0.3, 0.1, 0.5], [99, 5, 7])
+    bins.add([-1.0], [1000])
+    centres, peaks = bins.peak_series()
+    assert np.allclose(centres, [0.1, 0.5])
+    assert peaks == [5.0, 7.0]
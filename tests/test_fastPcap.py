@@ -0,0 +1,69 @@
+import struct
+import dpkt
+import numpy as np
+from common.fastPcap import read_capture, KIND_TCP, KIND_IP
+
+def tcp_frame(payload=500, vlan=False, ip_options=b'', proto=dpkt.ip.IP_PROTO_TCP):
+    if proto == dpkt.ip.IP_PROTO_TCP:
+        body = dpkt.tcp.TCP(sport=40000, dport=8080, seq=1000, ack=5, flags=dpkt.tcp.TH_ACK, win=512, data=b'x' * payload)
+    else:
+        body = dpkt.udp.UDP(sport=5000, dport=5001, data=b'x' * payload)
+        body.ulen = len(body)
+    ip = dpkt.ip.IP(src=bytes([10, 0, 0, 1]), dst=bytes([10, 0, 0, 2]), p=proto, opts=ip_options, data=body)
+    ip.hl = (20 + len(ip_options)) // 4
+    ip.len = ip.hl * 4 + len(body)
+    eth = dpkt.ethernet.Ethernet(src=b'\x00' * 6, dst=b'\x01' * 6, type=dpkt.ethernet.ETH_TYPE_IP, data=ip)
+    frame = bytes(eth)
+    if vlan:
+        frame = frame[:12] + struct.pack('>HH', 0x8100, 7) + frame[12:]
+    return frame
+
+def write_pcap(path, frames, snaplen):
+    """A little-endian microsecond pcap whose records keep only the first snaplen bytes of each frame."""
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, snaplen, 1))
+        for i, frame in enumerate(frames):
+            kept = frame[:snaplen]
+            f.write(struct.pack('<IIII', 100 + i, 0, len(kept), len(frame)))
+            f.write(kept)
+
+def test_payload_comes_from_the_ip_header_on_both_paths(tmp_path):
+    frames = [tcp_frame(), tcp_frame(vlan=True), tcp_frame(ip_options=b'\x01\x01\x01\x00'),
+              tcp_frame(proto=dpkt.ip.IP_PROTO_UDP)]
+    path = str(tmp_path / "short.pcap")
+    write_pcap(path, frames, snaplen=96)
+    packets = read_capture(path)
+    # Row 0 takes the NumPy path, rows 1 and 2 the dpkt fallback; all carry 500 bytes of TCP payload.
+    assert packets['kind'].tolist() == [KIND_TCP, KIND_TCP, KIND_TCP, KIND_IP]
+    assert packets['caplen'].tolist() == [96] * 4
+    assert packets['payload'].tolist() == [500, 500, 500, 508]
+    assert packets['wirelen'].tolist() == [len(frame) for frame in frames]
+    assert np.all(packets['seq'][:3] == 1000)
+    assert np.all(packets['sport'][:3] == 40000)
+
+def test_full_frames_decode_the_same_on_both_paths(tmp_path):
+    path = str(tmp_path / "full.pcap")
+    write_pcap(path, [tcp_frame(payload=0), tcp_frame(payload=0, vlan=True), tcp_frame(payload=1460, vlan=True)], snaplen=65535)
+    packets = read_capture(path)
+    assert packets['payload'].tolist() == [0, 0, 1460]
+    assert packets['flags'].tolist() == [dpkt.tcp.TH_ACK] * 3
+    assert packets['win'].tolist() == [512] * 3
+
+def test_goodput_of_a_header_only_capture(tmp_path):
+    # What the Task1/Task2 captures look like with -s 128: every data segment cut after its headers.
+    from common.seqTracker import FlowTracker
+    frames = []
+    for i in range(20):
+        frame = tcp_frame(payload=1448, vlan=i % 2 == 1)
+        # Segment i carries bytes [1000 + 1448*i, ...); the VLAN-tagged ones take the dpkt path.
+        head = 18 if i % 2 else 14
+        frame = frame[:head + 24] + struct.pack('>I', 1000 + 1448 * i) + frame[head + 28:]
+        frames.append(frame)
+    frames.append(frames[4])  # one retransmission
+    path = str(tmp_path / "headers.pcap")
+    write_pcap(path, frames, snaplen=128)
+    tracker = FlowTracker()
+    tracker.feed(read_capture(path))
+    assert tracker.new_bytes == 20 * 1448
+    assert tracker.retransmitted_bytes == 1448
+    assert tracker.retransmitted_segments == 1
@@ -0,0 +1,34 @@
+import numpy as np
+from common.fastPcap import PACKET_DTYPE, KIND_TCP
+from floodStats import FloodStats, SOURCE_RING, TH_SYN
+
+def syn_packets(seconds=40, per_second=300, seed=8):
+    rng = np.random.default_rng(seed)
+    packets = np.zeros(seconds * per_second, dtype=PACKET_DTYPE)
+    packets['ts'] = np.sort(rng.uniform(1000, 1000 + seconds, len(packets)))
+    packets['ts'][0] = 1000
+    packets['kind'] = KIND_TCP
+    packets['flags'] = TH_SYN
+    # Each second draws its sources from its own pool of 100 addresses.
+    second = (packets['ts'] - 1000).astype(np.int64)
+    packets['src'] = second * 1000 + rng.integers(0, 100, len(packets))
+    packets['dst'] = 0x0a000002
+    packets['dport'] = 8080
+    return packets
+
+def test_interval_sources_in_a_fixed_ring():
+    packets = syn_packets()
+    whole = FloodStats()
+    whole.feed(packets)
+    batched = FloodStats()
+    for batch in np.array_split(packets, 97):
+        batched.feed(batch)
+    assert batched.interval_sources.registers.shape[0] == SOURCE_RING
+    assert whole.interval_sources.registers.shape[0] == SOURCE_RING
+    a, b = whole.intervals(), batched.intervals()
+    assert np.array_equal(a["syn"], b["syn"])
+    assert np.array_equal(a["distinct_sources"], b["distinct_sources"])
+    assert len(a["distinct_sources"]) == 40
+    second = (packets['ts'] - 1000).astype(np.int64)
+    exact = np.array([len(np.unique(packets['src'][second == s])) for s in range(40)])
+    assert np.all(np.abs(a["distinct_sources"] - exact) <= 0.05 * exact)
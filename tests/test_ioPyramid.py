@@ -0,0 +1,47 @@
+import numpy as np
+from common.fastPcap import PACKET_DTYPE, KIND_TCP
+from IO_Plot import IOPyramid, TH_SYN, TH_ACK
+
+def events(rows):
+    """TCP packets from (time, client port, flags, seq) tuples, client 10.0.0.1 -> server 10.0.0.2:8080."""
+    packets = np.zeros(len(rows), dtype=PACKET_DTYPE)
+    for i, (t, port, flags, seq) in enumerate(rows):
+        packets[i] = (1000 + t, 60, 60, KIND_TCP, 6, 0x0a000001, 0x0a000002, port, 8080, seq, 1, flags, 512, 0)
+    return packets
+
+def handshakes(pyramid, batches):
+    for batch in batches:
+        pyramid.feed(batch)
+    return int(pyramid.level(pyramid.levels[0])[2][pyramid.categories.index("handshake")].sum())
+
+def reference(packets, table_bits):
+    """The pending-SYN table run one packet at a time."""
+    pyramid = IOPyramid(table_bits=table_bits)
+    return sum(bool(pyramid._handshake_acks(packets[i:i + 1], packets['flags'][i:i + 1])[0]) for i in range(len(packets)))
+
+def test_foreign_ack_keeps_the_pending_syn():
+    # With table_bits=0 every connection shares the one slot.
+    packets = events([(0.0, 40000, TH_SYN, 100), (0.1, 40001, TH_ACK, 555), (0.2, 40000, TH_ACK, 101),
+                      (0.3, 40000, TH_ACK, 101)])  # a duplicate of the completing ACK does not count again
+    assert handshakes(IOPyramid(table_bits=0), [packets]) == 1
+    assert handshakes(IOPyramid(table_bits=0), [packets[:1], packets[1:2], packets[2:]]) == 1
+
+def test_later_syn_replaces_the_pending_one():
+    packets = events([(0.0, 40000, TH_SYN, 100), (0.1, 40001, TH_SYN, 700), (0.2, 40000, TH_ACK, 101),
+                      (0.3, 40001, TH_ACK, 701)])
+    assert handshakes(IOPyramid(table_bits=0), [packets]) == 1
+
+def test_batches_match_the_packet_by_packet_table():
+    rng = np.random.default_rng(9)
+    rows = []
+    for t in np.sort(rng.uniform(0, 2, 3000)):
+        port = int(rng.integers(40000, 40040))
+        if rng.random() < 0.4:
+            rows.append((t, port, TH_SYN, int(rng.integers(0, 50))))
+        else:
+            rows.append((t, port, TH_ACK, int(rng.integers(0, 51))))
+    packets = events(rows)
+    expected = reference(packets, table_bits=3)
+    assert expected > 0
+    assert handshakes(IOPyramid(table_bits=3), [packets]) == expected
+    assert handshakes(IOPyramid(table_bits=3), np.array_split(packets, 13)) == expected
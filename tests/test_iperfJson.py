@@ -0,0 +1,52 @@
+import json
+from iperfJson import read_iperf_json, load_iperf, summarize
+
+def interval(start, sent, socket=5):
+    stream = {"socket": socket, "start": start, "end": start + 1, "bytes": sent, "bits_per_second": sent * 8.0,
+              "retransmits": 1, "snd_cwnd": 10000 + start, "rtt": 100}
+    return {"streams": [stream], "sum": {"start": start, "end": start + 1, "bytes": sent}}
+
+DOCUMENT = {
+    "start": {"version": "iperf 3.16", "test_start": {"duration": 3}},
+    "intervals": [interval(0, 1000), interval(1, 2000), interval(2, 3000)],
+    "end": {"sum_sent": {"seconds": 3.0, "bytes": 6000, "bits_per_second": 16000.0, "retransmits": 3},
+            "sum_received": {"bits_per_second": 15000.0}},
+}
+
+def write(tmp_path, text):
+    path = tmp_path / "h1_client.json"
+    path.write_text(text)
+    return str(path)
+
+def test_complete_document(tmp_path):
+    s = summarize(load_iperf(write(tmp_path, json.dumps(DOCUMENT, indent=1))))
+    assert (s["streams"], s["intervals"], s["sent_bytes"], s["retransmits"]) == (1, 3, 6000, 3)
+    assert s["received_bps"] == 15000.0
+    assert s["max_cwnd"] == 10002
+
+def test_document_cut_inside_an_interval(tmp_path):
+    text = json.dumps(DOCUMENT, indent=1)
+    # Cut in the middle of the third interval, as a killed client leaves it.
+    cut = text.index('"start": 2')
+    doc = read_iperf_json(write(tmp_path, text[:cut]))
+    assert doc["start"] == DOCUMENT["start"]
+    assert doc["intervals"] == DOCUMENT["intervals"][:2]
+    assert "end" not in doc
+    s = summarize(load_iperf(write(tmp_path, text[:cut])))
+    # Without an end section the totals come from the intervals.
+    assert (s["intervals"], s["sent_bytes"], s["retransmits"], s["duration"]) == (2, 3000, 2, 2.0)
+
+def test_document_cut_before_the_intervals(tmp_path):
+    text = json.dumps(DOCUMENT)
+    doc = read_iperf_json(write(tmp_path, text[:text.index('"intervals"') + 5]))
+    assert doc == {"start": DOCUMENT["start"], "intervals": []}
+
+def test_json_stream_with_a_partial_last_line(tmp_path):
+    events = [{"event": "start", "data": DOCUMENT["start"]}] + \
+             [{"event": "interval", "data": i} for i in DOCUMENT["intervals"]] + \
+             [{"event": "end", "data": DOCUMENT["end"]}]
+    lines = [json.dumps(e) for e in events]
+    assert read_iperf_json(write(tmp_path, "\n".join(lines) + "\n")) == DOCUMENT
+    doc = read_iperf_json(write(tmp_path, "\n".join(lines[:3]) + "\n" + lines[3][:20]))
+    assert doc["intervals"] == DOCUMENT["intervals"][:2]
+    assert "end" not in doc
@@ -0,0 +1,149 @@
+import numpy as np
+from common.seqTracker import FlowTracker, SequenceRanges, SEGMENT_FIELDS, SEQ_MOD, TH_ACK, TH_RST
+
+A, B = 0x0a000001, 0x0a000002
+
+def segments(rows):
+    """A segment array from (seq, payload) or (seq, payload, flags, ack) tuples of the A->B direction,
+    or full 8-field tuples for other directions."""
+    out = np.zeros(len(rows), dtype=[(name, 'u8') for name in SEGMENT_FIELDS])
+    for i, row in enumerate(rows):
+        if len(row) == len(SEGMENT_FIELDS):
+            full = row
+        else:
+            seq, payload, flags, ack = (tuple(row) + (TH_ACK, 0))[:4]
+            full = (A, B, 40000, 8080, seq, ack, flags, payload)
+        out[i] = full
+    return out
+
+def run(rows):
+    tracker = FlowTracker()
+    new = tracker.feed(segments(rows))
+    return tracker, new.tolist()
+
+def test_in_order_data_is_all_new():
+    tracker, new = run([(1000, 500), (1500, 500), (2000, 0), (2000, 300)])
+    assert new == [500, 500, 0, 300]
+    assert (tracker.new_bytes, tracker.retransmitted_bytes, tracker.retransmitted_segments, tracker.data_segments) == (1300, 0, 0, 3)
+    assert tracker.intervals() == 1
+
+def test_overlapping_and_partial_retransmits():
+    tracker, new = run([(0, 1000), (1000, 1000),
+                        (500, 1000),    # entirely inside what was sent: a retransmitted segment
+                        (1500, 1000),   # half old, half new: retransmitted bytes but not a retransmitted segment
+                        (0, 1000)])
+    assert new == [1000, 1000, 0, 500, 0]
+    assert tracker.new_bytes == 2500
+    assert tracker.retransmitted_bytes == 1000 + 500 + 1000
+    assert tracker.retransmitted_segments == 2
+    assert tracker.data_segments == 5
+
+def test_segment_spanning_existing_ranges():
+    tracker, new = run([(0, 100), (200, 100), (400, 100),
+                        (50, 400)])     # [50, 450) covers two holes and the middle range
+    assert new == [100, 100, 100, 200]
+    assert tracker.retransmitted_bytes == 200
+    assert tracker.retransmitted_segments == 0
+    assert tracker.intervals() == 1
+
+def test_sequence_wraparound():
+    start = SEQ_MOD - 1500
+    tracker, new = run([(start, 1000), ((start + 1000) % SEQ_MOD, 1000), ((start + 2000) % SEQ_MOD, 1000),
+                        ((start + 500) % SEQ_MOD, 1000),   # retransmission straddling 2**32
+                        ((start + 3000) % SEQ_MOD, 1000)])
+    assert new == [1000, 1000, 1000, 0, 1000]
+    assert tracker.retransmitted_bytes == 1000
+    assert tracker.retransmitted_segments == 1
+    assert tracker.intervals() == 1
+
+def test_unwrap_goes_backwards_across_the_wrap():
+    ranges = SequenceRanges()
+    assert ranges.unwrap(10) == 10
+    assert ranges.unwrap(SEQ_MOD - 10) == -10
+    assert ranges.unwrap(1 << 30) == 1 << 30
+
+def test_data_below_the_peer_ack_is_a_retransmission():
+    ack = (B, A, 8080, 40000, 0, 2000, TH_ACK, 0)
+    tracker, new = run([(0, 1000), (1000, 1000), ack, (500, 1000), (2000, 1000)])
+    assert new == [1000, 1000, 0, 0, 1000]
+    assert tracker.retransmitted_segments == 1
+    # The ACK folded the delivered bytes into the floor, leaving only [2000, 3000).
+    assert tracker.intervals() == 1
+    assert tracker.flows[(A, B, 40000, 8080)].floor == 2000
+
+def test_rst_drops_both_directions():
+    reverse = (B, A, 8080, 40000, 7000, 1000, TH_ACK, 200)
+    reset = (B, A, 8080, 40000, 7200, 1000, TH_ACK | TH_RST, 0)
+    tracker, new = run([(0, 1000), reverse, reset,
+                        (0, 1000)])     # same bytes on a new connection reusing the 4-tuple
+    assert new == [1000, 200, 0, 1000]
+    assert tracker.retransmitted_segments == 0
+    assert tracker.new_bytes == 2200
+    assert list(tracker.flows) == [(A, B, 40000, 8080)]
+
+def random_segments(count, seed):
+    """Two bulk connections (one crossing 2**32) with retransmissions, reordering, ACKs and a RST
+    that restarts one of them."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    conns = {40000: [SEQ_MOD - 300000, 0], 40001: [5000, 0]}  # next byte, bytes acked so far
+    for i in range(count):
+        port = 40000 if rng.random() < 0.5 else 40001
+        base = SEQ_MOD - 300000 if port == 40000 else 5000
+        sent, acked = conns[port]
+        r = rng.random()
+        if i == count // 2 and port == 40001:
+            rows.append((B, A, 8080, port, 0, 0, TH_ACK | TH_RST, 0))
+            conns[port] = [5000, 0]
+        elif r < 0.6:
+            length = int(rng.integers(1, 1500))
+            rows.append((A, B, port, 8080, (base + sent) % SEQ_MOD, 0, TH_ACK, length))
+            conns[port][0] += length
+        elif r < 0.8 and sent:
+            start = int(rng.integers(max(sent - 20000, 0), sent))
+            rows.append((A, B, port, 8080, (base + start) % SEQ_MOD, 0, TH_ACK, int(rng.integers(1, 3000))))
+        elif sent:
+            acked = int(rng.integers(acked, sent + 1))
+            conns[port][1] = acked
+            rows.append((B, A, 8080, port, 1, (base + acked) % SEQ_MOD, TH_ACK, 0))
+    return segments(rows)
+
+def state(flows):
+    return {key: (r.ref, r.floor, r.starts, r.ends) for key, r in flows.items()}
+
+def test_chunks_with_carried_state_match_one_tracker():
+    from common.seqTracker import carry_state
+    for seed in range(5):
+        rows = random_segments(3000, seed)
+        whole = FlowTracker()
+        whole_new = whole.feed(rows)
+        carried, counted = {}, []
+        totals = np.zeros(4, dtype=np.int64)
+        for chunk in np.array_split(rows, [7, 400, 401, 1500, 2990]):
+            boundary = FlowTracker(record_boundary=True)
+            boundary.feed(chunk)
+            seeded = FlowTracker()
+            seeded.flows = {key: r.copy() for key, r in carried.items()}
+            counted.append(seeded.feed(chunk))
+            totals += [seeded.new_bytes, seeded.retransmitted_bytes, seeded.retransmitted_segments, seeded.data_segments]
+            carried = carry_state(carried, boundary)
+            assert state(carried) == state(seeded.flows)
+        assert np.array_equal(np.concatenate(counted), whole_new)
+        assert totals.tolist() == [whole.new_bytes, whole.retransmitted_bytes, whole.retransmitted_segments, whole.data_segments]
+        assert whole.retransmitted_segments > 0
+
+def test_carried_state_takes_acks_for_directions_without_data_in_the_chunk():
+    from common.seqTracker import carry_state
+    first = segments([(0, 1000), (1000, 1000), (2000, 1000)])
+    second = segments([(B, A, 8080, 40000, 0, 2500, TH_ACK, 0), (B, A, 8080, 40000, 0, 1500, TH_ACK, 0)])
+    third = segments([(2000, 1000), (3000, 500)])
+    carried = {}
+    for chunk in (first, second):
+        boundary = FlowTracker(record_boundary=True)
+        boundary.feed(chunk)
+        carried = carry_state(carried, boundary)
+    ranges = carried[(A, B, 40000, 8080)]
+    assert (ranges.floor, ranges.starts, ranges.ends) == (2500, [2500], [3000])
+    seeded = FlowTracker()
+    seeded.flows = carried
+    assert seeded.feed(third).tolist() == [0, 500]
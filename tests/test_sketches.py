@@ -0,0 +1,57 @@
+import numpy as np
+from common.sketches import hash64, HyperLogLog, CountMinSketch, HeavyHitters
+
+def test_hash64_is_deterministic_and_seeded():
+    keys = np.arange(1000, dtype=np.uint64)
+    assert np.array_equal(hash64(keys), hash64(keys.copy()))
+    assert len(np.unique(hash64(keys))) == 1000
+    assert not np.array_equal(hash64(keys), hash64(keys, seed=7))
+
+def test_hyperloglog_estimates_within_a_few_standard_errors():
+    rng = np.random.default_rng(4)
+    for distinct in (100, 5000, 200000):
+        keys = np.unique(rng.integers(0, 1 << 40, distinct * 2))[:distinct]
+        sketch = HyperLogLog(12)
+        sketch.add(np.concatenate([keys, keys[: distinct // 2]]))  # repeats must not count
+        assert abs(sketch.count() / distinct - 1) < 4 * 1.04 / np.sqrt(1 << 12)
+
+def test_hyperloglog_rows_and_merge():
+    keys = np.arange(20000, dtype=np.int64)
+    rows = HyperLogLog(12)
+    rows.add(keys, rows=keys % 3)
+    whole = HyperLogLog(12)
+    whole.add(keys)
+    per_row = rows.estimate()
+    assert len(per_row) >= 3
+    assert np.allclose(per_row[:3] / (20000 / 3), 1, atol=0.1)
+    merged = HyperLogLog(12)
+    for r in range(3):
+        part = HyperLogLog(12)
+        part.add(keys[keys % 3 == r])
+        merged.merge(part)
+    assert merged.count() == whole.count()
+
+def test_count_min_never_undercounts():
+    rng = np.random.default_rng(5)
+    keys = rng.zipf(1.3, 50000) % 100000
+    sketch = CountMinSketch(width=512, depth=4)
+    for batch in np.array_split(keys, 5):
+        sketch.add(batch)
+    unique, counts = np.unique(keys, return_counts=True)
+    estimates = sketch.query(unique)
+    assert np.all(estimates >= counts)
+    assert sketch.total == len(keys)
+    # Overcount bound e/width of the total, which a few keys may exceed.
+    assert np.mean(estimates - counts <= np.e / 512 * len(keys)) > 0.95
+
+def test_heavy_hitters_find_the_largest_keys():
+    rng = np.random.default_rng(6)
+    background = rng.integers(1000, 1 << 30, 20000)
+    heavy = np.repeat(np.arange(1, 6), [5000, 4000, 3000, 2000, 1000])
+    keys = rng.permutation(np.concatenate([background, heavy]))
+    hitters = HeavyHitters(k=5)
+    for batch in np.array_split(keys, 10):
+        hitters.add(batch)
+    top = hitters.top()
+    assert [key for key, _ in top] == [1, 2, 3, 4, 5]
+    assert all(estimate >= true for (_, estimate), true in zip(top, [5000, 4000, 3000, 2000, 1000]))